@@ -0,0 +1,148 @@
+"""
+Spotify-shaped fixture data for the benchmarks.
+
+Fixtures are either recorded from the real API (benchmarks.record_fixtures)
+or generated deterministically here; both produce the same document:
+
+    {"me": {...}, "top_artists": [...], "top_tracks": [...],
+     "saved_tracks": [{"added_at": ..., "track": {...}}, ...],
+     "audio_features": [...]}
+"""
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+MARKETS = ["AD", "AE", "AR", "AT", "AU", "BE", "BG", "BR", "CA", "CH", "CL", "CO", "CZ", "DE", "DK",
+           "EE", "ES", "FI", "FR", "GB", "GR", "HK", "HU", "ID", "IE", "IL", "IN", "IS", "IT", "JP",
+           "LT", "LV", "MX", "MY", "NL", "NO", "NZ", "PE", "PH", "PL", "PT", "RO", "SE", "SG", "US"]
+GENRES = ["indie pop", "bedroom pop", "dark trap", "lo-fi beats", "neo soul", "chill r&b",
+          "melodic metal", "dance pop", "ambient", "sad indie", "edm", "acoustic folk"]
+
+
+def _images(seed: str) -> List[Dict[str, Any]]:
+    return [
+        {"url": f"https://i.scdn.co/image/{seed}{size}", "height": size, "width": size}
+        for size in (640, 300, 64)
+    ]
+
+
+def fake_artist(index: int, rng: random.Random = random) -> Dict[str, Any]:
+    artist_id = f"artist{index:018d}"
+    return {
+        "id": artist_id,
+        "name": f"Artist {index}",
+        "type": "artist",
+        "uri": f"spotify:artist:{artist_id}",
+        "href": f"https://api.spotify.com/v1/artists/{artist_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "followers": {"href": None, "total": rng.randint(1_000, 10_000_000)},
+        "genres": rng.sample(GENRES, 3),
+        "images": _images(artist_id),
+        "popularity": rng.randint(20, 100),
+    }
+
+
+def fake_track(index: int, rng: random.Random = random, artist_count: int = 0) -> Dict[str, Any]:
+    """
+    A full track object; artist_count > 0 draws its artists from that many
+    fake_artist ids so the artist lookups resolve.
+    """
+    track_id = f"track{index:019d}"
+    if artist_count:
+        artist_indexes = rng.sample(range(artist_count), 2)
+    else:
+        artist_indexes = [index * 3 + offset for offset in range(2)]
+    simple_artists = [
+        {key: artist[key] for key in ("id", "name", "type", "uri", "href", "external_urls")}
+        for artist in (fake_artist(artist_index, rng) for artist_index in artist_indexes)
+    ]
+    return {
+        "id": track_id,
+        "name": f"Track {index}",
+        "type": "track",
+        "uri": f"spotify:track:{track_id}",
+        "href": f"https://api.spotify.com/v1/tracks/{track_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "external_ids": {"isrc": f"USRC1{index:07d}"},
+        "artists": simple_artists,
+        "album": {
+            "id": f"album{index:019d}",
+            "name": f"Album {index}",
+            "album_type": "album",
+            "release_date": f"{1990 + index % 35}-06-04",
+            "release_date_precision": "day",
+            "total_tracks": 12,
+            "artists": simple_artists,
+            "available_markets": MARKETS,
+            "images": _images(f"album{index}"),
+        },
+        "available_markets": MARKETS,
+        "disc_number": 1,
+        "track_number": index % 12 + 1,
+        "duration_ms": rng.randint(120_000, 300_000),
+        "explicit": False,
+        "is_local": False,
+        "popularity": rng.randint(20, 100),
+        "preview_url": None,
+    }
+
+
+def fake_audio_features(track_id: str, rng: random.Random = random) -> Dict[str, Any]:
+    return {
+        "id": track_id,
+        "type": "audio_features",
+        "danceability": round(rng.random(), 3),
+        "energy": round(rng.random(), 3),
+        "valence": round(rng.random(), 3),
+        "acousticness": round(rng.random(), 3),
+        "instrumentalness": round(rng.random() ** 3, 3),
+        "speechiness": round(rng.random() / 3, 3),
+        "liveness": round(rng.random() / 2, 3),
+        "loudness": round(rng.uniform(-20, -2), 2),
+        "tempo": round(rng.uniform(70, 180), 2),
+        "key": rng.randint(0, 11),
+        "mode": rng.randint(0, 1),
+        "time_signature": 4,
+        "duration_ms": rng.randint(120_000, 300_000),
+    }
+
+
+def page(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"items": items, "total": len(items), "limit": len(items), "offset": 0, "next": None, "previous": None}
+
+
+def synthetic_fixtures(
+    seed: int = 7,
+    artist_count: int = 50,
+    track_count: int = 50,
+    saved_count: int = 200,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    top_artists = [fake_artist(index, rng) for index in range(artist_count)]
+    tracks = [fake_track(index, rng, artist_count) for index in range(track_count + saved_count)]
+
+    saved_tracks = [
+        {"added_at": f"2024-{12 - index // 28 % 12:02d}-{28 - index % 28:02d}T12:00:00Z", "track": track}
+        for index, track in enumerate(tracks[track_count:])
+    ]
+
+    return {
+        "me": {"id": "bench-user", "display_name": "Benchmark User", "type": "user", "country": "US"},
+        "top_artists": top_artists,
+        "top_tracks": tracks[:track_count],
+        "saved_tracks": saved_tracks,
+        "audio_features": [fake_audio_features(track["id"], rng) for track in tracks],
+    }
+
+
+def load_fixtures(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Recorded fixtures from `path`, or the synthetic set when no path is given.
+    """
+    if path is None:
+        return synthetic_fixtures()
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,110 @@
+"""
+Galaxy layout time and quality at 50, 500 and 5000 artists.
+
+Artists are generated in scenes: each draws most of its genres from its
+scene's pool and the odd one from anywhere, with Zipf-like popularity, so
+the similarity graph has the clustered shape real libraries have.
+
+Columns: full layout, cached re-request, incremental update with 1% of
+artists replaced, and the quality ratio - mean distance between artists
+that share a genre over mean distance between random pairs (lower means
+related artists sit closer together; 1.0 would be random placement).
+
+    cd backend && python -m benchmarks.layout_bench
+"""
+import random
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from models.records import ArtistRecord
+from services.layout_cache import LayoutCache
+from transformers.galaxy_layout import layout_positions
+
+SCENE_SIZE = 40
+GENRES_PER_SCENE = 12
+
+
+def fake_artists(count: int, seed: int = 7, start: int = 0) -> List[ArtistRecord]:
+    rng = random.Random(seed)
+    scenes = max(2, count // SCENE_SIZE)
+    weights = [1 / (rank + 1) for rank in range(GENRES_PER_SCENE)]
+    artists = []
+    for index in range(start, start + count):
+        scene = rng.randrange(scenes)
+        pool = [f"scene{scene} genre{genre}" for genre in range(GENRES_PER_SCENE)]
+        genres = set(rng.choices(pool, weights, k=rng.randint(1, 4)))
+        if rng.random() < 0.15:
+            genres.add(f"scene{rng.randrange(scenes)} genre{rng.randrange(GENRES_PER_SCENE)}")
+        if rng.random() < 0.03:
+            genres = set()
+        artists.append(ArtistRecord(f"artist{index:08d}", f"Artist {index}", tuple(sorted(genres)), None, None))
+    return artists
+
+
+def timed(run: Callable[[], object], repeat: int = 3) -> Tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def quality_ratio(artists: List[ArtistRecord], positions: np.ndarray, pairs: int = 20_000) -> float:
+    rng = np.random.default_rng(0)
+    by_genre = {}
+    for index, artist in enumerate(artists):
+        for genre in artist.genres:
+            by_genre.setdefault(genre, []).append(index)
+    related = [members for members in by_genre.values() if len(members) > 1]
+
+    linked = []
+    for _ in range(pairs):
+        members = related[rng.integers(len(related))]
+        first, second = rng.choice(members, 2, replace=False)
+        linked.append((first, second))
+    linked = np.array(linked)
+    random_pairs = rng.integers(len(artists), size=(pairs, 2))
+
+    def mean_distance(index_pairs: np.ndarray) -> float:
+        return float(np.linalg.norm(positions[index_pairs[:, 0]] - positions[index_pairs[:, 1]], axis=1).mean())
+
+    return mean_distance(linked) / mean_distance(random_pairs)
+
+
+def main() -> None:
+    header = f"{'artists':>8}{'full ms':>10}{'cached ms':>11}{'incremental ms':>16}{'quality':>9}{'deterministic':>15}"
+    print(header)
+    print("-" * len(header))
+
+    for count in (50, 500, 5000):
+        artists = fake_artists(count)
+        full_ms, positions = timed(lambda: layout_positions(artists), repeat=1 if count >= 5000 else 3)
+        deterministic = np.array_equal(positions, layout_positions(artists))
+
+        cache = LayoutCache()
+        cache.positions("bench", artists)
+        cached_ms, _ = timed(lambda: cache.positions("bench", artists))
+
+        # Replace 1% of the artists, as a week of listening might
+        replaced = max(1, count // 100)
+        changed = artists[:-replaced] + fake_artists(replaced, seed=11, start=count)
+        primed = [_primed(artists) for _ in range(3)]
+        incremental_ms, _ = timed(lambda: primed.pop().positions("bench", changed))
+
+        print(
+            f"{count:>8}{full_ms:>10.1f}{cached_ms:>11.2f}{incremental_ms:>16.2f}"
+            f"{quality_ratio(artists, positions):>9.2f}{str(deterministic):>15}"
+        )
+
+
+def _primed(artists: List[ArtistRecord]) -> LayoutCache:
+    cache = LayoutCache()
+    cache.positions("bench", artists)
+    return cache
+
+
+if __name__ == "__main__":
+    main()
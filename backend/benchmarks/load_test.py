@@ -0,0 +1,300 @@
+"""
+Offline load benchmark for the API.
+
+Starts the mock Spotify server and the app (uvicorn main:app) as separate
+processes, signs in benchmark users straight through the token store, then
+drives every GET /api/v1/spotify/* route at the given concurrency. Reports
+throughput, p50/p95/p99 latency and upstream calls per request, and saves
+the run as JSON for comparing before/after a change.
+
+    cd backend && python -m benchmarks.load_test --concurrency 16 --requests 300
+    cd backend && python -m benchmarks.load_test --compare benchmarks/results/baseline.json
+
+Extra app settings go through --app-env, e.g. --app-env TUNIVERSE_CACHE_ENABLED=0
+to measure cold upstream paths, or --app-env TUNIVERSE_SPOTIFY_RATE=1000 to
+take the upstream rate limiter out of the picture.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.token_store import TokenStore
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+API_PREFIX = "/api/v1/spotify"
+
+# Values for routes with path parameters
+PATH_PARAMS = {"playlist_id": "bench-playlist"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Linear-interpolated percentile of an already sorted list, q in [0, 100].
+    """
+    if not sorted_values:
+        return float("nan")
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def discover_endpoints(app_url: str) -> List[str]:
+    """
+    Every parameter-free (or PATH_PARAMS-fillable) GET route under /api/v1/spotify.
+    """
+    spec = httpx.get(f"{app_url}/openapi.json").json()
+    endpoints = []
+    for path, operations in spec["paths"].items():
+        if not path.startswith(API_PREFIX) or "get" not in operations:
+            continue
+        try:
+            endpoints.append(path.format(**PATH_PARAMS))
+        except KeyError as e:
+            print(f"Skipping {path}: no benchmark value for path parameter {e}")
+    return endpoints
+
+
+async def drive_endpoint(
+    client: httpx.AsyncClient,
+    path: str,
+    sessions: List[str],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_request = iter(range(requests))
+
+    async def worker() -> None:
+        for index in next_request:
+            headers = {"X-Tuniverse-Session": sessions[index % len(sessions)]}
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.TransportError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+    }
+
+
+async def run_benchmark(args, app_url: str, mock_url: str, sessions: List[str]) -> Dict[str, Any]:
+    endpoints = args.endpoints.split(",") if args.endpoints else discover_endpoints(app_url)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: Dict[str, Any] = {}
+
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+        for path in endpoints:
+            if args.warmup:
+                await drive_endpoint(client, path, sessions, args.warmup, args.concurrency)
+
+            await client.post(f"{mock_url}/__mock/reset")
+            result = await drive_endpoint(client, path, sessions, args.requests, args.concurrency)
+            upstream = (await client.get(f"{mock_url}/__mock/stats")).json()
+
+            result["upstream_calls"] = upstream["total_calls"]
+            result["upstream_calls_per_request"] = round(upstream["total_calls"] / args.requests, 3)
+            result["upstream_by_endpoint"] = upstream["calls"]
+            result["upstream_statuses"] = upstream["statuses"]
+            results[path] = result
+            print_row(path, result)
+
+    return results
+
+
+def print_header() -> None:
+    print(f"{'endpoint':<42}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'up/req':>8}")
+    print("-" * 94)
+
+
+def print_row(path: str, result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(
+        f"{path:<42}{result['throughput_rps']:>9.1f}{latency['p50']:>9.1f}{latency['p95']:>9.1f}"
+        f"{latency['p99']:>9.1f}{result['errors']:>8}{result['upstream_calls_per_request']:>8.2f}"
+    )
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """
+    Relative change per endpoint; negative latency / positive rps is better.
+    """
+    def change(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nvs {baseline['meta'].get('git_commit') or 'baseline'} ({baseline['meta']['started_at']})")
+    print(f"{'endpoint':<42}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'up/req':>10}")
+    for path, result in current["endpoints"].items():
+        old = baseline["endpoints"].get(path)
+        if old is None:
+            print(f"{path:<42}{'(new)':>10}")
+            continue
+        print(
+            f"{path:<42}{change(old['throughput_rps'], result['throughput_rps']):>10}"
+            + "".join(
+                f"{change(old['latency_ms'][q], result['latency_ms'][q]):>10}" for q in ("p50", "p95", "p99")
+            )
+            + f"{change(old['upstream_calls_per_request'], result['upstream_calls_per_request']):>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load benchmark against a mock Spotify API")
+    parser.add_argument("--endpoints", help="comma-separated paths (default: every /api/v1/spotify GET route)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint first")
+    parser.add_argument("--users", type=int, default=4, help="distinct signed-in users to rotate through")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the app")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--fixtures", help="recorded fixtures JSON for the mock (default: synthetic)")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--library-size", type=int, default=500)
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="tuniverse-bench-")
+    mock_port, app_port = free_port(), free_port()
+    mock_url, app_url = f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{app_port}"
+
+    mock_command = [
+        sys.executable, "-m", "benchmarks.mock_spotify", "--port", str(mock_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+        "--retry-after", str(args.retry_after),
+        "--library-size", str(args.library_size),
+    ]
+    if args.fixtures:
+        mock_command += ["--fixtures", args.fixtures]
+
+    app_env = {
+        **os.environ,
+        "SPOTIFY_API_BASE_URL": f"{mock_url}/v1",
+        "SPOTIFY_ACCOUNTS_BASE_URL": mock_url,
+        "SPOTIFY_CLIENT_ID": "benchmark",
+        "SPOTIFY_CLIENT_SECRET": "benchmark",
+        "TUNIVERSE_DATA_DIR": data_dir,
+    }
+    app_env.update(item.split("=", 1) for item in args.app_env)
+    app_command = [
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+
+    # Sessions live in the app's token store, so no OAuth round trip is needed
+    store = TokenStore(os.path.join(data_dir, "sessions.db"))
+    sessions = [
+        store.create_session(f"bench-token-{index}", f"bench-refresh-{index}", 86400, f"bench-user-{index}").session_id
+        for index in range(args.users)
+    ]
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen(mock_command, cwd=BACKEND_DIR))
+        wait_until_up(f"{mock_url}/__mock/stats", processes[-1])
+        processes.append(subprocess.Popen(app_command, cwd=BACKEND_DIR, env=app_env))
+        wait_until_up(f"{app_url}/api/v1/health", processes[-1])
+
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        print_header()
+        endpoints = asyncio.run(run_benchmark(args, app_url, mock_url, sessions))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    results = {
+        "meta": {
+            "started_at": started_at,
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        },
+        "endpoints": endpoints,
+    }
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{started_at.replace(':', '')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"\nSaved {out}")
+
+    if args.compare:
+        print_comparison(json.loads(Path(args.compare).read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Local stand-in for the Spotify Web API, fed by fixture data.
+
+Serves the endpoints the backend calls with Spotify's paging and batch
+limits, plus configurable latency, 5xx error rate and 429s. Every upstream
+call is counted per endpoint so benchmarks can report calls per request.
+
+    cd backend && python -m benchmarks.mock_spotify --port 8900 --latency-ms 40
+
+Point the app at it with SPOTIFY_API_BASE_URL=http://127.0.0.1:8900/v1 and
+SPOTIFY_ACCOUNTS_BASE_URL=http://127.0.0.1:8900.
+"""
+import argparse
+import asyncio
+import random
+import secrets
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+
+from benchmarks.fixtures import fake_audio_features, load_fixtures
+
+TIME_RANGES = ("short_term", "medium_term", "long_term")
+
+# Spotify's own limits; exceeding them is a 400 upstream too
+MAX_PAGE_LIMITS = {"top": 50, "saved": 50, "playlist": 100}
+MAX_BATCH_IDS = {"artists": 50, "tracks": 50, "audio-features": 100}
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 40.0
+    latency_jitter_ms: float = 10.0
+    error_rate: float = 0.0        # share of calls answered 503
+    rate_limit_rate: float = 0.0   # share of calls answered 429
+    retry_after: float = 1.0
+    library_size: int = 500        # saved tracks, cycled from the fixtures
+    playlist_size: int = 300
+    seed: int = 7
+
+
+def _spotify_error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"status": status, "message": message}},
+        headers=headers,
+    )
+
+
+def _paged(request: Request, items: List[Any], limit: int, offset: int, total: Optional[int] = None) -> Dict[str, Any]:
+    total = len(items) if total is None else total
+    base = str(request.url.remove_query_params(["limit", "offset"]))
+    separator = "&" if "?" in base else "?"
+
+    def link(page_offset: int) -> str:
+        return f"{base}{separator}offset={page_offset}&limit={limit}"
+
+    return {
+        "href": str(request.url),
+        "items": items,
+        "limit": limit,
+        "offset": offset,
+        "total": total,
+        "next": link(offset + limit) if offset + limit < total else None,
+        "previous": link(max(0, offset - limit)) if offset > 0 else None,
+    }
+
+
+class MockSpotify:
+    def __init__(self, fixtures: Dict[str, Any], config: MockConfig):
+        self.fixtures = fixtures
+        self.config = config
+        self.rng = random.Random(config.seed)
+
+        self.calls: Counter = Counter()
+        self.statuses: Counter = Counter()
+
+        tracks = list(fixtures["top_tracks"]) + [item["track"] for item in fixtures["saved_tracks"]]
+        self.tracks = {track["id"]: track for track in tracks}
+        self.artists = {artist["id"]: artist for artist in fixtures["top_artists"]}
+        for track in tracks:
+            for artist in track.get("artists", []):
+                self.artists.setdefault(artist["id"], {**artist, "genres": [], "images": [], "popularity": 0})
+        self.audio_features = {features["id"]: features for features in fixtures.get("audio_features", [])}
+
+        self.library = self._cycle(fixtures["saved_tracks"], config.library_size)
+        self.playlist = self._cycle(fixtures["saved_tracks"], config.playlist_size)
+
+    def _cycle(self, saved_tracks: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+        """
+        `size` saved-track items built from the fixtures; repeats get suffixed
+        ids so every item is distinct (and resolvable through /tracks).
+        """
+        items = []
+        for index in range(size):
+            item = saved_tracks[index % len(saved_tracks)]
+            cycle = index // len(saved_tracks)
+            track = item["track"]
+            if cycle:
+                track = {**track, "id": f"{track['id']}x{cycle}"}
+                self.tracks[track["id"]] = track
+            items.append({"added_at": item["added_at"], "track": track})
+        return items
+
+    async def before_call(self) -> Optional[JSONResponse]:
+        config = self.config
+        delay = max(0.0, self.rng.gauss(config.latency_ms, config.latency_jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self.rng.random()
+        if roll < config.rate_limit_rate:
+            return _spotify_error(429, "API rate limit exceeded", {"Retry-After": f"{config.retry_after:g}"})
+        if roll < config.rate_limit_rate + config.error_rate:
+            return _spotify_error(503, "Service unavailable")
+        return None
+
+    def top_items(self, kind: str, time_range: str) -> List[Dict[str, Any]]:
+        items = self.fixtures["top_artists" if kind == "artists" else "top_tracks"]
+        # Different but stable rankings per time range
+        shift = TIME_RANGES.index(time_range) * 7 % max(len(items), 1) if time_range in TIME_RANGES else 0
+        return items[shift:] + items[:shift]
+
+    def lookup(self, kind: str, track_or_artist_id: str) -> Optional[Dict[str, Any]]:
+        if kind == "artists":
+            return self.artists.get(track_or_artist_id)
+        if kind == "tracks":
+            return self.tracks.get(track_or_artist_id)
+        if track_or_artist_id not in self.tracks:
+            return None
+        if track_or_artist_id not in self.audio_features:
+            self.audio_features[track_or_artist_id] = fake_audio_features(
+                track_or_artist_id, random.Random(track_or_artist_id)
+            )
+        return self.audio_features[track_or_artist_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "total_calls": sum(self.calls.values()),
+            "calls": dict(self.calls),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "config": asdict(self.config),
+        }
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.statuses.clear()
+
+
+def create_mock_app(fixtures: Optional[Dict[str, Any]] = None, config: Optional[MockConfig] = None) -> FastAPI:
+    mock = MockSpotify(fixtures or load_fixtures(), config or MockConfig())
+    app = FastAPI(title="Mock Spotify API")
+    app.state.mock = mock
+
+    def route_template(request: Request) -> str:
+        for route in app.router.routes:
+            match, _ = route.matches(request.scope)
+            if match is Match.FULL:
+                return route.path
+        return request.url.path
+
+    @app.middleware("http")
+    async def upstream_behaviour(request: Request, call_next):
+        if request.url.path.startswith("/__mock"):
+            return await call_next(request)
+
+        response = await mock.before_call()
+        if response is None:
+            response = await call_next(request)
+
+        mock.calls[f"{request.method} {route_template(request)}"] += 1
+        mock.statuses[response.status_code] += 1
+        return response
+
+    @app.get("/v1/me")
+    async def me():
+        return mock.fixtures["me"]
+
+    @app.get("/v1/me/top/{kind}")
+    async def top(request: Request, kind: str, time_range: str = "medium_term", limit: int = 20, offset: int = 0):
+        if kind not in ("artists", "tracks"):
+            return _spotify_error(404, "Not found")
+        if not 1 <= limit <= MAX_PAGE_LIMITS["top"]:
+            return _spotify_error(400, "Invalid limit")
+        items = mock.top_items(kind, time_range)
+        return _paged(request, items[offset:offset + limit], limit, offset, total=len(items))
+
+    @app.get("/v1/me/tracks")
+    async def saved_tracks(request: Request, limit: int = 20, offset: int = 0):
+        if not 1 <= limit <= MAX_PAGE_LIMITS["saved"]:
+            return _spotify_error(400, "Invalid limit")
+        return _paged(request, mock.library[offset:offset + limit], limit, offset, total=len(mock.library))
+
+    @app.get("/v1/playlists/{playlist_id}/tracks")
+    async def playlist_tracks(request: Request, playlist_id: str, limit: int = 100, offset: int = 0, market: Optional[str] = None):
+        if not 1 <= limit <= MAX_PAGE_LIMITS["playlist"]:
+            return _spotify_error(400, "Invalid limit")
+        return _paged(request, mock.playlist[offset:offset + limit], limit, offset, total=len(mock.playlist))
+
+    def batch_lookup(kind: str, response_key: str, ids: str):
+        id_list = [item_id for item_id in ids.split(",") if item_id]
+        if not id_list or len(id_list) > MAX_BATCH_IDS[kind]:
+            return _spotify_error(400, "Too many ids requested")
+        return {response_key: [mock.lookup(kind, item_id) for item_id in id_list]}
+
+    @app.get("/v1/artists")
+    async def artists(ids: str):
+        return batch_lookup("artists", "artists", ids)
+
+    @app.get("/v1/tracks")
+    async def tracks(ids: str, market: Optional[str] = None):
+        return batch_lookup("tracks", "tracks", ids)
+
+    @app.get("/v1/audio-features")
+    async def audio_features(ids: str):
+        return batch_lookup("audio-features", "audio_features", ids)
+
+    @app.post("/api/token")
+    async def token(request: Request):
+        body = (await request.body()).decode()
+        refreshing = "grant_type=refresh_token" in body
+        return {
+            "access_token": secrets.token_urlsafe(24),
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "refresh_token": None if refreshing else secrets.token_urlsafe(24),
+            "scope": "user-top-read user-library-read",
+        }
+
+    @app.get("/__mock/stats")
+    async def stats():
+        return mock.stats()
+
+    @app.post("/__mock/reset")
+    async def reset():
+        mock.reset()
+        return mock.stats()
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--fixtures", help="recorded fixtures JSON (default: synthetic)")
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=MockConfig.latency_jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=MockConfig.rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=MockConfig.retry_after)
+    parser.add_argument("--library-size", type=int, default=MockConfig.library_size)
+    parser.add_argument("--playlist-size", type=int, default=MockConfig.playlist_size)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        library_size=args.library_size,
+        playlist_size=args.playlist_size,
+    )
+    app = create_mock_app(load_fixtures(args.fixtures), config)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Record fixture data for the mock Spotify server.
+
+    cd backend && python -m benchmarks.record_fixtures --token <access token> --out benchmarks/fixtures/me.json
+    cd backend && python -m benchmarks.record_fixtures --synthetic --out benchmarks/fixtures/synthetic.json
+
+A recorded file holds the account's real library data; keep it out of
+version control unless it comes from a test account.
+"""
+import argparse
+import json
+import os
+
+from benchmarks.fixtures import FIXTURES_DIR, synthetic_fixtures
+from services.spotify_client import SpotifyClient
+
+
+def record(access_token: str, saved_limit: int = 200) -> dict:
+    client = SpotifyClient(access_token=access_token)
+
+    saved_tracks = []
+    for item in client.iter_saved_tracks():
+        if item.get("track"):
+            saved_tracks.append({"added_at": item.get("added_at"), "track": item["track"]})
+        if len(saved_tracks) >= saved_limit:
+            break
+
+    top_tracks = client.get_top_tracks(limit=50).get("items", [])
+    track_ids = [track["id"] for track in top_tracks + [item["track"] for item in saved_tracks] if track.get("id")]
+    audio_features = client.get_audio_features(track_ids).get("audio_features", [])
+
+    return {
+        "me": client.get_current_user(),
+        "top_artists": client.get_top_artists(limit=50).get("items", []),
+        "top_tracks": top_tracks,
+        "saved_tracks": saved_tracks,
+        "audio_features": [features for features in audio_features if features],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record fixtures for benchmarks.mock_spotify")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--token", help="Spotify access token to record with")
+    source.add_argument("--synthetic", action="store_true", help="write the generated fixture set instead")
+    parser.add_argument("--saved-limit", type=int, default=200)
+    parser.add_argument("--out", default=str(FIXTURES_DIR / "recorded.json"))
+    args = parser.parse_args()
+
+    fixtures = synthetic_fixtures() if args.synthetic else record(args.token, args.saved_limit)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(fixtures, f)
+
+    print(
+        f"Wrote {args.out}: {len(fixtures['top_artists'])} artists, {len(fixtures['top_tracks'])} top tracks, "
+        f"{len(fixtures['saved_tracks'])} saved tracks, {len(fixtures['audio_features'])} audio features"
+    )
+
+
+if __name__ == "__main__":
+    main()
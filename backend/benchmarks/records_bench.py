@@ -0,0 +1,63 @@
+"""
+Memory per track held as Spotify JSON vs as compact records.
+
+Payloads are decoded from JSON text, as they arrive from the API, so no
+strings are shared between tracks except through interning.
+
+    cd backend && python -m benchmarks.records_bench
+"""
+import gc
+import json
+import random
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks.fixtures import fake_track
+from models.records import TrackRecord, parse_tracks
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    """
+    Bytes still allocated once `build()` returns, while its result is alive.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    header = f"{'tracks':>8}{'json B/track':>14}{'record B/track':>16}{'ratio':>8}{'stored json B':>15}{'stored compact B':>18}"
+    print(header)
+    print("-" * len(header))
+
+    for count in (1_000, 10_000):
+        rng = random.Random(7)
+        # Artists recur across a library; draw from a pool a tenth its size
+        tracks = [fake_track(index, rng, artist_count=max(10, count // 10)) for index in range(count)]
+        payload = json.dumps(tracks)
+
+        as_json = retained_bytes(lambda: json.loads(payload))
+        # Parsed straight from the decoded payload, which is then dropped
+        as_records = retained_bytes(lambda: parse_tracks(json.loads(payload)))
+        decoded = json.loads(payload)
+        records = parse_tracks(decoded)
+        assert [record.id for record in records] == [track["id"] for track in decoded]
+        assert TrackRecord.from_compact(records[0].to_compact()) == records[0]
+
+        stored_json = sum(len(json.dumps(track, separators=(",", ":"))) for track in decoded) / count
+        stored_compact = sum(len(json.dumps(record.to_compact(), separators=(",", ":"))) for record in records) / count
+        print(
+            f"{count:>8}{as_json / count:>14.0f}{as_records / count:>16.0f}{as_json / as_records:>7.1f}x"
+            f"{stored_json:>15.0f}{stored_compact:>18.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
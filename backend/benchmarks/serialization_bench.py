@@ -0,0 +1,91 @@
+"""
+Serialization time and bytes on the wire per endpoint payload.
+
+Compares FastAPI's default path (response_model validation + jsonable_encoder
++ json.dumps) against the orjson fast path, and reports identity / gzip /
+brotli sizes as CompressionMiddleware would send them.
+
+    cd backend && python -m benchmarks.serialization_bench
+"""
+import json
+import random
+import timeit
+from typing import Any, Callable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks.fixtures import fake_artist, fake_track, page
+from models.spotify_models import MoodResponse
+from services.compression import CompressionMiddleware, brotli
+from services.serialization import render_json
+from services.spotify_service import compose_mood_response, compose_track_insights
+from transformers.spotify_transformer import transform_top_artists_to_planets
+
+
+def default_path(content: Any, response_model: Optional[type] = None) -> bytes:
+    """
+    What FastAPI does for a route that returns `content` as-is.
+    """
+    if response_model is not None:
+        adapter = TypeAdapter(response_model)
+        if hasattr(content, "model_dump"):
+            content = content.model_dump()
+        content = adapter.dump_python(adapter.validate_python(content), mode="json")
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_per_call(fn: Callable[[], Any], min_seconds: float = 0.2) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_seconds / 0.2))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main() -> None:
+    random.seed(7)
+    top_artists = page([fake_artist(i) for i in range(50)])
+    top_tracks = page([fake_track(i) for i in range(50)])
+    mood = compose_mood_response(top_artists)
+
+    payloads = {
+        "/spotify/top-artists (50)": (top_artists, None),
+        "/spotify/top-tracks (50)": (top_tracks, None),
+        "/spotify/galaxy": (transform_top_artists_to_planets(top_artists), None),
+        "/spotify/mood": (mood, MoodResponse),
+        "/spotify/track-insights": (compose_track_insights(top_tracks), None),
+        "/spotify/universe": ({
+            "galaxy": transform_top_artists_to_planets(top_artists),
+            "mood": mood,
+            "track_insights": compose_track_insights(top_tracks),
+            "top_artists": top_artists,
+            "top_tracks": top_tracks,
+        }, None),
+    }
+
+    compressor = CompressionMiddleware(app=None)
+    header = f"{'endpoint':<28}{'default µs':>12}{'fast µs':>10}{'speedup':>9}{'raw B':>10}{'gzip B':>9}{'br B':>9}"
+    print(header)
+    print("-" * len(header))
+
+    for endpoint, (content, response_model) in payloads.items():
+        default_body = default_path(content, response_model)
+        fast_body = render_json(content)
+        assert json.loads(default_body) == json.loads(fast_body), endpoint
+
+        default_time = time_per_call(lambda: default_path(content, response_model))
+        fast_time = time_per_call(lambda: render_json(content))
+
+        gzip_size = len(compressor.compress(fast_body, "gzip"))
+        br_size = len(compressor.compress(fast_body, "br")) if brotli is not None else float("nan")
+
+        print(
+            f"{endpoint:<28}{default_time * 1e6:>12.1f}{fast_time * 1e6:>10.1f}"
+            f"{default_time / fast_time:>8.1f}x{len(fast_body):>10}{gzip_size:>9}{br_size:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
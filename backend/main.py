@@ -1,13 +1,81 @@
-from fastapi import FastAPI
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from routers import spotify
 
 
-from routers import health, auth
+from routers import health, auth, history, library
+from services.compression import add_compression
+from services.http_session import close_async_http_client, close_http_session
+from services.metrics import MetricsMiddleware, get_event_loop_monitor
+from services.precompute import get_precompute_worker
+from services.snapshot_service import get_snapshot_scheduler
+from services.spotify_auth import get_token_refresher
+from services.upstream_resilience import UpstreamUnavailable
+from services.upstream_scheduler import UpstreamRateLimited
 
 load_dotenv()
 
-app = FastAPI(title="Tuniverse API")
+logging.basicConfig(
+    level=os.getenv("TUNIVERSE_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep every session's access token fresh ahead of expiry
+    token_refresher = get_token_refresher()
+    token_refresher.start()
+    loop_monitor = get_event_loop_monitor()
+    loop_monitor.start()
+    # Daily history snapshots for active users
+    snapshot_scheduler = get_snapshot_scheduler()
+    snapshot_scheduler.start()
+    # Materialized galaxy/mood/track-insights views for active users
+    precompute_worker = get_precompute_worker()
+    precompute_worker.start()
+
+    yield
+
+    await precompute_worker.stop()
+    await snapshot_scheduler.stop()
+    await loop_monitor.stop()
+    await token_refresher.stop()
+    # Release pooled keep-alive connections to Spotify
+    close_http_session()
+    await close_async_http_client()
+
+
+app = FastAPI(title="Tuniverse API", lifespan=lifespan)
+add_compression(app)
+# Outermost, so request latency includes compression
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(UpstreamRateLimited)
+async def upstream_rate_limited_handler(request: Request, exc: UpstreamRateLimited):
+    # Spotify is throttling us; tell the client when to come back instead of a 500
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Spotify is rate limiting requests, please retry shortly"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    # Circuit open, no free upstream slot or deadline passed, and nothing stale to serve
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Spotify is unavailable, please retry shortly", "reason": exc.reason},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
 
 @app.get("/")
 def root():
@@ -24,3 +92,5 @@ def health_check():
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(spotify.router, prefix="/api/v1")
+app.include_router(history.router, prefix="/api/v1")
+app.include_router(library.router, prefix="/api/v1")
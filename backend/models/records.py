@@ -0,0 +1,151 @@
+"""
+Compact internal records for Spotify tracks, artists and albums.
+
+Spotify objects arrive as deep dicts (markets, several image sizes, hrefs,
+external ids) of which the transformers read a handful of fields. Parsing
+them once into slotted records drops the rest, and interning the strings
+that repeat across a library (artist ids and names, genres, album ids)
+means each is held once however many tracks refer to it.
+"""
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_intern = sys.intern
+
+
+def _opt_intern(value: Optional[str]) -> Optional[str]:
+    return _intern(value) if value else value
+
+
+def _first_image(images: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    return images[0].get("url") if images else None
+
+
+@dataclass(frozen=True, slots=True)
+class ArtistRecord:
+    id: str
+    name: str
+    genres: Tuple[str, ...]
+    image_url: Optional[str]
+    popularity: Optional[int]
+
+    @classmethod
+    def from_json(cls, artist: Dict[str, Any]) -> "ArtistRecord":
+        return cls(
+            id=_intern(artist["id"]),
+            name=_intern(artist.get("name") or ""),
+            genres=tuple(_intern(genre) for genre in artist.get("genres", [])),
+            image_url=_first_image(artist.get("images")),
+            popularity=artist.get("popularity"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class AlbumRecord:
+    id: Optional[str]
+    name: Optional[str]
+    release_date: Optional[str]
+    image_url: Optional[str]
+
+    @classmethod
+    def from_json(cls, album: Dict[str, Any]) -> "AlbumRecord":
+        return cls(
+            id=_opt_intern(album.get("id")),
+            name=_opt_intern(album.get("name")),
+            release_date=_opt_intern(album.get("release_date")),
+            image_url=_first_image(album.get("images")),
+        )
+
+    @property
+    def release_year(self) -> Optional[int]:
+        year = (self.release_date or "")[:4]
+        return int(year) if year.isdigit() else None
+
+
+EMPTY_ALBUM = AlbumRecord(None, None, None, None)
+
+
+@dataclass(frozen=True, slots=True)
+class TrackRecord:
+    id: str
+    name: Optional[str]
+    album: AlbumRecord
+    artist_ids: Tuple[str, ...]
+    artist_names: Tuple[str, ...]
+    popularity: Optional[int]
+    explicit: bool
+    duration_ms: int
+    spotify_url: Optional[str]
+
+    @classmethod
+    def from_json(cls, track: Dict[str, Any], albums: Optional[Dict[str, AlbumRecord]] = None) -> "TrackRecord":
+        """
+        `albums` is an id -> record memo shared across a batch, so tracks
+        from the same album share one AlbumRecord.
+        """
+        album_json = track.get("album") or {}
+        album_id = album_json.get("id")
+        album = albums.get(album_id) if albums is not None and album_id else None
+        if album is None:
+            album = AlbumRecord.from_json(album_json) if album_json else EMPTY_ALBUM
+            if albums is not None and album_id:
+                albums[album_id] = album
+
+        artists = track.get("artists", [])
+        return cls(
+            id=track.get("id") or track.get("uri"),
+            name=track.get("name"),
+            album=album,
+            artist_ids=tuple(_intern(artist["id"]) for artist in artists if artist.get("id")),
+            artist_names=tuple(_intern(artist["name"]) for artist in artists if artist.get("name")),
+            popularity=track.get("popularity"),
+            explicit=bool(track.get("explicit")),
+            duration_ms=track.get("duration_ms") or 0,
+            spotify_url=(track.get("external_urls") or {}).get("spotify"),
+        )
+
+    def to_compact(self) -> list:
+        """
+        Positional form for storage; from_compact reverses it.
+        """
+        album = self.album
+        return [
+            self.id, self.name,
+            [album.id, album.name, album.release_date, album.image_url],
+            list(self.artist_ids), list(self.artist_names),
+            self.popularity, self.explicit, self.duration_ms, self.spotify_url,
+        ]
+
+    @classmethod
+    def from_compact(cls, data: list, albums: Optional[Dict[str, AlbumRecord]] = None) -> "TrackRecord":
+        track_id, name, album_data, artist_ids, artist_names, popularity, explicit, duration_ms, spotify_url = data
+        album_id = album_data[0]
+        album = albums.get(album_id) if albums is not None and album_id else None
+        if album is None:
+            album = AlbumRecord(_opt_intern(album_id), _opt_intern(album_data[1]), _opt_intern(album_data[2]), album_data[3])
+            if albums is not None and album_id:
+                albums[album_id] = album
+        return cls(
+            id=track_id,
+            name=name,
+            album=album,
+            artist_ids=tuple(_intern(artist_id) for artist_id in artist_ids),
+            artist_names=tuple(_intern(artist_name) for artist_name in artist_names),
+            popularity=popularity,
+            explicit=explicit,
+            duration_ms=duration_ms,
+            spotify_url=spotify_url,
+        )
+
+
+def parse_artists(artists: Iterable[Optional[Dict[str, Any]]]) -> List[ArtistRecord]:
+    return [ArtistRecord.from_json(artist) for artist in artists if artist and artist.get("id")]
+
+
+def parse_tracks(tracks: Iterable[Optional[Dict[str, Any]]]) -> List[TrackRecord]:
+    """
+    Tracks with an id (local files carry only a uri), sharing album records.
+    """
+    albums: Dict[str, AlbumRecord] = {}
+    return [TrackRecord.from_json(track, albums) for track in tracks if track and track.get("id")]
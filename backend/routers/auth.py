@@ -1,16 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Cookie, Header, HTTPException, Response
 from fastapi.responses import RedirectResponse
+import asyncio
+import logging
 import os
+import time
 import urllib.parse
-import base64
-import requests
+from typing import Optional
+
+from services.precompute import get_precompute_worker
+from services.response_cache import get_response_cache
+from services.spotify_auth import SPOTIFY_AUTH_URL, SpotifyAuthError, exchange_code
+from services.spotify_client import SpotifyClient
+from services.token_store import SpotifySession, get_token_store
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
-SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+SESSION_COOKIE = "tuniverse_session"
 
-ACCESS_TOKEN_STORE = {}
+# last_seen_at is only rewritten when older than this, to keep writes off the hot path
+SESSION_TOUCH_INTERVAL = 60
 
 # ✅ Explicit scope list (Spotify is picky)
 SCOPES = [
@@ -18,6 +28,30 @@ SCOPES = [
     "user-library-read",
 ]
 
+
+async def require_session(
+    tuniverse_session: Optional[str] = Cookie(default=None),
+    x_tuniverse_session: Optional[str] = Header(default=None),
+) -> SpotifySession:
+    """
+    Route dependency: the caller's Spotify session, from the session cookie
+    or the X-Tuniverse-Session header (for non-browser clients).
+    """
+    session_id = tuniverse_session or x_tuniverse_session
+    if not session_id:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    store = get_token_store()
+    session = await asyncio.to_thread(store.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    if time.time() - session.last_seen_at > SESSION_TOUCH_INTERVAL:
+        await asyncio.to_thread(store.touch, session_id)
+
+    return session
+
+
 @router.get("/login")
 def spotify_login():
     client_id = os.getenv("SPOTIFY_CLIENT_ID")
@@ -46,7 +80,7 @@ def spotify_login():
 
 
 @router.get("/callback")
-def spotify_callback(code: str):
+def spotify_callback(code: str, response: Response):
     client_id = os.getenv("SPOTIFY_CLIENT_ID")
     client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
     redirect_uri = os.getenv("SPOTIFY_REDIRECT_URI")
@@ -57,39 +91,43 @@ def spotify_callback(code: str):
             detail="Spotify environment variables are not fully set",
         )
 
-    auth_header = base64.b64encode(
-        f"{client_id}:{client_secret}".encode()
-    ).decode()
+    try:
+        token_data = exchange_code(code, redirect_uri)
+    except SpotifyAuthError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    headers = {
-        "Authorization": f"Basic {auth_header}",
-        "Content-Type": "application/x-www-form-urlencoded",
-    }
+    access_token = token_data.get("access_token")
 
-    data = {
-        "grant_type": "authorization_code",
-        "code": code,
-        "redirect_uri": redirect_uri,
-    }
+    # Key the session by Spotify user id so caches and history follow the
+    # user across logins and token refreshes
+    try:
+        user_id = SpotifyClient(access_token=access_token).get("/me", use_cache=False).get("id")
+    except Exception as e:
+        logger.warning("Could not resolve Spotify user id: %s", e)
+        user_id = None
 
-    response = requests.post(
-        SPOTIFY_TOKEN_URL,
-        headers=headers,
-        data=data,
-    )
+    # Re-authentication: drop anything cached for this user
+    if user_id:
+        get_response_cache().invalidate_user(user_id)
 
-    if response.status_code != 200:
-        print("Spotify token error:", response.text)
-        raise HTTPException(
-            status_code=400,
-            detail="Failed to retrieve Spotify access token",
-        )
+    # ✅ Store tokens
+    session = get_token_store().create_session(
+        access_token=access_token,
+        refresh_token=token_data.get("refresh_token"),
+        expires_in=token_data.get("expires_in", 3600),
+        user_id=user_id,
+    )
 
-    token_data = response.json()
+    # Have the galaxy, mood and track insights views ready by the first page load
+    get_precompute_worker().enqueue(session, force=True)
 
-    # ✅ Store tokens
-    ACCESS_TOKEN_STORE["access_token"] = token_data.get("access_token")
-    ACCESS_TOKEN_STORE["refresh_token"] = token_data.get("refresh_token")
+    response.set_cookie(
+        SESSION_COOKIE,
+        session.session_id,
+        httponly=True,
+        samesite="lax",
+        secure=os.getenv("TUNIVERSE_SECURE_COOKIES", "false").lower() == "true",
+    )
 
     return {
         "access_token_received": "access_token" in token_data,
@@ -97,4 +135,19 @@ def spotify_callback(code: str):
         "token_type": token_data.get("token_type"),
         "expires_in": token_data.get("expires_in"),
         "scopes": token_data.get("scope"),
+        "session_id": session.session_id,
     }
+
+
+@router.post("/logout")
+def spotify_logout(
+    response: Response,
+    tuniverse_session: Optional[str] = Cookie(default=None),
+    x_tuniverse_session: Optional[str] = Header(default=None),
+):
+    # Same sources as require_session, so header-only clients can log out too
+    session_id = tuniverse_session or x_tuniverse_session
+    if session_id:
+        get_token_store().delete(session_id)
+    response.delete_cookie(SESSION_COOKIE)
+    return {"logged_out": True}
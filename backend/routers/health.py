@@ -1,8 +1,85 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+
+from services.async_spotify_client import get_inflight_stats
+from services.http_session import get_pool_stats
+from services.layout_cache import get_layout_cache
+from services.library_store import get_library_store
+from services.metadata_store import get_metadata_store
+from services.metrics import render_metrics
+from services.precompute import get_precompute_worker
+from services.snapshot_service import get_snapshot_scheduler
+from services.snapshot_store import get_snapshot_store
+from services.response_cache import get_response_cache
+from services.spotify_auth import get_token_refresher
+from services.upstream_resilience import resilience_stats
+from services.upstream_scheduler import get_upstream_scheduler
+from services.view_store import get_view_store
 
 router = APIRouter()
 
 
 @router.get("/ping")
 def ping():
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+
+@router.get("/health/http-pool")
+def http_pool_stats():
+    return get_pool_stats()
+
+
+@router.get("/health/cache")
+def response_cache_stats():
+    return get_response_cache().stats()
+
+
+@router.get("/health/inflight")
+def inflight_stats():
+    return get_inflight_stats()
+
+
+@router.get("/health/metadata-store")
+def metadata_store_stats():
+    return get_metadata_store().stats()
+
+
+@router.get("/health/upstream")
+def upstream_scheduler_stats():
+    return get_upstream_scheduler().stats()
+
+
+@router.get("/health/resilience")
+def upstream_resilience_stats():
+    return resilience_stats()
+
+
+@router.get("/health/token-refresh")
+def token_refresh_stats():
+    return get_token_refresher().stats()
+
+
+@router.get("/health/library")
+def library_stats():
+    return get_library_store().stats()
+
+
+@router.get("/health/layout")
+def layout_stats():
+    return get_layout_cache().stats()
+
+
+@router.get("/health/snapshots")
+def snapshot_stats():
+    return {**get_snapshot_store().stats(), "scheduler": get_snapshot_scheduler().stats()}
+
+
+@router.get("/health/views")
+def view_stats():
+    return {**get_view_store().stats(), "worker": get_precompute_worker().stats()}
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    # async so the collector can read the event loop's thread limiter
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
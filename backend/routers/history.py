@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, time as day_time, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from routers.auth import require_session
+from services.serialization import json_response
+from services.snapshot_service import capture_snapshots, snapshot_as_of, snapshot_trend
+from services.snapshot_store import TIME_RANGES
+from services.token_store import SpotifySession
+
+router = APIRouter(
+    prefix="/history",
+    tags=["History"],
+)
+
+# URL spelling -> snapshot kind
+HISTORY_KINDS = {"top-artists": "top_artists", "top-tracks": "top_tracks", "mood": "mood"}
+HistoryKind = Literal["top-artists", "top-tracks", "mood"]
+
+
+def _parse_instant(value: Optional[str], end_of_day: bool) -> float:
+    """
+    ISO 8601 date or datetime -> epoch seconds (UTC when no offset is given).
+    A bare date means the start of that day, or its end for upper bounds.
+    """
+    if not value:
+        return datetime.now(timezone.utc).timestamp()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
+    if len(value) == 10 and end_of_day:
+        parsed = datetime.combine(parsed.date(), day_time.max)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _check_time_range(time_range: str) -> None:
+    if time_range not in TIME_RANGES:
+        raise HTTPException(status_code=400, detail=f"time_range must be one of {', '.join(TIME_RANGES)}")
+
+
+@router.get("/{kind}")
+async def get_snapshot_as_of(
+    kind: HistoryKind,
+    as_of: Optional[str] = None,
+    time_range: str = "medium_term",
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    The user's top list or mood as it was at `as_of` (default: now).
+    """
+    _check_time_range(time_range)
+    snapshot = await asyncio.to_thread(
+        snapshot_as_of, session.user_key, HISTORY_KINDS[kind], time_range, _parse_instant(as_of, end_of_day=True)
+    )
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No snapshot recorded at or before that date")
+    return json_response(snapshot)
+
+
+@router.get("/{kind}/trend")
+async def get_snapshot_trend(
+    kind: HistoryKind,
+    start: str,
+    end: Optional[str] = None,
+    time_range: str = "medium_term",
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    How the top list or mood changed between `start` and `end` (default: now).
+    """
+    _check_time_range(time_range)
+    start_at, end_at = _parse_instant(start, end_of_day=False), _parse_instant(end, end_of_day=True)
+    if start_at > end_at:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    trend = await asyncio.to_thread(
+        snapshot_trend, session.user_key, HISTORY_KINDS[kind], time_range, start_at, end_at
+    )
+    if trend is None:
+        raise HTTPException(status_code=404, detail="No snapshots recorded in that period")
+    return json_response(trend)
+
+
+@router.post("/capture")
+async def capture_now(session: SpotifySession = Depends(require_session)):
+    """
+    Snapshot the user's current top lists and mood right away.
+    """
+    changed = await capture_snapshots(session)
+    return {"changed_series": changed}
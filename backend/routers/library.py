@@ -0,0 +1,90 @@
+import asyncio
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from routers.auth import require_session
+from services.async_spotify_client import AsyncSpotifyClient
+from services.library_store import get_library_store
+from services.library_sync import ensure_library_synced
+from services.serialization import json_response
+from services.spotify_service import build_library_constellations, build_library_galaxy, track_insight
+from services.token_store import SpotifySession
+from transformers.constellations import MIN_SIMILARITY
+
+router = APIRouter(
+    prefix="/library",
+    tags=["Library"],
+)
+
+
+@router.get("")
+async def get_library_state(session: SpotifySession = Depends(require_session)):
+    """
+    Sync state of the local Liked Songs copy.
+    """
+    store = get_library_store()
+    state = await asyncio.to_thread(store.state, session.user_key)
+    count = await asyncio.to_thread(store.count, session.user_key)
+    return {"tracks": count, **(asdict(state) if state else {})}
+
+
+@router.get("/tracks")
+async def get_library_tracks(
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    Liked Songs from the local copy, newest first, synced first if due.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=session.access_token, user_key=session.user_key)
+    await ensure_library_synced(spotify_client)
+    page = await asyncio.to_thread(get_library_store().page, session.user_key, offset, limit)
+    items = [{"added_at": added_at, "track": track_insight(track)} for added_at, track in page]
+    return json_response({"items": items, "offset": offset, "limit": limit})
+
+
+@router.get("/galaxy")
+async def get_library_galaxy(
+    limit: int = Query(default=500, ge=1, le=5000),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    The `limit` artists most present in Liked Songs as a graph-layout galaxy.
+    """
+    return json_response(await build_library_galaxy(
+        access_token=session.access_token,
+        limit=limit,
+        user_key=session.user_key,
+    ))
+
+
+@router.get("/constellations")
+async def get_library_constellations(
+    limit: int = Query(default=2000, ge=1, le=10000),
+    min_similarity: float = Query(default=MIN_SIMILARITY, gt=0, le=1),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    The `limit` artists most present in Liked Songs, grouped by genre similarity.
+    """
+    return json_response(await build_library_constellations(
+        access_token=session.access_token,
+        limit=limit,
+        user_key=session.user_key,
+        min_similarity=min_similarity,
+    ))
+
+
+@router.post("/sync")
+async def sync_now(full: bool = False, session: SpotifySession = Depends(require_session)):
+    """
+    Sync right away; full=true re-reads the whole library. 409 while
+    another sync of the same library is running.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=session.access_token, user_key=session.user_key)
+    result = await ensure_library_synced(spotify_client, interval=0, full=full)
+    if result is None:
+        raise HTTPException(status_code=409, detail="A sync of this library is already running")
+    return result
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException
-
-from services.spotify_client import SpotifyClient
-from services.spotify_service import build_mood_response, build_track_insights, build_galaxy_response, build_top_artists_response, build_top_tracks_response
-from routers.auth import ACCESS_TOKEN_STORE
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from services.async_spotify_client import AsyncSpotifyClient
+from services.playlist_analytics import playlist_analytics_events
+from services.precompute import serve_view
+from services.spotify_service import UNIVERSE_SECTIONS, build_constellations_response, build_top_artists_response, build_top_tracks_response, build_universe_response
+from services.serialization import json_response
+from services.streaming import STREAM_MEDIA_TYPES, encode_events, library_tracks, stream_mood, stream_track_insights
+from services.token_store import SpotifySession
+from routers.auth import require_session
 from models.spotify_models import MoodResponse
+from transformers.constellations import MIN_SIMILARITY
 
 
 
@@ -15,76 +24,195 @@ router = APIRouter(
 
 
 @router.get("/me")
-def get_current_user():
-    access_token = ACCESS_TOKEN_STORE.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    spotify_client = SpotifyClient(access_token=access_token)
-    return spotify_client.get_current_user()
+async def get_current_user(session: SpotifySession = Depends(require_session)):
+    spotify_client = AsyncSpotifyClient(access_token=session.access_token, user_key=session.user_key)
+    return json_response(await spotify_client.get_current_user())
 
 
 @router.get("/top-artists")
-def get_top_artists(
+async def get_top_artists(
     time_range: str = "medium_term",
     limit: int = 10,
+    session: SpotifySession = Depends(require_session),
 ):
-    access_token = ACCESS_TOKEN_STORE.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    return build_top_artists_response(
-    access_token=access_token,
+    return json_response(await build_top_artists_response(
+    access_token=session.access_token,
     time_range=time_range,
     limit=limit,
-    )
+    user_key=session.user_key,
+    ))
 
 
 
 @router.get("/top-tracks")
-def get_top_tracks(
+async def get_top_tracks(
     time_range: str = "medium_term",
     limit: int = 10,
+    session: SpotifySession = Depends(require_session),
 ):
-    access_token = ACCESS_TOKEN_STORE.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    return build_top_tracks_response(
-    access_token=access_token,
+    return json_response(await build_top_tracks_response(
+    access_token=session.access_token,
     time_range=time_range,
     limit=limit,
-    )
+    user_key=session.user_key,
+    ))
 
 
 
 @router.get("/galaxy")
-def get_music_galaxy(
+async def get_music_galaxy(
     time_range: str = "medium_term",
     limit: int = 10,
+    layout: Literal["ladder", "graph"] = "ladder",
+    session: SpotifySession = Depends(require_session),
 ):
-    access_token = ACCESS_TOKEN_STORE.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+    """
+    layout=graph places artists by the genres they share instead of on a
+    ladder of orbits.
+    """
+    params = {"time_range": time_range, "limit": limit}
+    if layout != "ladder":
+        # Only non-default layouts in the key, so precomputed views still match
+        params["layout"] = layout
+    return await serve_view(session, "galaxy", params)
 
-    # Use the new service function
-    return build_galaxy_response(access_token=access_token, time_range=time_range, limit=limit)
 
 
+@router.get("/constellations")
+async def get_constellations(
+    time_range: str = "medium_term",
+    limit: int = Query(default=50, ge=1, le=50),
+    min_similarity: float = Query(default=MIN_SIMILARITY, gt=0, le=1),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    Top artists grouped by genre similarity; artists linked to no one at
+    `min_similarity` are listed as unclustered.
+    """
+    return json_response(await build_constellations_response(
+        access_token=session.access_token,
+        time_range=time_range,
+        limit=limit,
+        user_key=session.user_key,
+        min_similarity=min_similarity,
+    ))
 
-@router.get("/mood", response_model=MoodResponse)
-def get_music_mood(limit: int = 20):
-    access_token = ACCESS_TOKEN_STORE.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
 
-    return build_mood_response(access_token=access_token, limit=limit)
+@router.get("/mood", response_model=MoodResponse)
+async def get_music_mood(
+    limit: int = 20,
+    engine: Literal["genres", "audio"] = "genres",
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    engine=audio reads mood from the audio features of the whole synced
+    Liked Songs library instead of top artists' genres.
+    """
+    params = {"limit": limit}
+    if engine != "genres":
+        params["engine"] = engine
+    return await serve_view(session, "mood", params)
 
 
 @router.get("/track-insights")
-def get_track_insights(limit: int = 20):
-    access_token = ACCESS_TOKEN_STORE.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+async def get_track_insights(limit: int = 20, session: SpotifySession = Depends(require_session)):
+    return await serve_view(session, "track_insights", {"limit": limit})
+
 
-    return build_track_insights(access_token=access_token, limit=limit)
+@router.get("/universe")
+async def get_universe(
+    sections: Optional[str] = None,
+    time_range: str = "medium_term",
+    galaxy_limit: int = 10,
+    mood_limit: int = 20,
+    tracks_limit: int = 20,
+    top_limit: int = 10,
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    Everything the main page needs in one round trip. `sections` is a
+    comma-separated subset of galaxy, mood, track_insights, top_artists,
+    top_tracks (default: all).
+    """
+    requested = None
+    if sections:
+        requested = list(dict.fromkeys(s.strip() for s in sections.split(",") if s.strip()))
+        unknown = [section for section in requested if section not in UNIVERSE_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+
+    return json_response(await build_universe_response(
+        access_token=session.access_token,
+        sections=requested,
+        time_range=time_range,
+        galaxy_limit=galaxy_limit,
+        mood_limit=mood_limit,
+        tracks_limit=tracks_limit,
+        top_limit=top_limit,
+        user_key=session.user_key,
+    ))
+
+
+def _check_stream_source(source: str, playlist_id: Optional[str]) -> None:
+    if source == "playlist" and not playlist_id:
+        raise HTTPException(status_code=400, detail="playlist_id is required when source=playlist")
+
+
+@router.get("/stream/track-insights")
+async def stream_library_track_insights(
+    source: Literal["saved", "playlist", "library"] = "saved",
+    playlist_id: Optional[str] = None,
+    stream_format: Literal["ndjson", "sse"] = Query(default="ndjson", alias="format"),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    Track insights for a whole library or playlist, streamed as NDJSON or
+    server-sent events while pages arrive from Spotify. source=library
+    reads the locally synced Liked Songs instead of paging through Spotify.
+    """
+    _check_stream_source(source, playlist_id)
+    spotify_client = AsyncSpotifyClient(access_token=session.access_token, user_key=session.user_key)
+    events = stream_track_insights(library_tracks(spotify_client, source, playlist_id))
+    return StreamingResponse(encode_events(events, stream_format), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+
+@router.get("/stream/mood")
+async def stream_library_mood(
+    source: Literal["saved", "playlist", "library"] = "saved",
+    playlist_id: Optional[str] = None,
+    stream_format: Literal["ndjson", "sse"] = Query(default="ndjson", alias="format"),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    Mood analysis over a whole library or playlist, streamed like
+    /stream/track-insights.
+    """
+    _check_stream_source(source, playlist_id)
+    spotify_client = AsyncSpotifyClient(access_token=session.access_token, user_key=session.user_key)
+    events = stream_mood(spotify_client, library_tracks(spotify_client, source, playlist_id))
+    return StreamingResponse(encode_events(events, stream_format), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+
+@router.get("/playlists/{playlist_id}/analytics")
+async def get_playlist_analytics(
+    playlist_id: str,
+    timeout: float = Query(default=20, gt=0, le=120),
+    stream_format: Literal["json", "ndjson", "sse"] = Query(default="json", alias="format"),
+    session: SpotifySession = Depends(require_session),
+):
+    """
+    Artist and genre top lists, release years, popularity and mood for a
+    playlist of any size. format=json answers once, with complete=false and
+    what was analyzed so far if `timeout` seconds run out; ndjson/sse also
+    stream a progress event per page.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=session.access_token, user_key=session.user_key)
+    events = playlist_analytics_events(spotify_client, playlist_id, timeout)
+    if stream_format != "json":
+        return StreamingResponse(encode_events(events, stream_format), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+    summary = None
+    async for name, data in events:
+        if name != "progress":
+            summary = data
+    return json_response(summary)
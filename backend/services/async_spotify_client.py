@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import time
+import httpx
+from typing import AsyncIterator, Dict, List, Optional
+
+from services.batch_fetch import (
+    ARTISTS_BATCH_SIZE,
+    AUDIO_FEATURES_BATCH_SIZE,
+    TRACKS_BATCH_SIZE,
+    afetch_in_batches,
+    status_of,
+    unique_ids,
+)
+from services.http_session import get_async_http_client, get_http_config
+from services.metadata_store import get_metadata_store
+from services.metrics import observe_metadata_lookups, observe_upstream
+from services.pagination import PLAYLIST_TRACKS_PAGE_SIZE, SAVED_TRACKS_PAGE_SIZE, aiter_paged
+from services.response_cache import get_response_cache
+from services.singleflight import AsyncSingleFlight
+from services.spotify_client import BaseSpotifyClient, deny_endpoint, endpoint_denied
+from services.upstream_resilience import (
+    get_bulkhead,
+    get_circuit_breaker,
+    is_failure_status,
+    is_upstream_failure,
+    time_left,
+    upstream_deadline,
+)
+from services.upstream_scheduler import (
+    RETRYABLE_STATUSES,
+    UpstreamRateLimited,
+    get_upstream_scheduler,
+    parse_retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+# Parallel page-load requests for the same user share one upstream call
+_inflight = AsyncSingleFlight()
+
+
+class AsyncSpotifyClient(BaseSpotifyClient):
+    """
+    asyncio-native twin of SpotifyClient.
+    Same methods, but every call is awaited on the shared httpx pool,
+    so routes never park a threadpool slot while Spotify is thinking.
+    """
+
+    async def get(self, endpoint: str, params: Optional[Dict] = None, use_cache: bool = True):
+        cache_key = self._cache_key(endpoint, params)
+        if use_cache:
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            return await _inflight.do(
+                cache_key,
+                lambda: self._fetch(endpoint, params, cache_key if use_cache else None),
+            )
+        except Exception as e:
+            stale = get_response_cache().get_stale(cache_key) if use_cache and is_upstream_failure(e) else None
+            if stale is None:
+                raise
+            logger.warning("Serving stale %s after upstream failure: %s", endpoint, e)
+            return stale
+
+    async def _fetch(self, endpoint: str, params: Optional[Dict], cache_key):
+        """
+        Same deadline, circuit breaker and bulkhead as SpotifyClient._fetch.
+        """
+        url = self._url(endpoint)
+        scheduler = get_upstream_scheduler()
+        breaker = get_circuit_breaker("api")
+        config = get_http_config()
+        deadline = time.monotonic() + upstream_deadline(self.priority)
+        attempt = 0
+
+        while True:
+            breaker.before_call()
+            try:
+                # Rate-limit wait first, so only live requests hold bulkhead slots;
+                # it gives up rather than outlast the deadline
+                await scheduler.acquire_async(self.priority, max_wait=time_left(deadline))
+                async with get_bulkhead().aslot(self.user_key, max_wait=time_left(deadline)):
+                    remaining = time_left(deadline)
+                    started = time.perf_counter()
+                    try:
+                        response = await get_async_http_client().get(
+                            url,
+                            headers=self._get_headers(),
+                            params=params,
+                            timeout=httpx.Timeout(
+                                min(config.read_timeout, remaining),
+                                connect=min(config.connect_timeout, remaining),
+                            ),
+                        )
+                    except httpx.TransportError:
+                        observe_upstream(endpoint, "error", time.perf_counter() - started)
+                        raise
+            except httpx.TransportError:
+                breaker.record(False)
+                if attempt >= scheduler.max_retries:
+                    raise
+                delay = scheduler.backoff_delay(attempt)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+
+            breaker.record(not is_failure_status(response.status_code))
+            observe_upstream(endpoint, response.status_code, time.perf_counter() - started)
+
+            if response.status_code >= 400:
+                self._log_error(response.status_code, url, response.text)
+
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers)
+                scheduler.record_throttle(retry_after)
+                if attempt >= scheduler.max_retries or time.monotonic() + retry_after >= deadline:
+                    raise UpstreamRateLimited(retry_after)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUSES and attempt < scheduler.max_retries:
+                delay = scheduler.backoff_delay(attempt)
+                if time.monotonic() + delay < deadline:
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+
+            break
+
+        response.raise_for_status()
+        data = response.json()
+        if cache_key is not None:
+            get_response_cache().set(cache_key, data, size=len(response.content))
+        return data
+
+    # -------------------------
+    # User endpoints
+    # -------------------------
+
+    async def get_current_user(self):
+        return await self.get("/me")
+
+    async def get_top_artists(self, time_range: str = "medium_term", limit: int = 10):
+        return await self.get(
+            "/me/top/artists",
+            params={"time_range": time_range, "limit": limit},
+        )
+
+    async def get_top_tracks(self, time_range: str = "medium_term", limit: int = 10):
+        return await self.get(
+            "/me/top/tracks",
+            params={"time_range": time_range, "limit": limit},
+        )
+
+    async def get_saved_tracks(self, limit: int = 20, offset: int = 0, use_cache: bool = True):
+        """
+        User's Liked Songs
+        """
+        return await self.get(
+            "/me/tracks",
+            params={"limit": limit, "offset": offset},
+            use_cache=use_cache,
+        )
+
+    def aiter_saved_tracks(
+        self,
+        page_size: int = SAVED_TRACKS_PAGE_SIZE,
+        prefetch: int = 2,
+        use_cache: bool = False,
+    ) -> AsyncIterator[Dict]:
+        """
+        Every Liked Song, newest first, as an async iterator.
+        Later pages are fetched concurrently while the current one is consumed.
+        """
+        async def fetch_page(offset: int, limit: int):
+            return await self.get(
+                "/me/tracks",
+                params={"limit": limit, "offset": offset},
+                use_cache=use_cache,
+            )
+
+        return aiter_paged(fetch_page, page_size=page_size, prefetch=prefetch)
+
+    # -------------------------
+    # Playlist endpoints
+    # -------------------------
+
+    async def get_playlist_tracks(
+        self,
+        playlist_id: str,
+        limit: int = 50,
+        market: str = "US",
+        offset: int = 0,
+        fields: Optional[str] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Fetch tracks from a playlist.
+        Market param is IMPORTANT — prevents silent 404s.
+        `fields` is Spotify's field filter, to trim the page to what is used.
+        """
+        params = {
+            "limit": limit,
+            "offset": offset,
+            "market": market,
+        }
+        if fields:
+            params["fields"] = fields
+        return await self.get(
+            f"/playlists/{playlist_id}/tracks",
+            params=params,
+            use_cache=use_cache,
+        )
+
+    def aiter_playlist_tracks(
+        self,
+        playlist_id: str,
+        market: str = "US",
+        page_size: int = PLAYLIST_TRACKS_PAGE_SIZE,
+        prefetch: int = 2,
+        use_cache: bool = False,
+    ) -> AsyncIterator[Dict]:
+        """
+        Every item of a playlist as an async iterator, prefetching ahead.
+        """
+        async def fetch_page(offset: int, limit: int):
+            return await self.get(
+                f"/playlists/{playlist_id}/tracks",
+                params={"limit": limit, "offset": offset, "market": market},
+                use_cache=use_cache,
+            )
+
+        return aiter_paged(fetch_page, page_size=page_size, prefetch=prefetch)
+
+    # -------------------------
+    # Catalog lookups (read through the local metadata store)
+    # -------------------------
+
+    async def _read_through(
+        self,
+        kind: str,
+        endpoint: str,
+        response_key: str,
+        ids: List[str],
+        batch_size: int,
+    ):
+        """
+        Serve ids from the metadata store; batch-fetch only the unknown ones
+        from Spotify and bulk-upsert them for next time. Endpoints that
+        answered 403 are skipped for a while (see SpotifyClient._read_through).
+        """
+        store = get_metadata_store()
+        ids = unique_ids(ids)
+        known = await asyncio.to_thread(store.get_many, kind, ids)
+        missing = [item_id for item_id in ids if item_id not in known]
+        observe_metadata_lookups(kind, hits=len(ids) - len(missing), misses=len(missing))
+        if missing and endpoint_denied(endpoint):
+            return [known[item_id] for item_id in ids if item_id in known], missing
+
+        async def fetch_chunk(chunk: List[str]):
+            try:
+                result = await self.get(
+                    endpoint,
+                    params={"ids": ",".join(chunk)},
+                    use_cache=False,
+                )
+            except Exception as e:
+                if status_of(e) == 403:
+                    deny_endpoint(endpoint)
+                raise
+            return result.get(response_key, [])
+
+        fetched, failed_ids = await afetch_in_batches(missing, fetch_chunk, batch_size=batch_size)
+        if fetched:
+            await asyncio.to_thread(store.upsert_many, kind, fetched)
+        for item in fetched:
+            known[item["id"]] = item
+
+        return [known[item_id] for item_id in ids if item_id in known], failed_ids
+
+    async def get_tracks(self, track_ids: List[str]):
+        tracks, failed_ids = await self._read_through(
+            "tracks", "/tracks", "tracks", track_ids, TRACKS_BATCH_SIZE
+        )
+        return {"tracks": tracks, "failed_ids": failed_ids}
+
+    async def get_artists(self, artist_ids: List[str]):
+        artists, failed_ids = await self._read_through(
+            "artists", "/artists", "artists", artist_ids, ARTISTS_BATCH_SIZE
+        )
+        return {"artists": artists, "failed_ids": failed_ids}
+
+    # -------------------------
+    # Audio features
+    # -------------------------
+
+    async def get_audio_features(self, track_ids: List[str]):
+        """
+        Fetch audio features, locally stored ones first. Unknown ids go out in
+        chunks of 100, chunks in parallel; bad ids are isolated by bisection
+        and reported in failed_ids.
+        """
+        features, failed_ids = await self._read_through(
+            "audio_features", "/audio-features", "audio_features",
+            track_ids, AUDIO_FEATURES_BATCH_SIZE,
+        )
+        return {"audio_features": features, "failed_ids": failed_ids}
+
+
+def get_inflight_stats():
+    return _inflight.stats()
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Spotify's documented maximum ids per request for each multi-get endpoint
+AUDIO_FEATURES_BATCH_SIZE = 100
+TRACKS_BATCH_SIZE = 50
+ARTISTS_BATCH_SIZE = 50
+
+# Statuses that point at a specific bad id in the batch. Anything else
+# (401/403/429/5xx) fails the same way for every id, so bisecting would
+# only multiply the damage.
+BISECTABLE_STATUSES = {400, 404}
+
+# The app or token may not use the endpoint at all: once one chunk gets
+# one of these, chunks not yet sent are skipped instead of failing in turn
+DENIED_STATUSES = {401, 403}
+
+ChunkResult = Tuple[List[Any], List[str]]
+
+
+def chunked(ids: List[str], size: int) -> List[List[str]]:
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def unique_ids(ids: List[str]) -> List[str]:
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def status_of(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _split_result(ids: List[str], results: List[Any]) -> ChunkResult:
+    """
+    Spotify returns one slot per requested id, null for ids it cannot resolve.
+    """
+    found, failed = [], []
+    for item_id, item in zip(ids, results):
+        if item is None:
+            failed.append(item_id)
+        else:
+            found.append(item)
+    return found, failed
+
+
+def _fetch_chunk(ids: List[str], fetch: Callable[[List[str]], List[Any]], denied: threading.Event) -> ChunkResult:
+    if denied.is_set():
+        return [], list(ids)
+    try:
+        return _split_result(ids, fetch(ids))
+    except Exception as e:
+        status = status_of(e)
+        if status is None:
+            raise
+
+        if status in DENIED_STATUSES:
+            denied.set()
+        if status not in BISECTABLE_STATUSES:
+            logger.warning("Batch of %d ids failed with %s; not retrying", len(ids), status)
+            return [], list(ids)
+
+        if len(ids) == 1:
+            logger.info("Skipping restricted or unavailable id %s", ids[0])
+            return [], list(ids)
+
+        # Bisect: one bad id in 100 costs ~2*log2(100) calls, not 100
+        mid = len(ids) // 2
+        left_found, left_failed = _fetch_chunk(ids[:mid], fetch, denied)
+        right_found, right_failed = _fetch_chunk(ids[mid:], fetch, denied)
+        return left_found + right_found, left_failed + right_failed
+
+
+def fetch_in_batches(
+    ids: List[str],
+    fetch: Callable[[List[str]], List[Any]],
+    batch_size: int,
+    max_workers: int = 4,
+) -> ChunkResult:
+    """
+    Fetch ids in API-sized chunks on a small thread pool.
+    fetch(chunk) must return a list aligned with chunk (None for misses).
+    Returns (items, failed_ids), both in input order.
+    """
+    chunks = chunked(unique_ids(ids), batch_size)
+    if not chunks:
+        return [], []
+
+    denied = threading.Event()
+    if len(chunks) == 1:
+        results = [_fetch_chunk(chunks[0], fetch, denied)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            results = list(executor.map(lambda chunk: _fetch_chunk(chunk, fetch, denied), chunks))
+
+    items, failed = [], []
+    for found, missing in results:
+        items.extend(found)
+        failed.extend(missing)
+    return items, failed
+
+
+async def _afetch_chunk(
+    ids: List[str],
+    fetch: Callable[[List[str]], Awaitable[List[Any]]],
+    semaphore: asyncio.Semaphore,
+    denied: threading.Event,
+) -> ChunkResult:
+    try:
+        async with semaphore:
+            if denied.is_set():
+                return [], list(ids)
+            results = await fetch(ids)
+        return _split_result(ids, results)
+    except Exception as e:
+        status = status_of(e)
+        if status is None:
+            raise
+
+        if status in DENIED_STATUSES:
+            denied.set()
+        if status not in BISECTABLE_STATUSES:
+            logger.warning("Batch of %d ids failed with %s; not retrying", len(ids), status)
+            return [], list(ids)
+
+        if len(ids) == 1:
+            logger.info("Skipping restricted or unavailable id %s", ids[0])
+            return [], list(ids)
+
+        mid = len(ids) // 2
+        (left_found, left_failed), (right_found, right_failed) = await asyncio.gather(
+            _afetch_chunk(ids[:mid], fetch, semaphore, denied),
+            _afetch_chunk(ids[mid:], fetch, semaphore, denied),
+        )
+        return left_found + right_found, left_failed + right_failed
+
+
+async def afetch_in_batches(
+    ids: List[str],
+    fetch: Callable[[List[str]], Awaitable[List[Any]]],
+    batch_size: int,
+    concurrency: int = 4,
+) -> ChunkResult:
+    """
+    Async version of fetch_in_batches: chunks (and bisection halves) run
+    concurrently, capped at `concurrency` requests in flight.
+    """
+    chunks = chunked(unique_ids(ids), batch_size)
+    if not chunks:
+        return [], []
+
+    semaphore = asyncio.Semaphore(concurrency)
+    denied = threading.Event()
+    results = await asyncio.gather(*[_afetch_chunk(chunk, fetch, semaphore, denied) for chunk in chunks])
+
+    items, failed = [], []
+    for found, missing in results:
+        items.extend(found)
+        failed.extend(missing)
+    return items, failed
+
@@ -0,0 +1,237 @@
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class HTTPPoolConfig:
+    """
+    Tunables for the shared upstream connection pool.
+    Every value can be overridden with a TUNIVERSE_HTTP_* environment variable.
+    """
+    pool_connections: int = 4       # number of per-host pools kept (api + accounts)
+    pool_maxsize: int = 32          # keep-alive connections kept per host
+    pool_block: bool = False        # block instead of opening overflow connections
+    keep_alive: bool = True
+    keep_alive_idle: int = 60       # seconds before TCP keep-alive probes start
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "HTTPPoolConfig":
+        return cls(
+            pool_connections=_env_int("TUNIVERSE_HTTP_POOL_CONNECTIONS", cls.pool_connections),
+            pool_maxsize=_env_int("TUNIVERSE_HTTP_POOL_MAXSIZE", cls.pool_maxsize),
+            pool_block=_env_bool("TUNIVERSE_HTTP_POOL_BLOCK", cls.pool_block),
+            keep_alive=_env_bool("TUNIVERSE_HTTP_KEEP_ALIVE", cls.keep_alive),
+            keep_alive_idle=_env_int("TUNIVERSE_HTTP_KEEP_ALIVE_IDLE", cls.keep_alive_idle),
+            connect_timeout=_env_float("TUNIVERSE_HTTP_CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=_env_float("TUNIVERSE_HTTP_READ_TIMEOUT", cls.read_timeout),
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that turns on TCP keep-alive probes for pooled sockets,
+    so idle connections to Spotify are not silently dropped by NATs/LBs.
+    """
+
+    def __init__(self, keep_alive_idle: int = 60, **kwargs):
+        self.keep_alive_idle = keep_alive_idle
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        socket_options = list(HTTPConnection.default_socket_options)
+        socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+        # Linux-only knobs; other platforms keep the OS defaults
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keep_alive_idle))
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10))
+
+        kwargs["socket_options"] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+_session: Optional[requests.Session] = None
+_adapter: Optional[HTTPAdapter] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_config: Optional[HTTPPoolConfig] = None
+_lock = threading.Lock()
+
+
+def get_http_config() -> HTTPPoolConfig:
+    global _config
+    if _config is None:
+        _config = HTTPPoolConfig.from_env()
+    return _config
+
+
+def get_http_session() -> requests.Session:
+    """
+    Process-wide requests.Session shared by every SpotifyClient and the auth router.
+    Created lazily so environment variables loaded by dotenv are picked up.
+    """
+    global _session, _adapter
+
+    if _session is not None:
+        return _session
+
+    with _lock:
+        if _session is None:
+            config = get_http_config()
+
+            if config.keep_alive:
+                adapter = KeepAliveHTTPAdapter(
+                    keep_alive_idle=config.keep_alive_idle,
+                    pool_connections=config.pool_connections,
+                    pool_maxsize=config.pool_maxsize,
+                    pool_block=config.pool_block,
+                )
+            else:
+                adapter = HTTPAdapter(
+                    pool_connections=config.pool_connections,
+                    pool_maxsize=config.pool_maxsize,
+                    pool_block=config.pool_block,
+                )
+
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+            if not config.keep_alive:
+                session.headers["Connection"] = "close"
+
+            _adapter = adapter
+            _session = session
+
+    return _session
+
+
+def close_http_session() -> None:
+    global _session, _adapter
+
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _adapter = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Process-wide httpx.AsyncClient used by AsyncSpotifyClient.
+    Shares the same pool sizing and timeouts as the sync session.
+    """
+    global _async_client
+
+    if _async_client is None or _async_client.is_closed:
+        config = get_http_config()
+        limits = httpx.Limits(
+            max_connections=config.pool_maxsize * config.pool_connections,
+            max_keepalive_connections=config.pool_maxsize if config.keep_alive else 0,
+            keepalive_expiry=config.keep_alive_idle,
+        )
+        timeout = httpx.Timeout(config.read_timeout, connect=config.connect_timeout)
+        _async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    return _async_client
+
+
+async def close_async_http_client() -> None:
+    global _async_client
+
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+
+
+def _async_pool_stats() -> Optional[Dict[str, Any]]:
+    client = _async_client
+    if client is None or client.is_closed:
+        return None
+
+    # httpx does not expose its pool publicly; httpcore's pool does
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+
+    return {
+        "connections": len(connections),
+        "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+    }
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Snapshot of connection-pool usage, per upstream host.
+    connections_created much lower than requests means keep-alive is doing its job.
+    """
+    config = get_http_config()
+    stats: Dict[str, Any] = {
+        "config": {
+            "pool_connections": config.pool_connections,
+            "pool_maxsize": config.pool_maxsize,
+            "pool_block": config.pool_block,
+            "keep_alive": config.keep_alive,
+            "connect_timeout": config.connect_timeout,
+            "read_timeout": config.read_timeout,
+        },
+        "hosts": [],
+        "async": _async_pool_stats(),
+    }
+
+    adapter = _adapter
+    if adapter is None:
+        return stats
+
+    pools = adapter.poolmanager.pools
+    for pool_key in pools.keys():
+        pool = pools.get(pool_key)
+        if pool is None:
+            continue
+
+        queue = pool.pool
+        if queue is None:
+            continue
+
+        # urllib3 pre-fills the queue with None placeholders; real sockets are the rest
+        slots = list(queue.queue)
+        stats["hosts"].append({
+            "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+            "requests": pool.num_requests,
+            "connections_created": pool.num_connections,
+            "in_use": queue.maxsize - len(slots),
+            "idle_connections": sum(1 for conn in slots if conn is not None),
+            "max_size": queue.maxsize,
+        })
+
+    return stats
@@ -0,0 +1,140 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.records import ArtistRecord
+from transformers.galaxy_layout import (
+    INCREMENTAL_MAX_SHARE,
+    INCREMENTAL_MIN_CHANGES,
+    Positions,
+    extend_layout,
+    layout_positions,
+)
+
+# Bump when the layout algorithm changes so cached layouts are recomputed
+LAYOUT_VERSION = 1
+
+
+def layout_input_hash(artists: Sequence[ArtistRecord]) -> str:
+    """
+    Order-independent fingerprint of what positions depend on: the artist
+    set and each artist's genres (ranks only affect planet sizes).
+    """
+    digest = hashlib.sha256(str(LAYOUT_VERSION).encode())
+    for artist_id, genres in sorted((artist.id, artist.genres) for artist in artists):
+        digest.update(artist_id.encode())
+        digest.update("\x1f".join(genres).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:24]
+
+
+@dataclass
+class _UserLayout:
+    input_hash: str
+    positions: Positions
+    genres: Dict[str, Tuple[str, ...]]
+    changes_since_full: int
+
+
+class LayoutCache:
+    """
+    Galaxy layouts per user, keyed by the hash of their input.
+
+    Holds the latest layout per user (LRU-bounded). A request with the same
+    input is a lookup; one where only a few artists changed extends the
+    previous layout, so the galaxy stays put instead of reshuffling; after
+    enough accumulated changes the layout is recomputed from scratch.
+    """
+
+    def __init__(self, max_users: int = 1024, seed: int = 0):
+        self.max_users = max_users
+        self.seed = seed
+        self._layouts: "OrderedDict[str, _UserLayout]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+
+    def positions(self, user_key: str, artists: Sequence[ArtistRecord]) -> np.ndarray:
+        """
+        (x, y) per artist, in input order. CPU-bound for large inputs; call
+        it off the event loop.
+        """
+        input_hash = layout_input_hash(artists)
+        with self._lock:
+            cached = self._layouts.get(user_key)
+            if cached is not None:
+                self._layouts.move_to_end(user_key)
+
+        if cached is not None and cached.input_hash == input_hash:
+            with self._lock:
+                self.hits += 1
+            return np.array([cached.positions[artist.id] for artist in artists]).reshape(-1, 2)
+
+        positions = None
+        changes = 0
+        if cached is not None:
+            # Count changes (added, regenred and removed artists) since the
+            # last full layout, so incremental updates cannot drift
+            # arbitrarily far from a fresh one
+            changes = (
+                cached.changes_since_full
+                + sum(1 for artist in artists if cached.genres.get(artist.id) != artist.genres)
+                + len(cached.genres.keys() - {artist.id for artist in artists})
+            )
+            if changes <= max(INCREMENTAL_MIN_CHANGES, INCREMENTAL_MAX_SHARE * len(artists)):
+                positions = extend_layout(artists, cached.positions, cached.genres)
+
+        incremental = positions is not None
+        if not incremental:
+            positions = layout_positions(artists, seed=self.seed)
+            changes = 0
+
+        entry = _UserLayout(
+            input_hash=input_hash,
+            positions={artist.id: (x, y) for artist, (x, y) in zip(artists, positions.tolist())},
+            genres={artist.id: artist.genres for artist in artists},
+            changes_since_full=changes,
+        )
+        with self._lock:
+            if incremental:
+                self.incremental += 1
+            else:
+                self.full += 1
+            self._layouts[user_key] = entry
+            self._layouts.move_to_end(user_key)
+            while len(self._layouts) > self.max_users:
+                self._layouts.popitem(last=False)
+        return positions
+
+    def invalidate_user(self, user_key: str) -> None:
+        with self._lock:
+            self._layouts.pop(user_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._layouts),
+                "hits": self.hits,
+                "incremental": self.incremental,
+                "full": self.full,
+            }
+
+
+_cache: Optional[LayoutCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_layout_cache() -> LayoutCache:
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LayoutCache()
+
+    return _cache
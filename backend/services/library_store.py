@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models.records import AlbumRecord, TrackRecord
+from services.sqlite_store import MAX_SQL_VARIABLES, SQLiteStore, default_db_path, placeholders, sql_chunks
+
+
+def library_key(item: Dict[str, Any]) -> Optional[str]:
+    """
+    Local files in Liked Songs have no Spotify id, only a uri.
+    """
+    track = item.get("track") or {}
+    return track.get("id") or track.get("uri")
+
+
+# (library key, added_at, record) for one saved track
+LibraryEntry = Tuple[str, str, TrackRecord]
+
+
+def library_entries(items: Iterable[Dict[str, Any]], albums: Optional[Dict[str, AlbumRecord]] = None) -> List[LibraryEntry]:
+    """
+    /me/tracks items as entries, parsed once; `albums` shares album records
+    across calls.
+    """
+    albums = {} if albums is None else albums
+    return [
+        (library_key(item), item["added_at"], TrackRecord.from_json(item["track"], albums))
+        for item in items
+        if library_key(item) and item.get("added_at")
+    ]
+
+
+def _decode_track(data: str, albums: Dict[str, AlbumRecord]) -> TrackRecord:
+    value = json.loads(data)
+    if isinstance(value, dict):
+        # Stored as a full Spotify object before tracks were kept compact
+        return TrackRecord.from_json(value, albums)
+    return TrackRecord.from_compact(value, albums)
+
+
+@dataclass
+class LibrarySyncState:
+    watermark: Optional[str]    # added_at of the newest saved track
+    total: int                  # Spotify's count at the last sync
+    synced_at: float
+    reconciled_at: float        # last full walk of the library
+
+
+class LibraryStore(SQLiteStore):
+    """
+    Local copy of each user's Liked Songs, kept in Spotify's order, with
+    tracks stored in TrackRecord's compact positional form.
+
+    `seq` mirrors Spotify's newest-first ordering (higher = newer), so the
+    local list lines up offset-for-offset with /me/tracks, which is what
+    lets a sync locate removals by probing a few pages.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS library_tracks (
+        user_id TEXT NOT NULL,
+        track_id TEXT NOT NULL,
+        added_at TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        track TEXT NOT NULL,
+        PRIMARY KEY (user_id, track_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS library_tracks_order ON library_tracks (user_id, seq);
+    CREATE TABLE IF NOT EXISTS library_syncs (
+        user_id TEXT PRIMARY KEY,
+        watermark TEXT,
+        total INTEGER NOT NULL DEFAULT 0,
+        synced_at REAL NOT NULL DEFAULT 0,
+        reconciled_at REAL NOT NULL DEFAULT 0,
+        claimed_until REAL NOT NULL DEFAULT 0
+    );
+    """
+
+    @staticmethod
+    def _rows(user_id: str, entries: List[LibraryEntry], top_seq: int):
+        # entries are newest first; the first gets the highest seq
+        return [
+            (user_id, key, added_at, top_seq - index,
+             json.dumps(record.to_compact(), separators=(",", ":")))
+            for index, (key, added_at, record) in enumerate(entries)
+        ]
+
+    def known(self, user_id: str, track_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        {track_id: added_at} for the given ids already in the local library.
+        """
+        track_ids = list(track_ids)
+        found: Dict[str, str] = {}
+        conn = self.connection()
+        for chunk in sql_chunks(track_ids, size=MAX_SQL_VARIABLES - 1):
+            rows = conn.execute(
+                f"SELECT track_id, added_at FROM library_tracks "
+                f"WHERE user_id = ? AND track_id IN ({placeholders(len(chunk))})",
+                (user_id, *chunk),
+            )
+            found.update(rows)
+        return found
+
+    def add_newest(self, user_id: str, entries: List[LibraryEntry]) -> None:
+        """
+        Put entries (newest first) ahead of everything stored; re-saved
+        tracks move to the top.
+        """
+        if not entries:
+            return
+        with self.transaction() as conn:
+            top_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM library_tracks WHERE user_id = ?", (user_id,)
+            ).fetchone()[0] + len(entries)
+            conn.executemany(
+                "INSERT INTO library_tracks (user_id, track_id, added_at, seq, track) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id, track_id) DO UPDATE SET "
+                "added_at = excluded.added_at, seq = excluded.seq, track = excluded.track",
+                self._rows(user_id, entries, top_seq),
+            )
+
+    def replace(self, user_id: str, entries: List[LibraryEntry]) -> None:
+        """
+        Swap in a complete library (newest first) from a full walk.
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM library_tracks WHERE user_id = ?", (user_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO library_tracks (user_id, track_id, added_at, seq, track) VALUES (?, ?, ?, ?, ?)",
+                self._rows(user_id, entries, len(entries)),
+            )
+
+    def remove(self, user_id: str, track_ids: List[str]) -> None:
+        with self.transaction() as conn:
+            for chunk in sql_chunks(track_ids, size=MAX_SQL_VARIABLES - 1):
+                conn.execute(
+                    f"DELETE FROM library_tracks WHERE user_id = ? AND track_id IN ({placeholders(len(chunk))})",
+                    (user_id, *chunk),
+                )
+
+    def count(self, user_id: str) -> int:
+        return self.connection().execute(
+            "SELECT COUNT(*) FROM library_tracks WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def ordered_ids(self, user_id: str) -> List[str]:
+        """
+        Track ids in Spotify's order, newest first.
+        """
+        rows = self.connection().execute(
+            "SELECT track_id FROM library_tracks WHERE user_id = ? ORDER BY seq DESC", (user_id,)
+        )
+        return [track_id for (track_id,) in rows]
+
+    def page(self, user_id: str, offset: int = 0, limit: int = 50) -> List[Tuple[str, TrackRecord]]:
+        """
+        (added_at, track) pairs, newest first.
+        """
+        rows = self.connection().execute(
+            "SELECT added_at, track FROM library_tracks WHERE user_id = ? ORDER BY seq DESC LIMIT ? OFFSET ?",
+            (user_id, limit, offset),
+        )
+        albums: Dict[str, AlbumRecord] = {}
+        return [(added_at, _decode_track(track, albums)) for added_at, track in rows]
+
+    def read_batch(
+        self, user_id: str, before_seq: Optional[int] = None, limit: int = 500
+    ) -> Tuple[List[Tuple[str, TrackRecord]], Optional[int]]:
+        """
+        Up to `limit` (added_at, track) pairs older than `before_seq` (None = from the newest),
+        plus the seq to continue from. Keyset pagination, so walking the
+        whole library is a series of index range reads.
+        """
+        rows = self.connection().execute(
+            "SELECT seq, added_at, track FROM library_tracks WHERE user_id = ? AND seq < ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (user_id, 2 ** 63 - 1 if before_seq is None else before_seq, limit),
+        ).fetchall()
+        albums: Dict[str, AlbumRecord] = {}
+        items = [(added_at, _decode_track(track, albums)) for _, added_at, track in rows]
+        return items, rows[-1][0] if rows else None
+
+    def state(self, user_id: str) -> Optional[LibrarySyncState]:
+        row = self.connection().execute(
+            "SELECT watermark, total, synced_at, reconciled_at FROM library_syncs WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return LibrarySyncState(*row) if row else None
+
+    def claim_sync(self, user_id: str, interval_seconds: float, lease_seconds: float = 120) -> bool:
+        """
+        Take the sync lease for a user last synced over `interval_seconds`
+        ago (0 = regardless); False if not due or another worker has it.
+        """
+        now = time.time()
+        conn = self.connection()
+        conn.execute("INSERT OR IGNORE INTO library_syncs (user_id) VALUES (?)", (user_id,))
+        cursor = conn.execute(
+            "UPDATE library_syncs SET claimed_until = ? "
+            "WHERE user_id = ? AND synced_at <= ? AND claimed_until < ?",
+            (now + lease_seconds, user_id, now - interval_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def mark_synced(self, user_id: str, watermark: Optional[str], total: int, reconciled: bool) -> None:
+        now = time.time()
+        self.connection().execute(
+            "INSERT INTO library_syncs (user_id, watermark, total, synced_at, reconciled_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET watermark = excluded.watermark, total = excluded.total, "
+            "synced_at = excluded.synced_at, claimed_until = 0, "
+            "reconciled_at = CASE WHEN ? THEN excluded.synced_at ELSE reconciled_at END",
+            (user_id, watermark, total, now, now if reconciled else 0, reconciled),
+        )
+
+    def release_claim(self, user_id: str) -> None:
+        self.connection().execute(
+            "UPDATE library_syncs SET claimed_until = 0 WHERE user_id = ?",
+            (user_id,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        conn = self.connection()
+        return {
+            "tracks": conn.execute("SELECT COUNT(*) FROM library_tracks").fetchone()[0],
+            "users": conn.execute("SELECT COUNT(*) FROM library_syncs WHERE synced_at > 0").fetchone()[0],
+        }
+
+
+_store: Optional[LibraryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_library_store() -> LibraryStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("TUNIVERSE_LIBRARY_DB") or default_db_path("library.db")
+                _store = LibraryStore(path)
+
+    return _store
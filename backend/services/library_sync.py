@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from models.records import AlbumRecord, TrackRecord
+from services.async_spotify_client import AsyncSpotifyClient
+from services.library_store import LibraryEntry, LibraryStore, get_library_store, library_entries, library_key
+from services.pagination import SAVED_TRACKS_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+PAGE = SAVED_TRACKS_PAGE_SIZE
+
+
+class _OutOfSync(Exception):
+    """
+    The library changed in a way removal probing cannot explain.
+    """
+
+
+def library_sync_interval() -> float:
+    """
+    Minimum seconds between on-demand syncs (TUNIVERSE_LIBRARY_SYNC_INTERVAL).
+    """
+    return float(os.getenv("TUNIVERSE_LIBRARY_SYNC_INTERVAL", "300"))
+
+
+def library_reconcile_interval() -> float:
+    """
+    Seconds between full walks of a library (TUNIVERSE_LIBRARY_RECONCILE_INTERVAL).
+    """
+    return float(os.getenv("TUNIVERSE_LIBRARY_RECONCILE_INTERVAL", str(7 * 86400)))
+
+
+def _keyed(items: List[Dict]) -> List[Dict]:
+    return [item for item in items if library_key(item) and item.get("added_at")]
+
+
+async def _find_removals(
+    local_ids: List[str],
+    total: int,
+    fetch_page,
+) -> List[str]:
+    """
+    Local ids no longer in Spotify's list, given that everything newer has
+    already been added (so the two lists differ only by removals).
+
+    A page that lines up offset-for-offset with the local list has no
+    removals above it, so the first misaligned page is found by binary
+    search; diffing it yields the removals there. Repeats until the local
+    count matches `total`, typically a handful of page reads.
+    """
+    removed: List[str] = []
+    pages = math.ceil(total / PAGE)
+    aligned = 0  # pages before this one line up
+
+    async def page_ids(index: int) -> List[str]:
+        return [library_key(item) for item in _keyed((await fetch_page(index * PAGE)).get("items", []))]
+
+    while len(local_ids) > total:
+        low, high = aligned, pages
+        while low < high:
+            middle = (low + high) // 2
+            ids = await page_ids(middle)
+            if ids == local_ids[middle * PAGE:middle * PAGE + len(ids)]:
+                low = middle + 1
+            else:
+                high = middle
+        if low == pages:
+            # Everything Spotify returns lines up; the extras are at the end
+            removed.extend(local_ids[total:])
+            del local_ids[total:]
+            break
+
+        position = low * PAGE
+        for track_id in await page_ids(low):
+            while position < len(local_ids) and local_ids[position] != track_id:
+                removed.append(local_ids.pop(position))
+            if position == len(local_ids):
+                raise _OutOfSync(track_id)
+            position += 1
+        aligned = low + 1
+
+    return removed
+
+
+async def _full_sync(client: AsyncSpotifyClient, store: LibraryStore) -> Dict[str, Any]:
+    # Parsed as pages arrive, so only compact records are held for the walk
+    albums: Dict[str, AlbumRecord] = {}
+    entries: List[LibraryEntry] = []
+    async for item in client.aiter_saved_tracks(page_size=PAGE):
+        entries.extend(library_entries((item,), albums))
+    before = await asyncio.to_thread(store.count, client.user_key)
+    await asyncio.to_thread(store.replace, client.user_key, entries)
+    return {
+        "mode": "full",
+        "total": len(entries),
+        "added": max(0, len(entries) - before),
+        "removed": max(0, before - len(entries)),
+        "api_calls": max(1, math.ceil(len(entries) / PAGE)),
+        "watermark": entries[0][1] if entries else None,
+    }
+
+
+async def sync_library(
+    client: AsyncSpotifyClient,
+    store: Optional[LibraryStore] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    Bring the local copy of the user's Liked Songs up to date.
+
+    /me/tracks is newest first, so pages are read only until an item we
+    already hold (same id and added_at) shows up; for a typical sync that is
+    the first page, one call. Spotify's `total` then tells us whether
+    anything was removed, and if so the removals are located by probing
+    pages (see _find_removals). A full walk runs on first sync, when the
+    library changed in an unexpected way, and every reconcile interval.
+    """
+    store = store or get_library_store()
+    user_id = client.user_key
+    state = await asyncio.to_thread(store.state, user_id)
+
+    due_reconcile = state is None or state.reconciled_at < time.time() - library_reconcile_interval()
+    if full or due_reconcile or not await asyncio.to_thread(store.count, user_id):
+        result = await _full_sync(client, store)
+        await asyncio.to_thread(store.mark_synced, user_id, result["watermark"], result["total"], True)
+        return result
+
+    pages: Dict[int, Dict] = {}
+
+    async def fetch_page(offset: int) -> Dict:
+        if offset not in pages:
+            pages[offset] = await client.get_saved_tracks(limit=PAGE, offset=offset, use_cache=False)
+        return pages[offset]
+
+    first = await fetch_page(0)
+    total = first.get("total", 0)
+
+    new_entries: List[LibraryEntry] = []
+    page, offset = first, 0
+    while True:
+        entries = library_entries(page.get("items", []))
+        known = await asyncio.to_thread(store.known, user_id, [key for key, _, _ in entries])
+        reached = False
+        for entry in entries:
+            if known.get(entry[0]) == entry[1]:
+                reached = True
+                break
+            new_entries.append(entry)
+        if reached or not page.get("next"):
+            break
+        offset += PAGE
+        page = await fetch_page(offset)
+
+    await asyncio.to_thread(store.add_newest, user_id, new_entries)
+
+    removed: List[str] = []
+    local_count = await asyncio.to_thread(store.count, user_id)
+    try:
+        if local_count > total:
+            local_ids = await asyncio.to_thread(store.ordered_ids, user_id)
+            removed = await _find_removals(local_ids, total, fetch_page)
+            await asyncio.to_thread(store.remove, user_id, removed)
+        elif local_count < total:
+            raise _OutOfSync("local library is missing items")
+    except _OutOfSync as e:
+        logger.warning("Library out of sync for %s, doing a full walk: %s", user_id, e)
+        result = await _full_sync(client, store)
+        result["api_calls"] += len(pages)
+        await asyncio.to_thread(store.mark_synced, user_id, result["watermark"], result["total"], True)
+        return result
+
+    newest = _keyed(first.get("items", []))
+    watermark = newest[0]["added_at"] if newest else None
+    await asyncio.to_thread(store.mark_synced, user_id, watermark, total, False)
+    return {
+        "mode": "incremental",
+        "total": total,
+        "added": len(new_entries),
+        "removed": len(removed),
+        "api_calls": len(pages),
+        "watermark": watermark,
+    }
+
+
+async def ensure_library_synced(
+    client: AsyncSpotifyClient,
+    store: Optional[LibraryStore] = None,
+    interval: Optional[float] = None,
+    full: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Sync unless the library was synced within `interval` seconds (default:
+    the sync interval; 0 = regardless) or another worker is syncing it
+    right now. Returns the sync result, if one ran.
+    """
+    store = store or get_library_store()
+    interval = library_sync_interval() if interval is None else interval
+    if not await asyncio.to_thread(store.claim_sync, client.user_key, interval):
+        return None
+    try:
+        return await sync_library(client, store, full=full)
+    except BaseException:
+        await asyncio.to_thread(store.release_claim, client.user_key)
+        raise
+
+
+async def library_items(
+    user_id: str, store: Optional[LibraryStore] = None, batch_size: int = 500
+) -> AsyncIterator[Tuple[str, TrackRecord]]:
+    """
+    The local library, newest first, as (added_at, track) pairs.
+    """
+    store = store or get_library_store()
+    before_seq = None
+    while True:
+        items, before_seq = await asyncio.to_thread(store.read_batch, user_id, before_seq, batch_size)
+        for item in items:
+            yield item
+        if len(items) < batch_size:
+            return
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from services.sqlite_store import SQLiteStore, default_db_path, placeholders, sql_chunks
+
+# How long a stored record is trusted before we go back to Spotify.
+# None = never expires (audio features are fixed per track).
+DEFAULT_MAX_AGE: Dict[str, Optional[float]] = {
+    "tracks": 30 * 86400,
+    "artists": 7 * 86400,      # genres and images drift slowly
+    "audio_features": None,
+}
+
+
+class MetadataStore(SQLiteStore):
+    """
+    On-disk, cross-user store of Spotify objects keyed by Spotify id.
+    SpotifyClient reads through it so the network is only hit for ids
+    we have never seen (or whose record is older than its max age).
+    """
+    KINDS = ("tracks", "artists", "audio_features")
+
+    SCHEMA = "".join(
+        f"""
+        CREATE TABLE IF NOT EXISTS {kind} (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+        """
+        for kind in KINDS
+    )
+
+    def __init__(self, path: str, max_age: Optional[Dict[str, Optional[float]]] = None):
+        self.max_age = dict(DEFAULT_MAX_AGE, **(max_age or {}))
+        super().__init__(path)
+
+    def _table(self, kind: str) -> str:
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown metadata kind: {kind}")
+        return kind
+
+    def get_many(self, kind: str, ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Batch lookup; returns {id: object} for the ids we hold fresh records for.
+        """
+        table = self._table(kind)
+        ids = list(dict.fromkeys(ids))
+        max_age = self.max_age.get(kind)
+        min_fetched_at = time.time() - max_age if max_age is not None else 0
+
+        found: Dict[str, Dict] = {}
+        conn = self.connection()
+        for chunk in sql_chunks(ids):
+            rows = conn.execute(
+                f"SELECT id, data FROM {table} "
+                f"WHERE id IN ({placeholders(len(chunk))}) AND fetched_at >= ?",
+                (*chunk, min_fetched_at),
+            )
+            for item_id, data in rows:
+                found[item_id] = json.loads(data)
+        return found
+
+    def upsert_many(self, kind: str, items: List[Dict]) -> int:
+        """
+        Bulk insert-or-replace objects that carry their own "id".
+        """
+        table = self._table(kind)
+        now = time.time()
+        rows = [
+            (item["id"], json.dumps(item, separators=(",", ":")), now)
+            for item in items
+            if item and item.get("id")
+        ]
+        if not rows:
+            return 0
+
+        with self.transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO {table} (id, data, fetched_at) VALUES (?, ?, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET data = excluded.data, fetched_at = excluded.fetched_at",
+                rows,
+            )
+        return len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        conn = self.connection()
+        return {
+            kind: conn.execute(f"SELECT COUNT(*) FROM {kind}").fetchone()[0]
+            for kind in self.KINDS
+        }
+
+
+_store: Optional[MetadataStore] = None
+_store_lock = threading.Lock()
+
+
+def get_metadata_store() -> MetadataStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("TUNIVERSE_METADATA_DB") or default_db_path("metadata.db")
+                _store = MetadataStore(path)
+
+    return _store
@@ -0,0 +1,263 @@
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import anyio.to_thread
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_LATENCY = Histogram(
+    "tuniverse_http_request_duration_seconds",
+    "API request latency by route template and status.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "tuniverse_http_requests_in_progress",
+    "API requests currently being served.",
+    ["method"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "tuniverse_spotify_request_duration_seconds",
+    "Spotify call latency (one HTTP attempt) by endpoint template and status.",
+    ["endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+METADATA_LOOKUPS = Counter(
+    "tuniverse_metadata_store_lookups_total",
+    "Metadata store read-through lookups per id.",
+    ["kind", "result"],
+)
+VIEW_READS = Counter(
+    "tuniverse_view_reads_total",
+    "Materialized view reads: fresh hit, stale (recomputed) or miss; stale_fallback when a recompute failed and the stale view was served.",
+    ["view", "result"],
+)
+STAGE_LATENCY = Histogram(
+    "tuniverse_stage_duration_seconds",
+    "Time spent per service stage (fetch, transform, serialize) by route.",
+    ["route", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "tuniverse_event_loop_lag_seconds",
+    "How late the event loop wakes a sleeping task; high values mean blocking code on the loop.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Path segments followed by a Spotify id, for bounded upstream label values
+_ID_PARENTS = {"playlists", "artists", "albums", "tracks", "users", "shows", "episodes", "audio-analysis"}
+
+# Stage timings of the request being served; observed once its route is known
+_stage_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "tuniverse_stage_spans", default=None
+)
+
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    /playlists/37i9dQZF1DX.../tracks -> /playlists/{id}/tracks
+    """
+    parts = endpoint.split("?", 1)[0].strip("/").split("/")
+    templated = [
+        "{id}" if index and parts[index - 1] in _ID_PARENTS else part
+        for index, part in enumerate(parts)
+    ]
+    return "/" + "/".join(templated)
+
+
+def observe_upstream(endpoint: str, status, seconds: float) -> None:
+    UPSTREAM_LATENCY.labels(endpoint_template(endpoint), str(status)).observe(seconds)
+
+
+def observe_metadata_lookups(kind: str, hits: int, misses: int) -> None:
+    if hits:
+        METADATA_LOOKUPS.labels(kind, "hit").inc(hits)
+    if misses:
+        METADATA_LOOKUPS.labels(kind, "miss").inc(misses)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    spans = _stage_spans.get()
+    if spans is None:
+        STAGE_LATENCY.labels("background", name).observe(seconds)
+    else:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time one stage of a service builder:
+
+        with stage("fetch"):
+            top_artists = await client.get_top_artists()
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    Request latency per route template, plus the stage spans recorded while
+    serving it. Streaming responses are timed until their last chunk.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        spans: List[Tuple[str, float]] = []
+        token = _stage_spans.set(spans)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _stage_spans.reset(token)
+
+            # Set by the router once matched; templated, so label values stay bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(method, route_path, str(status)).observe(elapsed)
+            for name, seconds in spans:
+                STAGE_LATENCY.labels(route_path, name).observe(seconds)
+
+
+class ServiceStatsCollector:
+    """
+    Exposes the counters the services already keep (response cache,
+    single-flight, upstream scheduler, circuit breakers, bulkhead) and worker thread pool saturation,
+    read at scrape time.
+    """
+
+    def describe(self):
+        # Keeps the registry from calling collect() at registration time
+        return []
+
+    def collect(self):
+        # Imported here: the clients import this module for their own metrics
+        from services.async_spotify_client import get_inflight_stats
+        from services.response_cache import get_response_cache
+        from services.upstream_resilience import OPEN, get_bulkhead, resilience_stats
+        from services.upstream_scheduler import get_upstream_scheduler
+
+        cache = get_response_cache().stats()
+        for name in ("hits", "misses", "evictions", "expirations", "invalidations", "stale_hits"):
+            yield CounterMetricFamily(
+                f"tuniverse_response_cache_{name}", f"Response cache {name}.", value=cache[name]
+            )
+        yield GaugeMetricFamily("tuniverse_response_cache_hit_ratio", "Response cache hit ratio since start.", value=cache["hit_ratio"])
+        yield GaugeMetricFamily("tuniverse_response_cache_entries", "Cached responses.", value=cache["entries"])
+        yield GaugeMetricFamily("tuniverse_response_cache_bytes", "Bytes held by the response cache.", value=cache["bytes"])
+
+        flight = get_inflight_stats()
+        yield CounterMetricFamily("tuniverse_singleflight_calls", "Upstream fetches requested through single-flight.", value=flight["calls"])
+        yield CounterMetricFamily("tuniverse_singleflight_shared", "Requests served by joining an in-flight fetch.", value=flight["shared"])
+
+        scheduler = get_upstream_scheduler().stats()
+        yield GaugeMetricFamily("tuniverse_upstream_tokens_available", "Spotify rate-limit tokens left.", value=scheduler["tokens_available"])
+        yield GaugeMetricFamily("tuniverse_upstream_throttled", "1 while Spotify's Retry-After window is open.", value=int(scheduler["throttled"]))
+        queue_depth = GaugeMetricFamily("tuniverse_upstream_queue_depth", "Callers waiting for a rate-limit token.", labels=["priority"])
+        for priority, depth in scheduler["queue_depth"].items():
+            queue_depth.add_metric([priority], depth)
+        yield queue_depth
+        yield CounterMetricFamily("tuniverse_upstream_throttle_events", "429 responses from Spotify.", value=scheduler["throttle_events"])
+        yield CounterMetricFamily("tuniverse_upstream_retries", "Backoff retries of Spotify calls.", value=scheduler["retries"])
+
+        breakers = resilience_stats()["breakers"]
+        breaker_open = GaugeMetricFamily("tuniverse_circuit_breaker_open", "1 while the upstream's circuit breaker is open.", labels=["upstream"])
+        short_circuited = CounterMetricFamily("tuniverse_circuit_breaker_short_circuited", "Calls failed fast by an open circuit breaker.", labels=["upstream"])
+        for name, breaker in breakers.items():
+            breaker_open.add_metric([name], int(breaker["state"] == OPEN))
+            short_circuited.add_metric([name], breaker["short_circuited"])
+        yield breaker_open
+        yield short_circuited
+        bulkhead = get_bulkhead().stats()
+        yield GaugeMetricFamily("tuniverse_bulkhead_in_flight", "Upstream requests holding a bulkhead slot.", value=bulkhead["in_flight"])
+        yield CounterMetricFamily("tuniverse_bulkhead_rejected", "Upstream requests rejected by a full bulkhead.", value=bulkhead["rejected"])
+
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except RuntimeError:
+            return  # scraped outside the event loop
+        yield GaugeMetricFamily("tuniverse_threadpool_busy", "Worker threads in use for sync routes and to_thread calls.", value=limiter.borrowed_tokens)
+        yield GaugeMetricFamily("tuniverse_threadpool_size", "Worker thread limit.", value=limiter.total_tokens)
+
+
+REGISTRY.register(ServiceStatsCollector())
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class EventLoopMonitor:
+    """
+    Sleeps for `interval_seconds` in a loop and records how late it wakes up.
+    """
+
+    def __init__(self, interval_seconds: float = 0.5):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval_seconds)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - self.interval_seconds))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_loop_monitor: Optional[EventLoopMonitor] = None
+
+
+def get_event_loop_monitor() -> EventLoopMonitor:
+    """
+    Process-wide monitor, sampling every TUNIVERSE_LOOP_LAG_INTERVAL seconds.
+    """
+    global _loop_monitor
+
+    if _loop_monitor is None:
+        _loop_monitor = EventLoopMonitor(float(os.getenv("TUNIVERSE_LOOP_LAG_INTERVAL", "0.5")))
+
+    return _loop_monitor
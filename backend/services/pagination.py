@@ -0,0 +1,113 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator
+
+# Spotify page-size caps
+SAVED_TRACKS_PAGE_SIZE = 50
+PLAYLIST_TRACKS_PAGE_SIZE = 100
+
+PageFetcher = Callable[[int, int], Dict[str, Any]]
+AsyncPageFetcher = Callable[[int, int], Awaitable[Dict[str, Any]]]
+
+
+def iter_paged(
+    fetch_page: PageFetcher,
+    page_size: int = SAVED_TRACKS_PAGE_SIZE,
+    prefetch: int = 2,
+) -> Iterator[Any]:
+    """
+    Lazily yield every item of a Spotify paging object.
+
+    fetch_page(offset, limit) returns one page. The first page tells us
+    `total`; after that up to `prefetch` pages are fetched on worker threads
+    while the caller consumes the current one, so at most prefetch + 1 pages
+    are ever held in memory.
+    """
+    first = fetch_page(0, page_size)
+    yield from first.get("items", [])
+
+    total = first.get("total")
+    if total is None:
+        # No total: walk `next` links one page at a time
+        offset = page_size
+        page = first
+        while page.get("next"):
+            page = fetch_page(offset, page_size)
+            yield from page.get("items", [])
+            offset += page_size
+        return
+
+    offsets = iter(range(page_size, total, page_size))
+    executor = ThreadPoolExecutor(max_workers=max(1, prefetch))
+    pending = deque()
+
+    try:
+        for offset in offsets:
+            pending.append(executor.submit(fetch_page, offset, page_size))
+            if len(pending) >= max(1, prefetch):
+                break
+
+        while pending:
+            page = pending.popleft().result()
+
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pending.append(executor.submit(fetch_page, next_offset, page_size))
+
+            yield from page.get("items", [])
+    finally:
+        # Caller may stop early; drop anything not started yet
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def aiter_paged(
+    fetch_page: AsyncPageFetcher,
+    page_size: int = SAVED_TRACKS_PAGE_SIZE,
+    prefetch: int = 2,
+) -> AsyncIterator[Any]:
+    """
+    Async version of iter_paged: the next `prefetch` pages are in-flight
+    tasks while the caller iterates the current page.
+    """
+    first = await fetch_page(0, page_size)
+    for item in first.get("items", []):
+        yield item
+
+    total = first.get("total")
+    if total is None:
+        offset = page_size
+        page = first
+        while page.get("next"):
+            page = await fetch_page(offset, page_size)
+            for item in page.get("items", []):
+                yield item
+            offset += page_size
+        return
+
+    offsets = iter(range(page_size, total, page_size))
+    pending = deque()
+
+    try:
+        for offset in offsets:
+            pending.append(asyncio.ensure_future(fetch_page(offset, page_size)))
+            if len(pending) >= max(1, prefetch):
+                break
+
+        while pending:
+            page = await pending.popleft()
+
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pending.append(asyncio.ensure_future(fetch_page(next_offset, page_size)))
+
+            for item in page.get("items", []):
+                yield item
+    finally:
+        # Caller may stop early: cancel the prefetches and wait for them, so
+        # their requests are torn down (and errors observed) before we return
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,216 @@
+"""
+Analytics over whole playlists in bounded memory.
+
+Pages are fetched a few at a time and each is folded into running
+aggregates as soon as it arrives, in whatever order pages complete (every
+aggregate is order-independent), then dropped. Memory is bounded by the
+in-flight pages and the fixed-size sketches, not by the playlist length.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from models.records import TrackRecord, parse_artists
+from services.async_spotify_client import AsyncSpotifyClient
+from services.pagination import PLAYLIST_TRACKS_PAGE_SIZE
+from services.sketches import RunningStats, SpaceSaving
+from services.streaming import SKETCH_CAPACITY, Event, TOP_N
+from services.upstream_resilience import UpstreamUnavailable
+from services.upstream_scheduler import UpstreamRateLimited
+from transformers.mood_visual_transformer import (
+    accumulate_mood_scores,
+    summarize_mood_scores,
+    transform_mood_to_visual_identity,
+)
+
+logger = logging.getLogger(__name__)
+
+PAGE_CONCURRENCY = 4
+
+# Only what the aggregates read, so pages are a fraction of their full size
+PLAYLIST_FIELDS = (
+    "total,items(track(id,name,popularity,explicit,duration_ms,"
+    "album(id,release_date),artists(id,name)))"
+)
+
+# (tracks, artist id -> genres) for one page
+Page = Tuple[List[TrackRecord], Dict[str, Tuple[str, ...]]]
+
+
+class PlaylistAggregate:
+    """
+    Running playlist summary: sketches, histograms and counters only.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY):
+        self.tracks = 0
+        self.total: Optional[int] = None
+        self.pages = 0
+        self.failed_pages = 0
+        self.explicit = 0
+        self.duration_ms = 0
+        self.artists = SpaceSaving(capacity)
+        self.genres = SpaceSaving(capacity)
+        self.release_years: Counter = Counter()
+        self.popularity = RunningStats()
+        self.popularity_histogram = [0] * 10
+        self.mood_scores: Counter = Counter()
+
+    def add_page(self, page: Page) -> None:
+        tracks, genres_by_artist = page
+        self.pages += 1
+        for track in tracks:
+            self.add(track, genres_by_artist)
+
+    def add(self, track: TrackRecord, genres_by_artist: Dict[str, Tuple[str, ...]]) -> None:
+        self.tracks += 1
+        self.explicit += track.explicit
+        self.duration_ms += track.duration_ms
+        for artist_id, name in zip(track.artist_ids, track.artist_names):
+            self.artists.add((artist_id, name))
+
+        if track.popularity is not None:
+            self.popularity.add(track.popularity)
+            self.popularity_histogram[min(track.popularity // 10, 9)] += 1
+
+        year = track.album.release_year
+        if year is not None:
+            self.release_years[year] += 1
+
+        genres = list(dict.fromkeys(
+            genre for artist_id in track.artist_ids for genre in genres_by_artist.get(artist_id, ())
+        ))
+        for genre in genres:
+            self.genres.add(genre)
+        accumulate_mood_scores(genres, self.mood_scores)
+
+    def progress(self, started: float) -> Dict[str, Any]:
+        return {
+            "tracks_processed": self.tracks,
+            "total_tracks": self.total,
+            "pages_processed": self.pages,
+            "failed_pages": self.failed_pages,
+            "elapsed_s": round(time.monotonic() - started, 2),
+        }
+
+    def summary(self, started: float, complete: bool) -> Dict[str, Any]:
+        mood_distribution, dominant_mood = (
+            summarize_mood_scores(self.mood_scores) if self.mood_scores else ({}, "Other")
+        )
+        return {
+            "complete": complete,
+            "progress": self.progress(started),
+            "explicit_share": round(self.explicit / self.tracks, 3) if self.tracks else 0,
+            "total_duration_ms": self.duration_ms,
+            "popularity": {
+                **self.popularity.summary(),
+                "histogram": {
+                    f"{bucket * 10}-{bucket * 10 + 9 if bucket < 9 else 100}": count
+                    for bucket, count in enumerate(self.popularity_histogram)
+                },
+            },
+            "release_years": dict(sorted(self.release_years.items())),
+            # Counts are upper bounds, over by at most `error`
+            "top_artists": [
+                {"id": artist_id, "artist": name, "count": count, "error": error}
+                for (artist_id, name), count, error in self.artists.top(TOP_N)
+            ],
+            "top_genres": [
+                {"genre": genre, "count": count, "error": error}
+                for genre, count, error in self.genres.top(TOP_N)
+            ],
+            "mood_distribution": mood_distribution,
+            "dominant_mood": dominant_mood,
+            "visual_identity": transform_mood_to_visual_identity(dominant_mood),
+        }
+
+
+async def _fetch_page(client: AsyncSpotifyClient, playlist_id: str, offset: int) -> Tuple[Optional[int], Page]:
+    """
+    One page parsed into track records plus its artists' genres (read
+    through the metadata store); the raw page is dropped here.
+    """
+    raw = await client.get_playlist_tracks(
+        playlist_id,
+        limit=PLAYLIST_TRACKS_PAGE_SIZE,
+        offset=offset,
+        fields=PLAYLIST_FIELDS,
+        use_cache=False,
+    )
+    tracks = [
+        TrackRecord.from_json(item["track"])
+        for item in raw.get("items", [])
+        if item.get("track") and item["track"].get("id")
+    ]
+    artist_ids = list(dict.fromkeys(artist_id for track in tracks for artist_id in track.artist_ids))
+    artists = parse_artists((await client.get_artists(artist_ids))["artists"]) if artist_ids else []
+    genres = {artist.id: artist.genres for artist in artists}
+    return raw.get("total"), (tracks, genres)
+
+
+async def playlist_analytics_events(
+    client: AsyncSpotifyClient,
+    playlist_id: str,
+    timeout: float,
+    concurrency: int = PAGE_CONCURRENCY,
+) -> AsyncIterator[Event]:
+    """
+    A "progress" event per folded page, then "done" with the summary, or
+    "partial" with whatever was folded when `timeout` seconds ran out.
+    Pages after the first that fail are counted and skipped.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    aggregate = PlaylistAggregate()
+
+    # The first page says how many pages there are
+    first = asyncio.ensure_future(_fetch_page(client, playlist_id, 0))
+    try:
+        done, _ = await asyncio.wait({first}, timeout=max(0.0, deadline - time.monotonic()))
+    finally:
+        if not first.done():
+            first.cancel()
+    if not done:
+        yield "partial", aggregate.summary(started, complete=False)
+        return
+
+    aggregate.total, page = first.result()
+    aggregate.add_page(page)
+    yield "progress", aggregate.progress(started)
+
+    offsets = iter(range(PLAYLIST_TRACKS_PAGE_SIZE, aggregate.total or 0, PLAYLIST_TRACKS_PAGE_SIZE))
+    pending = set()
+    complete = True
+    try:
+        while True:
+            while len(pending) < concurrency:
+                offset = next(offsets, None)
+                if offset is None:
+                    break
+                pending.add(asyncio.ensure_future(_fetch_page(client, playlist_id, offset)))
+            if not pending:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                complete = False
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    _, page = task.result()
+                except (httpx.HTTPError, UpstreamRateLimited, UpstreamUnavailable) as e:
+                    logger.warning("Playlist %s page failed: %s", playlist_id, e)
+                    aggregate.failed_pages += 1
+                    continue
+                aggregate.add_page(page)
+                yield "progress", aggregate.progress(started)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    yield ("done" if complete else "partial"), aggregate.summary(started, complete)
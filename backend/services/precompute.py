@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from services.metrics import VIEW_READS
+from services.serialization import json_response, raw_json_response, render_json
+from services.spotify_service import build_galaxy_response, build_mood_response, build_track_insights, build_universe_response
+from services.token_store import SpotifySession, TokenStore, get_token_store
+from services.upstream_resilience import is_upstream_failure
+from services.upstream_scheduler import Priority
+from services.view_store import ViewStore, get_view_store
+
+logger = logging.getLogger(__name__)
+
+# The parameters the frontend asks for; these are the ones precomputed
+DEFAULT_VIEW_PARAMS: Dict[str, Dict[str, Any]] = {
+    "galaxy": {"time_range": "medium_term", "limit": 10},
+    "mood": {"limit": 20},
+    "track_insights": {"limit": 20},
+}
+
+VIEW_BUILDERS = {
+    "galaxy": build_galaxy_response,
+    "mood": build_mood_response,
+    "track_insights": build_track_insights,
+}
+
+
+def view_max_staleness() -> float:
+    """
+    Oldest view served as-is, in seconds (TUNIVERSE_VIEW_MAX_STALENESS);
+    older ones are recomputed in the request.
+    """
+    return float(os.getenv("TUNIVERSE_VIEW_MAX_STALENESS", "1800"))
+
+
+async def serve_view(session: SpotifySession, view: str, params: Dict[str, Any]) -> Any:
+    """
+    A route's response from its materialized view when fresh enough,
+    otherwise computed on demand and stored for the next read. If Spotify
+    is unavailable the outdated view is served instead.
+    """
+    store = get_view_store()
+    materialized = await asyncio.to_thread(store.get, session.user_key, view, params)
+    if materialized is not None and materialized.age <= view_max_staleness():
+        VIEW_READS.labels(view, "fresh").inc()
+        return raw_json_response(materialized.body)
+
+    VIEW_READS.labels(view, "miss" if materialized is None else "stale").inc()
+    try:
+        content = await VIEW_BUILDERS[view](access_token=session.access_token, user_key=session.user_key, **params)
+    except Exception as e:
+        # An outdated view beats an error while Spotify is unavailable
+        if materialized is None or not is_upstream_failure(e):
+            raise
+        logger.warning("Serving stale %s view after upstream failure: %s", view, e)
+        VIEW_READS.labels(view, "stale_fallback").inc()
+        return raw_json_response(materialized.body)
+    await asyncio.to_thread(store.put_many, session.user_key, [(view, params, render_json(content))])
+    return json_response(content)
+
+
+async def compute_default_views(session: SpotifySession, store: Optional[ViewStore] = None) -> None:
+    """
+    Recompute every view at its default parameters in one round of
+    background-priority Spotify calls.
+    """
+    store = store or get_view_store()
+    universe = await build_universe_response(
+        access_token=session.access_token,
+        sections=list(DEFAULT_VIEW_PARAMS),
+        time_range=DEFAULT_VIEW_PARAMS["galaxy"]["time_range"],
+        galaxy_limit=DEFAULT_VIEW_PARAMS["galaxy"]["limit"],
+        mood_limit=DEFAULT_VIEW_PARAMS["mood"]["limit"],
+        tracks_limit=DEFAULT_VIEW_PARAMS["track_insights"]["limit"],
+        user_key=session.user_key,
+        priority=Priority.BACKGROUND,
+    )
+    await asyncio.to_thread(
+        store.put_many,
+        session.user_key,
+        [(view, params, render_json(universe[view])) for view, params in DEFAULT_VIEW_PARAMS.items()],
+    )
+
+
+class PrecomputeWorker:
+    """
+    Background workers that keep recently active users' views materialized.
+
+    A scan every `scan_seconds` queues users whose views are older than
+    `refresh_seconds`; logins queue the new user straight away. Refreshes are
+    leased per user in the view store, so several API processes can run
+    workers against the same database without duplicating work.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ViewStore] = None,
+        token_store: Optional[TokenStore] = None,
+        refresh_seconds: float = 600,
+        scan_seconds: float = 60,
+        active_within_seconds: float = 3600,
+        concurrency: int = 2,
+    ):
+        self.store = store or get_view_store()
+        self.token_store = token_store or get_token_store()
+        self.refresh_seconds = refresh_seconds
+        self.scan_seconds = scan_seconds
+        self.active_within_seconds = active_within_seconds
+        self.concurrency = concurrency
+        self.refreshed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _put(self, session: SpotifySession, force: bool) -> None:
+        if self._queue is None or session.user_key in self._pending:
+            return
+        self._pending.add(session.user_key)
+        self._queue.put_nowait((session, force))
+
+    def enqueue(self, session: SpotifySession, force: bool = False) -> None:
+        """
+        Queue a refresh for `session`'s user; `force` skips the refresh
+        interval. Safe to call from worker threads (sync routes).
+        """
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(session, force)
+        else:
+            self._loop.call_soon_threadsafe(self._put, session, force)
+
+    async def refresh_user(self, session: SpotifySession, force: bool = False) -> bool:
+        interval = 0 if force else self.refresh_seconds
+        if not await asyncio.to_thread(self.store.claim_refresh, session.user_key, interval):
+            return False  # fresh, or another worker has it
+
+        try:
+            await compute_default_views(session, self.store)
+        except Exception as e:
+            self.failed += 1
+            logger.warning("View precompute failed for %s: %s", session.user_key, e)
+            await asyncio.to_thread(self.store.release_claim, session.user_key)
+            return False
+
+        await asyncio.to_thread(self.store.mark_refreshed, session.user_key)
+        self.refreshed += 1
+        return True
+
+    async def run_once(self) -> int:
+        sessions = await asyncio.to_thread(self.token_store.active_sessions, self.active_within_seconds)
+        for session in sessions:
+            self._put(session, False)
+        return len(sessions)
+
+    async def _scan_forever(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("View scan failed")
+            await asyncio.sleep(self.scan_seconds)
+
+    async def _work_forever(self) -> None:
+        while True:
+            session, force = await self._queue.get()
+            try:
+                await self.refresh_user(session, force)
+            finally:
+                self._pending.discard(session.user_key)
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._scan_forever())] + [
+            asyncio.create_task(self._work_forever()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._tasks) and not all(task.done() for task in self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "refresh_seconds": self.refresh_seconds,
+            "max_staleness_seconds": view_max_staleness(),
+        }
+
+
+_worker: Optional[PrecomputeWorker] = None
+
+
+def get_precompute_worker() -> PrecomputeWorker:
+    """
+    Process-wide worker; TUNIVERSE_VIEW_REFRESH_INTERVAL sets seconds between
+    refreshes per user and TUNIVERSE_PRECOMPUTE_WORKERS the concurrency.
+    """
+    global _worker
+
+    if _worker is None:
+        _worker = PrecomputeWorker(
+            refresh_seconds=float(os.getenv("TUNIVERSE_VIEW_REFRESH_INTERVAL", "600")),
+            concurrency=int(os.getenv("TUNIVERSE_PRECOMPUTE_WORKERS", "2")),
+        )
+
+    return _worker
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Seconds a response stays fresh, by endpoint prefix (longest prefix wins).
+# 0 disables caching for that prefix.
+DEFAULT_ENDPOINT_TTLS: Dict[str, float] = {
+    "/me": 300,
+    "/me/top/": 1800,          # top lists move a few times a day at most
+    "/me/tracks": 60,          # Liked Songs change whenever the user taps a heart
+    "/playlists/": 120,
+    "/artists": 3600,
+    "/tracks": 86400,
+    "/audio-features": 86400,  # immutable per track
+}
+
+
+def user_key_for_token(access_token: Optional[str]) -> str:
+    """
+    Stable, non-reversible cache key for the user behind an access token.
+    """
+    if not access_token:
+        return "anonymous"
+    return hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache for upstream JSON responses.
+
+    Entries are keyed by (user, endpoint, params) and bounded both by count
+    and by the byte size of the upstream payload. Cached values are shared
+    between callers and must be treated as read-only.
+
+    Expired entries are kept for `stale_seconds` more (LRU bounds still
+    apply) so get_stale() can answer when Spotify cannot.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 64 * 1024 * 1024,
+        endpoint_ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 60,
+        stale_seconds: float = 0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        ttls = endpoint_ttls if endpoint_ttls is not None else DEFAULT_ENDPOINT_TTLS
+        self._ttl_prefixes = sorted(ttls.items(), key=lambda item: len(item[0]), reverse=True)
+
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._keys_by_user: Dict[str, set] = {}
+        # Expired entries already counted in `expirations`
+        self._expired: set = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+
+    @staticmethod
+    def make_key(user_key: str, endpoint: str, params: Optional[Dict] = None) -> Tuple:
+        param_items = tuple(sorted((k, str(v)) for k, v in (params or {}).items()))
+        return (user_key, endpoint, param_items)
+
+    def ttl_for(self, endpoint: str) -> float:
+        for prefix, ttl in self._ttl_prefixes:
+            if endpoint == prefix or endpoint.startswith(prefix.rstrip("/") + "/"):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                self._note_expired(key)
+                if expires_at + self.stale_seconds <= now:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: Tuple) -> Optional[Any]:
+        """
+        The entry for `key` even if it has expired, as long as it is within
+        the stale window. For use when a fresh fetch has failed.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, _, value = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                self._note_expired(key)
+            if expires_at + self.stale_seconds <= now:
+                self._remove(key)
+                return None
+
+            self.stale_hits += 1
+            return value
+
+    def set(self, key: Tuple, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_for(key[1]) if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            now = time.monotonic()
+            self._entries[key] = (now + ttl, size, value)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                if self._entries[oldest][0] <= now:
+                    self._note_expired(oldest)
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_key: str) -> int:
+        """
+        Drop every cached response for a user, e.g. after they re-authenticate.
+        """
+        with self._lock:
+            keys = self._keys_by_user.pop(user_key, set())
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+                self._expired.discard(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._expired.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "users": len(self._keys_by_user),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_hits": self.stale_hits,
+                "stale_seconds": self.stale_seconds,
+            }
+
+    def _note_expired(self, key: Tuple) -> None:
+        # Caller must hold self._lock; counts each expired entry once
+        if key not in self._expired:
+            self._expired.add(key)
+            self.expirations += 1
+
+    def _remove(self, key: Tuple) -> None:
+        # Caller must hold self._lock
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        self._expired.discard(key)
+
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Process-wide response cache, sized from TUNIVERSE_CACHE_* environment variables.
+    """
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                enabled = os.getenv("TUNIVERSE_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+                _cache = ResponseCache(
+                    max_entries=int(os.getenv("TUNIVERSE_CACHE_MAX_ENTRIES", "2048")) if enabled else 0,
+                    max_bytes=int(os.getenv("TUNIVERSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+                    stale_seconds=float(os.getenv("TUNIVERSE_CACHE_STALE_SECONDS", "86400")),
+                )
+
+    return _cache
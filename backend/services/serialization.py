@@ -0,0 +1,59 @@
+import os
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from services.metrics import stage
+
+
+def fast_json_enabled() -> bool:
+    """
+    Opt-in via TUNIVERSE_FAST_JSON=1.
+    """
+    return os.getenv("TUNIVERSE_FAST_JSON", "0").lower() in ("1", "true", "yes")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def render_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+def json_response(content: Any) -> Any:
+    """
+    Wrap a route's result for the fast path.
+
+    Returning a Response makes FastAPI skip response_model re-validation and
+    the jsonable_encoder walk; builders already produce typed models or
+    plain JSON data, so both are pure overhead. With the fast path off the
+    content is returned untouched and FastAPI serializes it as before.
+    """
+    if not fast_json_enabled():
+        return content
+    with stage("serialize"):
+        return FastJSONResponse(content)
+
+
+def raw_json_response(body: bytes) -> Any:
+    """
+    Already-encoded JSON (a materialized view): sent byte-for-byte on the
+    fast path, decoded for FastAPI's own serialization otherwise.
+    """
+    if not fast_json_enabled():
+        return orjson.loads(body)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,90 @@
+"""
+Fixed-memory summaries for folding long streams of tracks.
+"""
+import heapq
+import itertools
+import math
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Approximate top-k counts in O(capacity) memory (Metwally et al.'s
+    Space-Saving). When full, a new item replaces the least counted one and
+    inherits its count as `error`, so reported counts overestimate by at
+    most their error; any item seen more than total / capacity times is
+    guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # (count, sequence, item); stale entries are skipped when popped
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._sequence = itertools.count()
+
+    def add(self, item: Hashable, count: int = 1) -> None:
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            floor, evicted = self._pop_min()
+            del self.counts[evicted], self.errors[evicted]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+
+        heapq.heappush(self._heap, (self.counts[item], next(self._sequence), item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, next(self._sequence), key) for key, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        (item, count, error) for the n highest counts.
+        """
+        ranked = heapq.nlargest(n, self.counts.items(), key=lambda entry: entry[1])
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+
+class RunningStats:
+    """
+    Count, mean, standard deviation, min and max of a stream (Welford's
+    online algorithm, stable for long streams).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self, digits: int = 1) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0, "mean": None, "stddev": None, "min": None, "max": None}
+        return {
+            "count": self.count,
+            "mean": round(self.mean, digits),
+            "stddev": round(math.sqrt(self._m2 / self.count), digits),
+            "min": self.min,
+            "max": self.max,
+        }
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.records import ArtistRecord, TrackRecord, parse_artists, parse_tracks
+from services.async_spotify_client import AsyncSpotifyClient
+from services.snapshot_store import TIME_RANGES, Snapshot, SnapshotStore, get_snapshot_store
+from services.spotify_service import compose_mood_response, slice_items
+from services.token_store import SpotifySession, TokenStore, get_token_store
+from services.upstream_scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TOP_LIMIT = 50
+# Same artist count the /mood endpoint analyzes
+SNAPSHOT_MOOD_LIMIT = 20
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+def _artist_item(artist: ArtistRecord) -> Dict[str, Any]:
+    return {
+        "name": artist.name,
+        "image_url": artist.image_url,
+        "genres": list(artist.genres),
+    }
+
+
+def _track_item(track: TrackRecord) -> Dict[str, Any]:
+    return {
+        "name": track.name,
+        "artists": list(track.artist_names),
+        "album": track.album.name,
+        "image_url": track.album.image_url,
+    }
+
+
+def snapshot_states(top_artists: Dict[str, Any], top_tracks: Dict[str, Any]) -> Dict[str, Tuple[Dict, Dict]]:
+    """
+    (state, item display data) per snapshot kind for one time_range.
+    """
+    artists = parse_artists(top_artists.get("items", []))
+    tracks = parse_tracks(top_tracks.get("items", []))
+    mood = compose_mood_response(slice_items(top_artists, SNAPSHOT_MOOD_LIMIT))
+
+    return {
+        "top_artists": (
+            {"ranking": [artist.id for artist in artists]},
+            {artist.id: _artist_item(artist) for artist in artists},
+        ),
+        "top_tracks": (
+            {"ranking": [track.id for track in tracks]},
+            {track.id: _track_item(track) for track in tracks},
+        ),
+        "mood": (
+            {
+                "dominant_mood": mood.dominant_mood,
+                "mood_distribution": mood.mood_distribution,
+                "top_genres": [genre.model_dump() for genre in mood.top_genres],
+            },
+            {},
+        ),
+    }
+
+
+async def capture_snapshots(session: SpotifySession, store: Optional[SnapshotStore] = None) -> int:
+    """
+    Snapshot one user's top lists and mood for every time_range.
+    Returns how many series changed.
+    """
+    store = store or get_snapshot_store()
+    client = AsyncSpotifyClient(
+        access_token=session.access_token,
+        user_key=session.user_key,
+        priority=Priority.BACKGROUND,
+    )
+
+    pages = await asyncio.gather(*[
+        fetch(time_range=time_range, limit=SNAPSHOT_TOP_LIMIT)
+        for time_range in TIME_RANGES
+        for fetch in (client.get_top_artists, client.get_top_tracks)
+    ])
+
+    changed = 0
+    for index, time_range in enumerate(TIME_RANGES):
+        top_artists, top_tracks = pages[2 * index], pages[2 * index + 1]
+        for kind, (state, items) in snapshot_states(top_artists, top_tracks).items():
+            if await asyncio.to_thread(store.append, session.user_key, kind, time_range, state, items):
+                changed += 1
+
+    await asyncio.to_thread(store.mark_captured, session.user_key)
+    return changed
+
+
+def _hydrate_ranking(store: SnapshotStore, kind: str, ranking: List[str]) -> List[Dict[str, Any]]:
+    items = store.items(kind, ranking)
+    return [
+        {"rank": rank, "id": item_id, **items.get(item_id, {})}
+        for rank, item_id in enumerate(ranking, start=1)
+    ]
+
+
+def _present(store: SnapshotStore, kind: str, snapshot: Snapshot) -> Dict[str, Any]:
+    if kind == "mood":
+        return {"taken_at": _iso(snapshot.taken_at), **snapshot.state}
+    return {
+        "taken_at": _iso(snapshot.taken_at),
+        "items": _hydrate_ranking(store, kind, snapshot.state["ranking"]),
+    }
+
+
+def snapshot_as_of(user_key: str, kind: str, time_range: str, as_of: float) -> Optional[Dict[str, Any]]:
+    store = get_snapshot_store()
+    snapshot = store.state_at(user_key, kind, time_range, as_of)
+    if snapshot is None:
+        return None
+    return {"kind": kind, "time_range": time_range, "as_of": _iso(as_of), **_present(store, kind, snapshot)}
+
+
+def _ranking_trend(store: SnapshotStore, kind: str, first: Snapshot, last: Snapshot) -> Dict[str, Any]:
+    before = {item_id: rank for rank, item_id in enumerate(first.state["ranking"], start=1)}
+    after = {item_id: rank for rank, item_id in enumerate(last.state["ranking"], start=1)}
+    items = store.items(kind, list(before) + list(after))
+
+    def describe(item_id: str, **ranks) -> Dict[str, Any]:
+        return {"id": item_id, "name": items.get(item_id, {}).get("name"), **ranks}
+
+    movers = [
+        describe(item_id, from_rank=before[item_id], to_rank=rank, change=before[item_id] - rank)
+        for item_id, rank in after.items()
+        if item_id in before and before[item_id] != rank
+    ]
+    movers.sort(key=lambda mover: -abs(mover["change"]))
+
+    return {
+        "entered": [describe(item_id, to_rank=rank) for item_id, rank in after.items() if item_id not in before],
+        "dropped": [describe(item_id, from_rank=rank) for item_id, rank in before.items() if item_id not in after],
+        "movers": movers,
+    }
+
+
+def _mood_trend(history: List[Snapshot]) -> Dict[str, Any]:
+    first, last = history[0].state, history[-1].state
+    moods = dict.fromkeys(list(first["mood_distribution"]) + list(last["mood_distribution"]))
+    return {
+        "dominant_mood": {"from": first["dominant_mood"], "to": last["dominant_mood"]},
+        "distribution_change": {
+            mood: round(last["mood_distribution"].get(mood, 0) - first["mood_distribution"].get(mood, 0), 2)
+            for mood in moods
+        },
+        "timeline": [
+            {"taken_at": _iso(snapshot.taken_at), "dominant_mood": snapshot.state["dominant_mood"]}
+            for snapshot in history
+        ],
+    }
+
+
+def snapshot_trend(user_key: str, kind: str, time_range: str, start: float, end: float) -> Optional[Dict[str, Any]]:
+    """
+    How a series changed between `start` and `end`: the states in force at
+    both ends plus a kind-specific summary of the difference.
+    """
+    store = get_snapshot_store()
+    history = store.between(user_key, kind, time_range, start, end)
+    if not history:
+        return None
+
+    first, last = history[0], history[-1]
+    trend = _mood_trend(history) if kind == "mood" else _ranking_trend(store, kind, first, last)
+    return {
+        "kind": kind,
+        "time_range": time_range,
+        "start": _iso(start),
+        "end": _iso(end),
+        "changes": len(history) - 1,
+        "from": _present(store, kind, first),
+        "to": _present(store, kind, last),
+        **trend,
+    }
+
+
+class SnapshotScheduler:
+    """
+    Background task that captures snapshots for recently active users once
+    per `interval_seconds`, at background priority.
+    """
+
+    def __init__(
+        self,
+        store: Optional[SnapshotStore] = None,
+        token_store: Optional[TokenStore] = None,
+        interval_seconds: float = 86400,
+        check_seconds: float = 600,
+        active_within_seconds: float = 30 * 86400,
+        concurrency: int = 2,
+    ):
+        self.store = store or get_snapshot_store()
+        self.token_store = token_store or get_token_store()
+        self.interval_seconds = interval_seconds
+        self.check_seconds = check_seconds
+        self.active_within_seconds = active_within_seconds
+        self.concurrency = concurrency
+        self.captured = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def capture(self, session: SpotifySession) -> None:
+        claimed = await asyncio.to_thread(self.store.claim_capture, session.user_key, self.interval_seconds)
+        if not claimed:
+            return
+        try:
+            await capture_snapshots(session, self.store)
+            self.captured += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Snapshot capture failed for %s: %s", session.user_key, e)
+
+    async def run_once(self) -> int:
+        sessions = await asyncio.to_thread(self.token_store.active_sessions, self.active_within_seconds)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def capture(session):
+            async with semaphore:
+                await self.capture(session)
+
+        await asyncio.gather(*[capture(session) for session in sessions])
+        return len(sessions)
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Snapshot pass failed")
+            await asyncio.sleep(self.check_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "captured": self.captured,
+            "failed": self.failed,
+            "interval_seconds": self.interval_seconds,
+        }
+
+
+_scheduler: Optional[SnapshotScheduler] = None
+
+
+def get_snapshot_scheduler() -> SnapshotScheduler:
+    """
+    Process-wide scheduler; TUNIVERSE_SNAPSHOT_INTERVAL sets seconds between
+    captures per user.
+    """
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = SnapshotScheduler(
+            interval_seconds=float(os.getenv("TUNIVERSE_SNAPSHOT_INTERVAL", "86400")),
+        )
+
+    return _scheduler
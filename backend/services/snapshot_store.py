@@ -0,0 +1,255 @@
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.sqlite_store import MAX_SQL_VARIABLES, SQLiteStore, default_db_path, placeholders, sql_chunks
+
+SNAPSHOT_KINDS = ("top_artists", "top_tracks", "mood")
+TIME_RANGES = ("short_term", "medium_term", "long_term")
+
+# A full state is stored every this many snapshots, so rebuilding any
+# point in time replays at most this many deltas
+KEYFRAME_INTERVAL = 30
+
+
+def encode_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Field-level difference between two states.
+
+    Lists of ids (rankings) are stored as references into the previous
+    list: an int is "the id at that index before", a string is a new id,
+    so a reshuffled top 50 costs a few bytes per entry.
+    """
+    delta: Dict[str, Any] = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if value == old:
+            continue
+        if isinstance(value, list) and isinstance(old, list) and all(isinstance(item, str) for item in value):
+            positions = {item: index for index, item in enumerate(old)}
+            delta[key] = {"ref": [positions.get(item, item) for item in value]}
+        else:
+            delta[key] = {"set": value}
+
+    removed = [key for key in previous if key not in current]
+    if removed:
+        delta["-"] = removed
+    return delta
+
+
+def apply_delta(previous: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    state = {key: value for key, value in previous.items() if key not in delta.get("-", ())}
+    for key, change in delta.items():
+        if key == "-":
+            continue
+        if "ref" in change:
+            old = previous[key]
+            state[key] = [old[item] if isinstance(item, int) else item for item in change["ref"]]
+        else:
+            state[key] = change["set"]
+    return state
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+
+
+def _unpack(payload: bytes) -> Any:
+    return json.loads(zlib.decompress(payload))
+
+
+@dataclass
+class Snapshot:
+    taken_at: float
+    state: Dict[str, Any]
+
+
+class SnapshotStore(SQLiteStore):
+    """
+    Append-only history of each user's top lists and mood per time_range.
+
+    Rows are clustered by (user_id, kind, time_range, taken_at), so "as of"
+    and "between" queries are index range scans over one series. A row is
+    only written when the state changed since the last one; most rows hold
+    a delta against their predecessor, with a full keyframe every
+    KEYFRAME_INTERVAL rows.
+
+    Display data for ranked items (names, images) lives once per item in
+    snapshot_items rather than in every snapshot.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        user_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        time_range TEXT NOT NULL,
+        taken_at REAL NOT NULL,
+        keyframe INTEGER NOT NULL,
+        payload BLOB NOT NULL,
+        PRIMARY KEY (user_id, kind, time_range, taken_at)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS snapshot_items (
+        kind TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (kind, item_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS snapshot_captures (
+        user_id TEXT PRIMARY KEY,
+        captured_at REAL NOT NULL DEFAULT 0,
+        claimed_until REAL NOT NULL DEFAULT 0
+    );
+    """
+
+    _SERIES = "user_id = ? AND kind = ? AND time_range = ?"
+
+    def _replay(self, conn, series: Tuple[str, str, str], since: float, until: float) -> List[Snapshot]:
+        """
+        Every snapshot of a series in [since, until], plus the one in force at
+        `since`, rebuilt from the nearest keyframe at or before it.
+        """
+        rows = conn.execute(
+            f"SELECT taken_at, keyframe, payload FROM snapshots WHERE {self._SERIES} "
+            "AND taken_at <= ? AND taken_at >= COALESCE(("
+            f"  SELECT MAX(taken_at) FROM snapshots WHERE {self._SERIES} AND taken_at <= ? AND keyframe = 1"
+            "), 0) ORDER BY taken_at",
+            (*series, until, *series, since),
+        ).fetchall()
+
+        baseline: Optional[Snapshot] = None
+        in_range: List[Snapshot] = []
+        state: Dict[str, Any] = {}
+        for taken_at, keyframe, payload in rows:
+            state = _unpack(payload) if keyframe else apply_delta(state, _unpack(payload))
+            if taken_at < since:
+                baseline = Snapshot(taken_at, state)
+            else:
+                in_range.append(Snapshot(taken_at, state))
+        return ([baseline] if baseline else []) + in_range
+
+    def append(
+        self,
+        user_id: str,
+        kind: str,
+        time_range: str,
+        state: Dict[str, Any],
+        items: Optional[Dict[str, Dict]] = None,
+        taken_at: Optional[float] = None,
+    ) -> bool:
+        """
+        Record `state` unless it equals the latest snapshot. `items` maps ids
+        in the state to their display data. Returns whether a row was written.
+        """
+        if kind not in SNAPSHOT_KINDS:
+            raise ValueError(f"Unknown snapshot kind: {kind}")
+        series = (user_id, kind, time_range)
+        taken_at = time.time() if taken_at is None else taken_at
+
+        with self.transaction() as conn:
+            if items:
+                conn.executemany(
+                    "INSERT INTO snapshot_items (kind, item_id, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT(kind, item_id) DO UPDATE SET data = excluded.data",
+                    [(kind, item_id, json.dumps(data, separators=(",", ":"))) for item_id, data in items.items()],
+                )
+
+            history = self._replay(conn, series, math.inf, math.inf)
+            previous = history[-1] if history else None
+            if previous is not None and previous.state == state:
+                return False
+
+            since_keyframe = conn.execute(
+                f"SELECT COUNT(*) FROM snapshots WHERE {self._SERIES} AND taken_at > COALESCE(("
+                f"  SELECT MAX(taken_at) FROM snapshots WHERE {self._SERIES} AND keyframe = 1"
+                "), 0)",
+                (*series, *series),
+            ).fetchone()[0]
+            keyframe = previous is None or since_keyframe + 1 >= KEYFRAME_INTERVAL
+
+            payload = _pack(state if keyframe else encode_delta(previous.state, state))
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (user_id, kind, time_range, taken_at, keyframe, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*series, taken_at, int(keyframe), payload),
+            )
+        return True
+
+    def state_at(self, user_id: str, kind: str, time_range: str, as_of: float) -> Optional[Snapshot]:
+        """
+        The snapshot in force at `as_of`, or None before the first one.
+        """
+        history = self._replay(self.connection(), (user_id, kind, time_range), as_of, as_of)
+        return history[-1] if history else None
+
+    def between(self, user_id: str, kind: str, time_range: str, start: float, end: float) -> List[Snapshot]:
+        """
+        The snapshot in force at `start` followed by every change up to `end`.
+        """
+        return self._replay(self.connection(), (user_id, kind, time_range), start, end)
+
+    def items(self, kind: str, ids: Iterable[str]) -> Dict[str, Dict]:
+        ids = list(dict.fromkeys(ids))
+        found: Dict[str, Dict] = {}
+        conn = self.connection()
+        for chunk in sql_chunks(ids, size=MAX_SQL_VARIABLES - 1):
+            rows = conn.execute(
+                f"SELECT item_id, data FROM snapshot_items WHERE kind = ? AND item_id IN ({placeholders(len(chunk))})",
+                (kind, *chunk),
+            )
+            for item_id, data in rows:
+                found[item_id] = json.loads(data)
+        return found
+
+    def claim_capture(self, user_id: str, interval_seconds: float, lease_seconds: float = 300) -> bool:
+        """
+        Take the capture lease for a user whose last capture is older than
+        `interval_seconds`; False if not due or another worker has it.
+        """
+        now = time.time()
+        conn = self.connection()
+        conn.execute("INSERT OR IGNORE INTO snapshot_captures (user_id) VALUES (?)", (user_id,))
+        cursor = conn.execute(
+            "UPDATE snapshot_captures SET claimed_until = ? "
+            "WHERE user_id = ? AND captured_at <= ? AND claimed_until < ?",
+            (now + lease_seconds, user_id, now - interval_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def mark_captured(self, user_id: str) -> None:
+        self.connection().execute(
+            "INSERT INTO snapshot_captures (user_id, captured_at) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET captured_at = excluded.captured_at, claimed_until = 0",
+            (user_id, time.time()),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        conn = self.connection()
+        snapshots, keyframes, payload_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(keyframe), 0), COALESCE(SUM(LENGTH(payload)), 0) FROM snapshots"
+        ).fetchone()
+        return {
+            "snapshots": snapshots,
+            "keyframes": keyframes,
+            "payload_bytes": payload_bytes,
+            "items": conn.execute("SELECT COUNT(*) FROM snapshot_items").fetchone()[0],
+            "users": conn.execute("SELECT COUNT(*) FROM snapshot_captures").fetchone()[0],
+        }
+
+_store: Optional[SnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("TUNIVERSE_SNAPSHOT_DB") or default_db_path("snapshots.db")
+                _store = SnapshotStore(path)
+
+    return _store
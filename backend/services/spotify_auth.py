@@ -0,0 +1,241 @@
+import asyncio
+import base64
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+import requests
+
+from services.http_session import get_async_http_client, get_http_config, get_http_session
+from services.metrics import observe_upstream
+from services.token_store import TokenStore, get_token_store, session_max_idle
+from services.upstream_resilience import UpstreamUnavailable, get_circuit_breaker, is_failure_status
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_ACCOUNTS_BASE_URL = "https://accounts.spotify.com"
+SPOTIFY_AUTH_URL = f"{SPOTIFY_ACCOUNTS_BASE_URL}/authorize"
+SPOTIFY_TOKEN_URL = f"{SPOTIFY_ACCOUNTS_BASE_URL}/api/token"
+
+
+class SpotifyAuthError(Exception):
+    pass
+
+
+def spotify_token_url() -> str:
+    """
+    SPOTIFY_ACCOUNTS_BASE_URL overrides the accounts host for token calls.
+    """
+    base_url = os.getenv("SPOTIFY_ACCOUNTS_BASE_URL")
+    return f"{base_url.rstrip('/')}/api/token" if base_url else SPOTIFY_TOKEN_URL
+
+
+def _client_auth_headers() -> Dict[str, str]:
+    client_id = os.getenv("SPOTIFY_CLIENT_ID")
+    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+
+    if not client_id or not client_secret:
+        raise SpotifyAuthError("Spotify environment variables are not fully set")
+
+    auth_header = base64.b64encode(
+        f"{client_id}:{client_secret}".encode()
+    ).decode()
+
+    return {
+        "Authorization": f"Basic {auth_header}",
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+
+
+def exchange_code(code: str, redirect_uri: str) -> Dict:
+    """
+    Authorization code -> access + refresh tokens.
+    """
+    breaker = get_circuit_breaker("accounts")
+    breaker.before_call()
+    started = time.perf_counter()
+    try:
+        response = get_http_session().post(
+            spotify_token_url(),
+            headers=_client_auth_headers(),
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": redirect_uri,
+            },
+            timeout=get_http_config().timeout,
+        )
+    except (requests.ConnectionError, requests.Timeout):
+        breaker.record(False)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record(not is_failure_status(response.status_code))
+    observe_upstream("/api/token", response.status_code, time.perf_counter() - started)
+
+    if response.status_code != 200:
+        logger.warning("Spotify token error %s: %.500s", response.status_code, response.text)
+        raise SpotifyAuthError("Failed to retrieve Spotify access token")
+
+    return response.json()
+
+
+def oauth_error(response) -> Optional[str]:
+    """
+    The OAuth `error` code of a failed token response, if it has one.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("error") if isinstance(body, dict) else None
+
+
+async def refresh_access_token(refresh_token: str) -> Dict:
+    breaker = get_circuit_breaker("accounts")
+    breaker.before_call()
+    started = time.perf_counter()
+    try:
+        response = await get_async_http_client().post(
+            spotify_token_url(),
+            headers=_client_auth_headers(),
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+            },
+        )
+    except httpx.TransportError:
+        breaker.record(False)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record(not is_failure_status(response.status_code))
+    observe_upstream("/api/token", response.status_code, time.perf_counter() - started)
+
+    if response.status_code != 200:
+        logger.warning("Spotify token refresh error %s: %.500s", response.status_code, response.text)
+        response.raise_for_status()
+
+    return response.json()
+
+
+class TokenRefresher:
+    """
+    Background task that refreshes access tokens shortly before they expire,
+    so no user request ever waits on a refresh round trip or a 401 retry.
+
+    Only sessions used in the last `max_idle_seconds` are refreshed; each
+    pass first deletes the ones idle for longer.
+    """
+
+    def __init__(
+        self,
+        store: Optional[TokenStore] = None,
+        lead_seconds: float = 300,
+        interval_seconds: float = 30,
+        concurrency: int = 8,
+        max_idle_seconds: Optional[float] = None,
+    ):
+        self.store = store or get_token_store()
+        self.lead_seconds = lead_seconds
+        self.interval_seconds = interval_seconds
+        self.concurrency = concurrency
+        self.max_idle_seconds = session_max_idle() if max_idle_seconds is None else max_idle_seconds
+        self.refreshed = 0
+        self.failed = 0
+        self.swept = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh_session(self, session) -> None:
+        if not await asyncio.to_thread(self.store.claim_refresh, session.session_id):
+            return  # another worker has it
+
+        try:
+            token_data = await refresh_access_token(session.refresh_token)
+        except httpx.HTTPStatusError as e:
+            self.failed += 1
+            if oauth_error(e.response) == "invalid_grant":
+                # Refresh token revoked or invalid; the user has to log in again
+                await asyncio.to_thread(self.store.delete, session.session_id)
+            # Anything else (say invalid_client from a bad secret) is not this
+            # session's fault: the lease expires and the next pass retries
+            return
+        except (httpx.TransportError, UpstreamUnavailable):
+            self.failed += 1
+            return  # lease expires and the next pass retries
+
+        await asyncio.to_thread(
+            self.store.update_tokens,
+            session.session_id,
+            token_data["access_token"],
+            token_data.get("expires_in", 3600),
+            token_data.get("refresh_token"),
+        )
+        self.refreshed += 1
+
+    async def run_once(self) -> int:
+        self.swept += await asyncio.to_thread(self.store.delete_idle, self.max_idle_seconds)
+        due = await asyncio.to_thread(self.store.due_for_refresh, self.lead_seconds, self.max_idle_seconds)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(session):
+            async with semaphore:
+                await self.refresh_session(session)
+
+        await asyncio.gather(*[refresh(session) for session in due])
+        return len(due)
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Token refresh pass failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "swept": self.swept,
+            "lead_seconds": self.lead_seconds,
+            "max_idle_seconds": self.max_idle_seconds,
+            "interval_seconds": self.interval_seconds,
+        }
+
+
+_refresher: Optional[TokenRefresher] = None
+
+
+def get_token_refresher() -> TokenRefresher:
+    """
+    Process-wide refresher, tuned by TUNIVERSE_TOKEN_REFRESH_LEAD / _INTERVAL
+    and TUNIVERSE_SESSION_MAX_IDLE (seconds).
+    """
+    global _refresher
+
+    if _refresher is None:
+        _refresher = TokenRefresher(
+            lead_seconds=float(os.getenv("TUNIVERSE_TOKEN_REFRESH_LEAD", "300")),
+            interval_seconds=float(os.getenv("TUNIVERSE_TOKEN_REFRESH_INTERVAL", "30")),
+        )
+
+    return _refresher
@@ -1,48 +1,222 @@
-from routers.auth import ACCESS_TOKEN_STORE
+import logging
+import os
+import time
+
 import requests
-from typing import Dict, List, Optional
+
+from services.batch_fetch import (
+    ARTISTS_BATCH_SIZE,
+    AUDIO_FEATURES_BATCH_SIZE,
+    TRACKS_BATCH_SIZE,
+    fetch_in_batches,
+    status_of,
+    unique_ids,
+)
+from services.http_session import get_http_config, get_http_session
+from services.metadata_store import get_metadata_store
+from services.metrics import observe_metadata_lookups, observe_upstream
+from services.pagination import PLAYLIST_TRACKS_PAGE_SIZE, SAVED_TRACKS_PAGE_SIZE, iter_paged
+from services.response_cache import get_response_cache, user_key_for_token
+from services.singleflight import SingleFlight
+from services.upstream_resilience import (
+    get_bulkhead,
+    get_circuit_breaker,
+    is_failure_status,
+    is_upstream_failure,
+    time_left,
+    upstream_deadline,
+)
+from services.upstream_scheduler import (
+    RETRYABLE_STATUSES,
+    Priority,
+    UpstreamRateLimited,
+    get_upstream_scheduler,
+    parse_retry_after,
+)
+from typing import Dict, Iterator, List, Optional
 
 SPOTIFY_API_BASE_URL = "https://api.spotify.com/v1"
 
 
-class SpotifyClient:
-    BASE_URL = SPOTIFY_API_BASE_URL
+def spotify_api_base_url() -> str:
+    """
+    SPOTIFY_API_BASE_URL overrides the API host, e.g. to point at the
+    benchmark stand-in (benchmarks/mock_spotify.py).
+    """
+    return os.getenv("SPOTIFY_API_BASE_URL", SPOTIFY_API_BASE_URL).rstrip("/")
+
+logger = logging.getLogger(__name__)
+
+# Identical concurrent upstream calls (same user, endpoint, params) share one request
+_inflight = SingleFlight()
+
+# Catalog endpoint -> time.monotonic() until which it is not called again,
+# after Spotify answered 403 (audio features are refused to newer apps)
+_denied_until: Dict[str, float] = {}
+
+
+def denied_endpoint_ttl() -> float:
+    """
+    Seconds a 403 from a catalog endpoint is remembered (TUNIVERSE_DENIED_ENDPOINT_TTL).
+    """
+    return float(os.getenv("TUNIVERSE_DENIED_ENDPOINT_TTL", "3600"))
+
 
-    def __init__(self, access_token: Optional[str] = None):
+def endpoint_denied(endpoint: str) -> bool:
+    return _denied_until.get(endpoint, 0.0) > time.monotonic()
+
+
+def deny_endpoint(endpoint: str) -> None:
+    if not endpoint_denied(endpoint):
+        logger.warning("Spotify refused %s (403); not calling it for %.0fs", endpoint, denied_endpoint_ttl())
+    _denied_until[endpoint] = time.monotonic() + denied_endpoint_ttl()
+
+
+class BaseSpotifyClient:
+    """
+    Transport-agnostic pieces shared by SpotifyClient and AsyncSpotifyClient.
+    """
+    BASE_URL: Optional[str] = None  # defaults to spotify_api_base_url()
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        user_key: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
         """
-        Spotify client that can either:
-        1) Use an explicitly passed access_token (recommended for services + ML later)
-        2) Fall back to the global ACCESS_TOKEN_STORE
+        Spotify client for one user's access_token (see services.token_store).
+
+        user_key scopes cached responses; pass the session's user_key so
+        caches survive token refreshes. It defaults to a fingerprint of the token.
+        priority tells the upstream scheduler whether a user is waiting on this client.
         """
         self.access_token = access_token
+        self._user_key = user_key
+        self.priority = priority
 
-    def _get_headers(self) -> Dict[str, str]:
-        access_token = self.access_token or ACCESS_TOKEN_STORE.get("access_token")
+    @property
+    def user_key(self) -> str:
+        return self._user_key or user_key_for_token(self.access_token)
 
-        if not access_token:
+    def _cache_key(self, endpoint: str, params: Optional[Dict] = None):
+        return get_response_cache().make_key(self.user_key, endpoint, params)
+
+    def _get_headers(self) -> Dict[str, str]:
+        if not self.access_token:
             raise Exception("No Spotify access token found. Please log in first.")
 
         return {
-            "Authorization": f"Bearer {access_token}",
+            "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
 
-    def get(self, endpoint: str, params: Optional[Dict] = None):
-        url = f"{self.BASE_URL}{endpoint}"
+    def _url(self, endpoint: str) -> str:
+        return f"{self.BASE_URL or spotify_api_base_url()}{endpoint}"
+
+    @staticmethod
+    def _log_error(status_code: int, url: str, body: str) -> None:
+        logger.warning("Spotify API error %s for %s", status_code, url)
+        # Bodies can be large; only when debugging
+        logger.debug("Response body: %.2000s", body)
 
-        response = requests.get(
-            url,
-            headers=self._get_headers(),
-            params=params,
-        )
 
-        # Helpful debug output during development
-        if response.status_code >= 400:
-            print(f"Spotify API error {response.status_code} for {url}")
-            print("Response body:", response.text)
+class SpotifyClient(BaseSpotifyClient):
+
+    def get(self, endpoint: str, params: Optional[Dict] = None, use_cache: bool = True):
+        cache_key = self._cache_key(endpoint, params)
+        if use_cache:
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            return _inflight.do(
+                cache_key,
+                lambda: self._fetch(endpoint, params, cache_key if use_cache else None),
+            )
+        except Exception as e:
+            stale = get_response_cache().get_stale(cache_key) if use_cache and is_upstream_failure(e) else None
+            if stale is None:
+                raise
+            logger.warning("Serving stale %s after upstream failure: %s", endpoint, e)
+            return stale
+
+    def _fetch(self, endpoint: str, params: Optional[Dict], cache_key):
+        """
+        One upstream GET within the priority's deadline, retries included.
+        Each attempt passes the circuit breaker, takes a rate-limit token,
+        then holds a bulkhead slot for the request itself, with its timeouts
+        cut to the time left.
+        """
+        url = self._url(endpoint)
+        scheduler = get_upstream_scheduler()
+        breaker = get_circuit_breaker("api")
+        config = get_http_config()
+        deadline = time.monotonic() + upstream_deadline(self.priority)
+        attempt = 0
+
+        while True:
+            breaker.before_call()
+            try:
+                # The rate-limit wait comes before the bulkhead, so only live
+                # requests hold slots, and gives up rather than outlast the deadline
+                scheduler.acquire(self.priority, max_wait=time_left(deadline))
+                with get_bulkhead().slot(self.user_key, max_wait=time_left(deadline)):
+                    remaining = time_left(deadline)
+                    started = time.perf_counter()
+                    try:
+                        response = get_http_session().get(
+                            url,
+                            headers=self._get_headers(),
+                            params=params,
+                            timeout=(min(config.connect_timeout, remaining), min(config.read_timeout, remaining)),
+                        )
+                    except (requests.ConnectionError, requests.Timeout):
+                        observe_upstream(endpoint, "error", time.perf_counter() - started)
+                        raise
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record(False)
+                if attempt >= scheduler.max_retries:
+                    raise
+                delay = scheduler.backoff_delay(attempt)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+
+            breaker.record(not is_failure_status(response.status_code))
+            observe_upstream(endpoint, response.status_code, time.perf_counter() - started)
+
+            if response.status_code >= 400:
+                self._log_error(response.status_code, url, response.text)
+
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers)
+                scheduler.record_throttle(retry_after)
+                if attempt >= scheduler.max_retries or time.monotonic() + retry_after >= deadline:
+                    raise UpstreamRateLimited(retry_after)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUSES and attempt < scheduler.max_retries:
+                delay = scheduler.backoff_delay(attempt)
+                if time.monotonic() + delay < deadline:
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+
+            break
 
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        if cache_key is not None:
+            get_response_cache().set(cache_key, data, size=len(response.content))
+        return data
 
     # -------------------------
     # User endpoints
@@ -63,15 +237,35 @@ class SpotifyClient:
             params={"time_range": time_range, "limit": limit},
         )
 
-    def get_saved_tracks(self, limit: int = 20):
+    def get_saved_tracks(self, limit: int = 20, offset: int = 0, use_cache: bool = True):
         """
         User's Liked Songs
         """
         return self.get(
             "/me/tracks",
-            params={"limit": limit},
+            params={"limit": limit, "offset": offset},
+            use_cache=use_cache,
         )
 
+    def iter_saved_tracks(
+        self,
+        page_size: int = SAVED_TRACKS_PAGE_SIZE,
+        prefetch: int = 2,
+        use_cache: bool = False,
+    ) -> Iterator[Dict]:
+        """
+        Every Liked Song, newest first, yielded lazily.
+        Later pages are fetched concurrently while the current one is consumed.
+        """
+        def fetch_page(offset: int, limit: int):
+            return self.get(
+                "/me/tracks",
+                params={"limit": limit, "offset": offset},
+                use_cache=use_cache,
+            )
+
+        return iter_paged(fetch_page, page_size=page_size, prefetch=prefetch)
+
     # -------------------------
     # Playlist endpoints
     # -------------------------
@@ -81,6 +275,7 @@ class SpotifyClient:
         playlist_id: str,
         limit: int = 50,
         market: str = "US",
+        offset: int = 0,
     ):
         """
         Fetch tracks from a playlist.
@@ -90,71 +285,99 @@ class SpotifyClient:
             f"/playlists/{playlist_id}/tracks",
             params={
                 "limit": limit,
+                "offset": offset,
                 "market": market,
             },
         )
 
+    def iter_playlist_tracks(
+        self,
+        playlist_id: str,
+        market: str = "US",
+        page_size: int = PLAYLIST_TRACKS_PAGE_SIZE,
+        prefetch: int = 2,
+        use_cache: bool = False,
+    ) -> Iterator[Dict]:
+        """
+        Every item of a playlist, yielded lazily with pages prefetched ahead.
+        """
+        def fetch_page(offset: int, limit: int):
+            return self.get(
+                f"/playlists/{playlist_id}/tracks",
+                params={"limit": limit, "offset": offset, "market": market},
+                use_cache=use_cache,
+            )
+
+        return iter_paged(fetch_page, page_size=page_size, prefetch=prefetch)
+
     # -------------------------
-    # Audio features
+    # Catalog lookups (read through the local metadata store)
     # -------------------------
 
-    def get_audio_features(self, track_ids: List[str]):
+    def _read_through(
+        self,
+        kind: str,
+        endpoint: str,
+        response_key: str,
+        ids: List[str],
+        batch_size: int,
+    ):
         """
-        Fetch audio features for tracks.
-        Falls back to individual calls if batch fails.
+        Serve ids from the metadata store; batch-fetch only the unknown ones
+        from Spotify and bulk-upsert them for next time. An endpoint that
+        answered 403 is not called again for a while; its unknown ids fail.
         """
-        if not track_ids:
-            return {"audio_features": []}
+        store = get_metadata_store()
+        ids = unique_ids(ids)
+        known = store.get_many(kind, ids)
+        missing = [item_id for item_id in ids if item_id not in known]
+        observe_metadata_lookups(kind, hits=len(ids) - len(missing), misses=len(missing))
+        if missing and endpoint_denied(endpoint):
+            return [known[item_id] for item_id in ids if item_id in known], missing
+
+        def fetch_chunk(chunk: List[str]):
+            try:
+                return self.get(
+                    endpoint,
+                    params={"ids": ",".join(chunk)},
+                    use_cache=False,
+                ).get(response_key, [])
+            except Exception as e:
+                if status_of(e) == 403:
+                    deny_endpoint(endpoint)
+                raise
+
+        fetched, failed_ids = fetch_in_batches(missing, fetch_chunk, batch_size=batch_size)
+        store.upsert_many(kind, fetched)
+        for item in fetched:
+            known[item["id"]] = item
+
+        return [known[item_id] for item_id in ids if item_id in known], failed_ids
+
+    def get_tracks(self, track_ids: List[str]):
+        tracks, failed_ids = self._read_through(
+            "tracks", "/tracks", "tracks", track_ids, TRACKS_BATCH_SIZE
+        )
+        return {"tracks": tracks, "failed_ids": failed_ids}
 
-        ids_str = ",".join(track_ids)
+    def get_artists(self, artist_ids: List[str]):
+        artists, failed_ids = self._read_through(
+            "artists", "/artists", "artists", artist_ids, ARTISTS_BATCH_SIZE
+        )
+        return {"artists": artists, "failed_ids": failed_ids}
 
-        try:
-            return self.get(
-                "/audio-features",
-                params={"ids": ids_str},
-            )
+    # -------------------------
+    # Audio features
+    # -------------------------
 
-        except requests.exceptions.HTTPError as e:
-            print("Batch audio-features request failed, trying individually:", e)
-
-            features = []
-
-            for track_id in track_ids:
-                try:
-                    result = self.get(
-                        "/audio-features",
-                        params={"ids": track_id},
-                    )
-
-                    if (
-                        result.get("audio_features")
-                        and result["audio_features"][0] is not None
-                    ):
-                        features.append(result["audio_features"][0])
-
-                except requests.exceptions.HTTPError:
-                    print(f"Skipping restricted or unavailable track {track_id}")
-
-            return {"audio_features": features}
-
-
-    def build_track_insights(access_token: str, limit: int = 20):
-        spotify_client = SpotifyClient(access_token=access_token)
-        top_tracks = spotify_client.get_top_tracks(limit=limit)
-
-        insights = []
-        for track in top_tracks.get("items", []):
-            insights.append({
-                "id": track.get("id"),
-                "name": track.get("name"),
-                "album": {
-                    "name": track.get("album", {}).get("name"),
-                    "release_date": track.get("album", {}).get("release_date"),
-                    "image": track.get("album", {}).get("images", [{}])[0].get("url")
-                },
-                "artists": [artist.get("name") for artist in track.get("artists", [])],
-                "popularity": track.get("popularity"),
-                "spotify_url": track.get("external_urls", {}).get("spotify"),
-            })
-
-        return {"tracks": insights, "total_tracks": len(insights)}
+    def get_audio_features(self, track_ids: List[str]):
+        """
+        Fetch audio features, locally stored ones first. Unknown ids go out in
+        chunks of 100, a few chunks at a time; bad ids are isolated by
+        bisection and reported in failed_ids.
+        """
+        features, failed_ids = self._read_through(
+            "audio_features", "/audio-features", "audio_features",
+            track_ids, AUDIO_FEATURES_BATCH_SIZE,
+        )
+        return {"audio_features": features, "failed_ids": failed_ids}
@@ -1,22 +1,62 @@
+import asyncio
+import logging
 from collections import Counter
-from services.spotify_client import SpotifyClient
+from services.async_spotify_client import AsyncSpotifyClient
 from transformers.mood_visual_transformer import (
     analyze_mood_from_genres,
     transform_mood_to_visual_identity,
 )
+from models.records import ArtistRecord, TrackRecord, parse_artists, parse_tracks
 from models.spotify_models import MoodResponse
+from services.layout_cache import get_layout_cache
+from services.library_sync import ensure_library_synced, library_items
+from services.metrics import stage
+from services.upstream_scheduler import Priority
+from transformers.audio_mood_transformer import analyze_mood_from_audio_features
+from transformers.constellations import MIN_SIMILARITY, build_constellations
+from transformers.galaxy_layout import artists_to_graph_planets, layout_positions
 from transformers.spotify_transformer import transform_top_artists_to_planets
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
-def build_mood_response(access_token: str, limit: int = 20) -> MoodResponse:
-    spotify_client = SpotifyClient(access_token=access_token)
-    top_artists = spotify_client.get_top_artists(limit=limit)
 
-    # Collect genres from top artists
+async def build_mood_response(
+    access_token: str,
+    limit: int = 20,
+    user_key: Optional[str] = None,
+    engine: str = "genres",
+) -> MoodResponse:
+    """
+    engine="genres" reads mood from the genres of the top `limit` artists;
+    engine="audio" from the audio features of the whole synced library.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    if engine == "audio":
+        return await build_audio_mood_response(spotify_client, limit)
+
+    with stage("fetch"):
+        top_artists = await spotify_client.get_top_artists(limit=limit)
+    with stage("transform"):
+        return compose_mood_response(top_artists)
+
+
+def compose_mood_response(top_artists: Dict[str, Any]) -> MoodResponse:
+    return mood_response_from_artists(parse_artists(top_artists.get("items", [])))
+
+
+def _top_genres(artists: List[ArtistRecord]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    # Collect genres from the artists, plus the top ones in the shape MoodResponse expects
     genres = []
-    for artist in top_artists.get("items", []):
-        genres.extend(artist.get("genres", []))
+    for artist in artists:
+        genres.extend(artist.genres)
+
+    raw_top_genres = Counter(genres).most_common(10)
+    return genres, [{"genre": genre, "count": count} for genre, count in raw_top_genres]
+
+
+def mood_response_from_artists(artists: List[ArtistRecord]) -> MoodResponse:
+    genres, top_genres = _top_genres(artists)
 
     # Analyze mood 
     mood_distribution, dominant_mood = analyze_mood_from_genres(genres)
@@ -24,63 +64,310 @@ def build_mood_response(access_token: str, limit: int = 20) -> MoodResponse:
     # Map mood → visuals
     visual_identity = transform_mood_to_visual_identity(dominant_mood)
 
-    # Prepare top genres in the shape MoodResponse expects
-    raw_top_genres = Counter(genres).most_common(10)
-    top_genres = [{"genre": genre, "count": count} for genre, count in raw_top_genres]
-
     return MoodResponse(
         top_genres=top_genres,
         mood_distribution=mood_distribution or {},
         dominant_mood=dominant_mood or "Other",
         visual_identity=visual_identity,
-        total_artists_analyzed=len(top_artists.get("items", [])) if top_artists else 0,
+        total_artists_analyzed=len(artists),
     )
 
 
-def build_track_insights(access_token: str, limit: int = 20):
-    spotify_client = SpotifyClient(access_token=access_token)
-    top_tracks = spotify_client.get_top_tracks(limit=limit)
-
-    insights = []
-    for track in top_tracks.get("items", []):
-        insights.append({
-            "id": track.get("id"),
-            "name": track.get("name"),
-            "album": {
-                "name": track.get("album", {}).get("name"),
-                "release_date": track.get("album", {}).get("release_date"),
-                "image": track.get("album", {}).get("images", [{}])[0].get("url")
-            },
-            "artists": [artist.get("name") for artist in track.get("artists", [])],
-            "popularity": track.get("popularity"),
-            "spotify_url": track.get("external_urls", {}).get("spotify"),
-        })
+async def build_audio_mood_response(spotify_client: AsyncSpotifyClient, limit: int = 20) -> MoodResponse:
+    """
+    Mood of the user's synced Liked Songs from per-track audio features;
+    top genres come from the `limit` artists on the most saved tracks. Falls
+    back to the genre engine over those artists if Spotify returns no audio
+    features (they are unavailable to some apps).
+    """
+    track_ids, track_counts = await library_profile(spotify_client)
+    with stage("fetch"):
+        features, artists = await asyncio.gather(
+            spotify_client.get_audio_features(track_ids),
+            ranked_artists(spotify_client, track_counts, limit),
+        )
+
+    with stage("transform"):
+        mood_distribution, dominant_mood, analyzed = analyze_mood_from_audio_features(features["audio_features"])
+        if not analyzed:
+            logger.info("No audio features for %s, using genre moods", spotify_client.user_key)
+            return mood_response_from_artists(artists)
+
+        _, top_genres = _top_genres(artists)
+        return MoodResponse(
+            top_genres=top_genres,
+            mood_distribution=mood_distribution,
+            dominant_mood=dominant_mood,
+            visual_identity=transform_mood_to_visual_identity(dominant_mood),
+            total_artists_analyzed=len(track_counts),
+        )
+
+
+async def build_track_insights(access_token: str, limit: int = 20, user_key: Optional[str] = None):
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    with stage("fetch"):
+        top_tracks = await spotify_client.get_top_tracks(limit=limit)
+    with stage("transform"):
+        return compose_track_insights(top_tracks)
+
+
+def track_insight(track: TrackRecord) -> Dict[str, Any]:
+    return {
+        "id": track.id,
+        "name": track.name,
+        "album": {
+            "name": track.album.name,
+            "release_date": track.album.release_date,
+            "image": track.album.image_url,
+        },
+        "artists": list(track.artist_names),
+        "popularity": track.popularity,
+        "spotify_url": track.spotify_url,
+    }
+
+
+def compose_track_insights(top_tracks: Dict[str, Any]) -> Dict[str, Any]:
+    insights = [track_insight(track) for track in parse_tracks(top_tracks.get("items", []))]
 
     return {"tracks": insights, "total_tracks": len(insights)}
 
-def build_galaxy_response(access_token: str, time_range: str = "medium_term", limit: int = 10):
+async def build_galaxy_response(
+    access_token: str,
+    time_range: str = "medium_term",
+    limit: int = 10,
+    user_key: Optional[str] = None,
+    layout: str = "ladder",
+):
     """
     Fetches user's top artists and transforms them into a visual 'galaxy' representation.
+    layout="graph" positions them by shared genres instead of on a ladder.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    with stage("fetch"):
+        top_artists = await spotify_client.get_top_artists(time_range=time_range, limit=limit)
+
+    if layout == "graph":
+        artists = parse_artists(top_artists.get("items", []))
+        with stage("layout"):
+            return await layout_galaxy(artists, f"{user_key}:top:{time_range}" if user_key else None)
+
+    with stage("transform"):
+        return transform_top_artists_to_planets(top_artists)
+
+
+async def layout_galaxy(artists: List[ArtistRecord], layout_key: Optional[str] = None) -> Dict[str, Any]:
     """
-    spotify_client = SpotifyClient(access_token=access_token)
-    top_artists = spotify_client.get_top_artists(time_range=time_range, limit=limit)
+    Graph-layout galaxy for `artists` (highest ranked first). Layouts are
+    cached under `layout_key` so repeat and slightly changed inputs are
+    cheap; without a key the layout is computed from scratch.
+    """
+    if layout_key is None:
+        positions = await asyncio.to_thread(layout_positions, artists)
+    else:
+        positions = await asyncio.to_thread(get_layout_cache().positions, layout_key, artists)
+    return artists_to_graph_planets(artists, positions)
 
-    return transform_top_artists_to_planets(top_artists)
 
+async def library_profile(spotify_client: AsyncSpotifyClient) -> Tuple[List[str], Counter]:
+    """
+    Track ids of the user's Liked Songs (synced first if due), newest
+    first, and how many of them each artist appears on.
+    """
+    await ensure_library_synced(spotify_client)
 
-def build_top_artists_response(
+    track_ids: List[str] = []
+    track_counts: Counter = Counter()
+    async for _, track in library_items(spotify_client.user_key):
+        track_ids.append(track.id)
+        track_counts.update(track.artist_ids)
+    return track_ids, track_counts
+
+
+async def ranked_artists(spotify_client: AsyncSpotifyClient, track_counts: Counter, limit: int) -> List[ArtistRecord]:
+    ranked = [artist_id for artist_id, _ in track_counts.most_common(limit)]
+    fetched = await spotify_client.get_artists(ranked)
+    by_id = {artist.id: artist for artist in parse_artists(fetched["artists"])}
+    return [by_id[artist_id] for artist_id in ranked if artist_id in by_id]
+
+
+async def library_artists(spotify_client: AsyncSpotifyClient, limit: int) -> List[ArtistRecord]:
+    """
+    The `limit` artists on the most tracks in the user's Liked Songs,
+    most frequent first.
+    """
+    _, track_counts = await library_profile(spotify_client)
+    with stage("fetch"):
+        return await ranked_artists(spotify_client, track_counts, limit)
+
+
+async def build_library_galaxy(
+    access_token: str,
+    limit: int = 500,
+    user_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Graph-layout galaxy of the artists in the user's synced Liked Songs,
+    ranked by how many saved tracks they appear on. Top artists stop at 50;
+    this is how a galaxy gets hundreds or thousands of planets.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    artists = await library_artists(spotify_client, limit)
+
+    with stage("layout"):
+        return await layout_galaxy(artists, f"{spotify_client.user_key}:library")
+
+
+async def build_constellations_response(
+    access_token: str,
+    time_range: str = "medium_term",
+    limit: int = 50,
+    user_key: Optional[str] = None,
+    min_similarity: float = MIN_SIMILARITY,
+) -> Dict[str, Any]:
+    """
+    The user's top artists grouped into constellations by shared genres.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    with stage("fetch"):
+        top_artists = await spotify_client.get_top_artists(time_range=time_range, limit=limit)
+
+    with stage("transform"):
+        return build_constellations(parse_artists(top_artists.get("items", [])), min_similarity)
+
+
+async def build_library_constellations(
+    access_token: str,
+    limit: int = 2000,
+    user_key: Optional[str] = None,
+    min_similarity: float = MIN_SIMILARITY,
+) -> Dict[str, Any]:
+    """
+    Constellations of the artists in the user's synced Liked Songs.
+    """
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    artists = await library_artists(spotify_client, limit)
+
+    with stage("transform"):
+        return await asyncio.to_thread(build_constellations, artists, min_similarity)
+
+
+async def build_top_artists_response(
     access_token: str,
     time_range: str = "medium_term",
     limit: int = 10,
+    user_key: Optional[str] = None,
 ) -> Dict[str, Any]:
-    spotify_client = SpotifyClient(access_token=access_token)
-    return spotify_client.get_top_artists(time_range=time_range, limit=limit)
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    with stage("fetch"):
+        return await spotify_client.get_top_artists(time_range=time_range, limit=limit)
 
 
-def build_top_tracks_response(
+async def build_top_tracks_response(
     access_token: str,
     time_range: str = "medium_term",
     limit: int = 10,
+    user_key: Optional[str] = None,
 ) -> Dict[str, Any]:
-    spotify_client = SpotifyClient(access_token=access_token)
-    return spotify_client.get_top_tracks(time_range=time_range, limit=limit)
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key)
+    with stage("fetch"):
+        return await spotify_client.get_top_tracks(time_range=time_range, limit=limit)
+
+
+UNIVERSE_SECTIONS = ("galaxy", "mood", "track_insights", "top_artists", "top_tracks")
+
+
+def slice_items(response: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """
+    The first `limit` entries of a larger top-items page; Spotify ranks them
+    the same way regardless of the page size asked for.
+    """
+    if len(response.get("items", [])) <= limit:
+        return response
+    return {**response, "items": response["items"][:limit], "limit": limit}
+
+
+def plan_universe_fetches(
+    sections: Iterable[str],
+    time_range: str = "medium_term",
+    galaxy_limit: int = 10,
+    mood_limit: int = 20,
+    tracks_limit: int = 20,
+    top_limit: int = 10,
+) -> Tuple[Dict[str, Tuple[str, str, int]], Dict[Tuple[str, str], int]]:
+    """
+    Works out the fewest upstream calls that cover the requested sections.
+
+    Returns each section's needs as (kind, time_range, limit) plus the calls
+    to make: one per (kind, time_range) at the largest limit any section
+    wants, which the others are sliced from.
+    """
+    # Mood and track insights always read medium_term, like their own endpoints
+    needs = {
+        "galaxy": ("artists", time_range, galaxy_limit),
+        "mood": ("artists", "medium_term", mood_limit),
+        "track_insights": ("tracks", "medium_term", tracks_limit),
+        "top_artists": ("artists", time_range, top_limit),
+        "top_tracks": ("tracks", time_range, top_limit),
+    }
+    section_needs = {section: needs[section] for section in sections}
+
+    calls: Dict[Tuple[str, str], int] = {}
+    for kind, section_range, limit in section_needs.values():
+        key = (kind, section_range)
+        calls[key] = max(calls.get(key, 0), limit)
+
+    return section_needs, calls
+
+
+async def build_universe_response(
+    access_token: str,
+    sections: Optional[List[str]] = None,
+    time_range: str = "medium_term",
+    galaxy_limit: int = 10,
+    mood_limit: int = 20,
+    tracks_limit: int = 20,
+    top_limit: int = 10,
+    user_key: Optional[str] = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> Dict[str, Any]:
+    """
+    Galaxy, mood, track insights and top lists in one payload, fetched with
+    one concurrent round of deduplicated Spotify calls.
+    """
+    section_needs, calls = plan_universe_fetches(
+        sections or UNIVERSE_SECTIONS,
+        time_range=time_range,
+        galaxy_limit=galaxy_limit,
+        mood_limit=mood_limit,
+        tracks_limit=tracks_limit,
+        top_limit=top_limit,
+    )
+
+    spotify_client = AsyncSpotifyClient(access_token=access_token, user_key=user_key, priority=priority)
+    fetchers = {
+        "artists": spotify_client.get_top_artists,
+        "tracks": spotify_client.get_top_tracks,
+    }
+    call_keys = list(calls)
+    with stage("fetch"):
+        pages = await asyncio.gather(*[
+            fetchers[kind](time_range=call_range, limit=calls[(kind, call_range)])
+            for kind, call_range in call_keys
+        ])
+    fetched = dict(zip(call_keys, pages))
+
+    composers = {
+        "galaxy": transform_top_artists_to_planets,
+        "mood": compose_mood_response,
+        "track_insights": compose_track_insights,
+        "top_artists": lambda page: page,
+        "top_tracks": lambda page: page,
+    }
+
+    universe: Dict[str, Any] = {}
+    with stage("transform"):
+        for section, (kind, section_range, limit) in section_needs.items():
+            page = slice_items(fetched[(kind, section_range)], limit)
+            universe[section] = composers[section](page)
+
+    return universe
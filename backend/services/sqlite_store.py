@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER is 999 on older builds
+MAX_SQL_VARIABLES = 900
+
+
+def data_dir() -> str:
+    """
+    Directory for Tuniverse's embedded databases (TUNIVERSE_DATA_DIR, default ./data).
+    """
+    path = os.getenv("TUNIVERSE_DATA_DIR", "data")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def default_db_path(filename: str) -> str:
+    return os.path.join(data_dir(), filename)
+
+
+def sql_chunks(values: Sequence, size: int = MAX_SQL_VARIABLES) -> Iterator[List]:
+    for i in range(0, len(values), size):
+        yield list(values[i:i + size])
+
+
+def placeholders(count: int) -> str:
+    return ",".join("?" * count)
+
+
+class SQLiteStore:
+    """
+    Base for the small embedded stores: one connection per thread,
+    WAL journaling so readers never block the writer, and a schema
+    applied on first open.
+    """
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # CREATE ... IF NOT EXISTS, so concurrent workers can all run it
+        self.connection().executescript(self.SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
@@ -0,0 +1,197 @@
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from models.records import TrackRecord, parse_artists
+from services.async_spotify_client import AsyncSpotifyClient
+from services.library_sync import ensure_library_synced, library_items
+from services.serialization import render_json
+from services.sketches import SpaceSaving
+from services.spotify_service import track_insight
+from transformers.mood_visual_transformer import (
+    accumulate_mood_scores,
+    summarize_mood_scores,
+    transform_mood_to_visual_identity,
+)
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+# Tracks between running-aggregate events; also the artist lookup batch
+AGGREGATE_EVERY = 50
+TOP_N = 10
+# Items the top-k sketches track; a long library's artist and genre tail
+# would otherwise grow without bound
+SKETCH_CAPACITY = 200
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+def encode_event(name: str, data: Dict[str, Any], stream_format: str) -> bytes:
+    """
+    One event as an NDJSON line ({"type": ..., "data": ...}) or an SSE frame.
+    """
+    if stream_format == "sse":
+        return b"event: " + name.encode() + b"\ndata: " + render_json(data) + b"\n\n"
+    return render_json({"type": name, "data": data}) + b"\n"
+
+
+async def encode_events(events: AsyncIterator[Event], stream_format: str) -> AsyncIterator[bytes]:
+    async for name, data in events:
+        yield encode_event(name, data, stream_format)
+
+
+async def _spotify_tracks(items: AsyncIterator[Dict]) -> AsyncIterator[TrackRecord]:
+    # Local files and removed tracks (no track or no id) are skipped
+    async for item in items:
+        track = item.get("track")
+        if track and track.get("id"):
+            yield TrackRecord.from_json(track)
+
+
+async def _synced_library(client: AsyncSpotifyClient) -> AsyncIterator[TrackRecord]:
+    await ensure_library_synced(client)
+    async for _, track in library_items(client.user_key):
+        yield track
+
+
+def library_tracks(client: AsyncSpotifyClient, source: str, playlist_id: Optional[str] = None) -> AsyncIterator[TrackRecord]:
+    """
+    Saved or playlist tracks, page by page as Spotify returns them, or the
+    locally synced copy of the saved tracks (source="library").
+    """
+    if source == "playlist":
+        return _spotify_tracks(client.aiter_playlist_tracks(playlist_id))
+    if source == "library":
+        return _synced_library(client)
+    return _spotify_tracks(client.aiter_saved_tracks())
+
+
+async def _batches(tracks: AsyncIterator[TrackRecord], size: int) -> AsyncIterator[List[TrackRecord]]:
+    batch: List[TrackRecord] = []
+    async for track in tracks:
+        batch.append(track)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _top(sketch: SpaceSaving, key: str) -> List[Dict[str, Any]]:
+    # Counts are upper bounds, over by at most `error`
+    return [{key: name, "count": count, "error": error} for name, count, error in sketch.top(TOP_N)]
+
+
+class TrackInsightsAggregate:
+    """
+    Running library summary; holds counters and a top-k sketch, never the
+    tracks themselves.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY):
+        self.tracks = 0
+        self.popularity_total = 0
+        self.popularity_count = 0
+        self.explicit = 0
+        self.duration_ms = 0
+        self.artists = SpaceSaving(capacity)
+        self.decades: Counter = Counter()
+
+    def add(self, track: TrackRecord) -> None:
+        self.tracks += 1
+        if track.popularity is not None:
+            self.popularity_total += track.popularity
+            self.popularity_count += 1
+        self.explicit += track.explicit
+        self.duration_ms += track.duration_ms
+        for name in track.artist_names:
+            self.artists.add(name)
+
+        year = track.album.release_year
+        if year is not None:
+            self.decades[f"{year // 10 * 10}s"] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_tracks": self.tracks,
+            "average_popularity": (
+                round(self.popularity_total / self.popularity_count, 1) if self.popularity_count else None
+            ),
+            "explicit_share": round(self.explicit / self.tracks, 3) if self.tracks else 0,
+            "total_duration_ms": self.duration_ms,
+            "top_artists": _top(self.artists, "artist"),
+            "decades": dict(sorted(self.decades.items())),
+        }
+
+
+class MoodAggregate:
+    """
+    Running mood analysis, weighted by how many library tracks each artist
+    appears on.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY):
+        self.tracks = 0
+        self.genres = SpaceSaving(capacity)
+        self.mood_scores: Counter = Counter()
+
+    def add(self, genres: List[str]) -> None:
+        self.tracks += 1
+        for genre in genres:
+            self.genres.add(genre)
+        accumulate_mood_scores(genres, self.mood_scores)
+
+    def summary(self) -> Dict[str, Any]:
+        mood_distribution, dominant_mood = (
+            summarize_mood_scores(self.mood_scores) if self.mood_scores else ({}, "Other")
+        )
+        return {
+            "top_genres": _top(self.genres, "genre"),
+            "mood_distribution": mood_distribution,
+            "dominant_mood": dominant_mood,
+            "visual_identity": transform_mood_to_visual_identity(dominant_mood),
+            "total_tracks_analyzed": self.tracks,
+        }
+
+
+async def stream_track_insights(tracks: AsyncIterator[TrackRecord]) -> AsyncIterator[Event]:
+    """
+    A "track" event per track, a running "aggregate" after every batch and
+    the final "done" summary.
+    """
+    aggregate = TrackInsightsAggregate()
+    async for batch in _batches(tracks, AGGREGATE_EVERY):
+        for track in batch:
+            aggregate.add(track)
+            yield "track", track_insight(track)
+        yield "aggregate", aggregate.summary()
+    yield "done", aggregate.summary()
+
+
+async def stream_mood(client: AsyncSpotifyClient, tracks: AsyncIterator[TrackRecord]) -> AsyncIterator[Event]:
+    """
+    A "track" event with each track's genres and mood, a running "aggregate"
+    after every batch and the final "done" summary. Artist genres are looked
+    up one batch at a time through the metadata store.
+    """
+    aggregate = MoodAggregate()
+    async for batch in _batches(tracks, AGGREGATE_EVERY):
+        artist_ids = [artist_id for track in batch for artist_id in track.artist_ids]
+        artists = parse_artists((await client.get_artists(artist_ids))["artists"])
+        genres_by_artist = {artist.id: artist.genres for artist in artists}
+
+        for track in batch:
+            genres = list(dict.fromkeys(
+                genre
+                for artist_id in track.artist_ids
+                for genre in genres_by_artist.get(artist_id, ())
+            ))
+            aggregate.add(genres)
+            scores = accumulate_mood_scores(genres, Counter())
+            yield "track", {
+                "id": track.id,
+                "name": track.name,
+                "genres": genres,
+                "mood": max(scores, key=scores.get) if scores else "Other",
+            }
+        yield "aggregate", aggregate.summary()
+    yield "done", aggregate.summary()
@@ -0,0 +1,194 @@
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from services.response_cache import user_key_for_token
+from services.sqlite_store import SQLiteStore, default_db_path
+
+# Sessions unused for longer than this stop being refreshed and are swept;
+# matches the window in which snapshots are still taken for a user
+SESSION_MAX_IDLE_SECONDS = 30 * 86400
+
+
+def session_max_idle() -> float:
+    return float(os.getenv("TUNIVERSE_SESSION_MAX_IDLE", str(SESSION_MAX_IDLE_SECONDS)))
+
+
+@dataclass
+class SpotifySession:
+    session_id: str
+    user_id: Optional[str]
+    access_token: str
+    refresh_token: Optional[str]
+    expires_at: float
+    last_seen_at: float
+
+    @property
+    def user_key(self) -> str:
+        """
+        Stable per-user key for caches and stores; survives token refreshes.
+        Without a Spotify user id it is a fingerprint of the session id (not
+        the access token, which changes on every refresh).
+        """
+        return self.user_id or user_key_for_token(self.session_id)
+
+    @property
+    def expires_in(self) -> float:
+        return self.expires_at - time.time()
+
+
+class TokenStore(SQLiteStore):
+    """
+    Session-keyed Spotify tokens, shared by every worker process on the host.
+
+    Refreshes are coordinated with a short lease (refresh_claimed_until) so
+    only one worker refreshes a given session at a time.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        access_token TEXT NOT NULL,
+        refresh_token TEXT,
+        expires_at REAL NOT NULL,
+        refresh_claimed_until REAL NOT NULL DEFAULT 0,
+        last_seen_at REAL NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+    CREATE INDEX IF NOT EXISTS sessions_user_id ON sessions (user_id);
+    """
+
+    _COLUMNS = "session_id, user_id, access_token, refresh_token, expires_at, last_seen_at"
+
+    def create_session(
+        self,
+        access_token: str,
+        refresh_token: Optional[str],
+        expires_in: float,
+        user_id: Optional[str] = None,
+    ) -> SpotifySession:
+        now = time.time()
+        session = SpotifySession(
+            session_id=secrets.token_urlsafe(32),
+            user_id=user_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            expires_at=now + expires_in,
+            last_seen_at=now,
+        )
+
+        with self.transaction() as conn:
+            if user_id:
+                # A new login replaces the user's older sessions, so rows (and
+                # refresh calls) grow with users rather than with logins
+                conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+            conn.execute(
+                "INSERT INTO sessions (session_id, user_id, access_token, refresh_token, "
+                "expires_at, last_seen_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session.session_id, user_id, access_token, refresh_token, session.expires_at, now, now),
+            )
+        return session
+
+    def get(self, session_id: str) -> Optional[SpotifySession]:
+        row = self.connection().execute(
+            f"SELECT {self._COLUMNS} FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        return SpotifySession(*row) if row else None
+
+    def touch(self, session_id: str) -> None:
+        self.connection().execute(
+            "UPDATE sessions SET last_seen_at = ? WHERE session_id = ?",
+            (time.time(), session_id),
+        )
+
+    def delete(self, session_id: str) -> None:
+        self.connection().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def due_for_refresh(self, within_seconds: float, seen_within: float, limit: int = 100) -> List[SpotifySession]:
+        """
+        Sessions expiring within `within_seconds` that were used in the last
+        `seen_within` seconds; idle ones are left to expire.
+        """
+        now = time.time()
+        rows = self.connection().execute(
+            f"SELECT {self._COLUMNS} FROM sessions "
+            "WHERE expires_at <= ? AND refresh_token IS NOT NULL AND refresh_claimed_until < ? "
+            "AND last_seen_at >= ? "
+            "ORDER BY expires_at LIMIT ?",
+            (now + within_seconds, now, now - seen_within, limit),
+        ).fetchall()
+        return [SpotifySession(*row) for row in rows]
+
+    def delete_idle(self, max_idle: float) -> int:
+        """
+        Drop sessions not used for `max_idle` seconds; returns how many.
+        """
+        cursor = self.connection().execute(
+            "DELETE FROM sessions WHERE last_seen_at < ?",
+            (time.time() - max_idle,),
+        )
+        return cursor.rowcount
+
+    def claim_refresh(self, session_id: str, lease_seconds: float = 30) -> bool:
+        """
+        Atomically take the refresh lease; False if another worker holds it.
+        """
+        now = time.time()
+        cursor = self.connection().execute(
+            "UPDATE sessions SET refresh_claimed_until = ? "
+            "WHERE session_id = ? AND refresh_claimed_until < ?",
+            (now + lease_seconds, session_id, now),
+        )
+        return cursor.rowcount == 1
+
+    def update_tokens(
+        self,
+        session_id: str,
+        access_token: str,
+        expires_in: float,
+        refresh_token: Optional[str] = None,
+    ) -> None:
+        # Spotify may omit refresh_token on refresh; keep the old one then
+        self.connection().execute(
+            "UPDATE sessions SET access_token = ?, expires_at = ?, "
+            "refresh_token = COALESCE(?, refresh_token), refresh_claimed_until = 0 "
+            "WHERE session_id = ?",
+            (access_token, time.time() + expires_in, refresh_token, session_id),
+        )
+
+    def active_sessions(self, seen_within: float) -> List[SpotifySession]:
+        """
+        Most recent session per user seen in the last `seen_within` seconds.
+        Sessions whose user id could not be resolved each count as their own
+        user, since their tokens may belong to different people.
+        """
+        rows = self.connection().execute(
+            f"SELECT {self._COLUMNS} FROM ("
+            f"  SELECT {self._COLUMNS}, ROW_NUMBER() OVER ("
+            "    PARTITION BY COALESCE(user_id, session_id) ORDER BY last_seen_at DESC"
+            "  ) AS recency FROM sessions WHERE last_seen_at >= ?"
+            ") WHERE recency = 1",
+            (time.time() - seen_within,),
+        ).fetchall()
+        return [SpotifySession(*row) for row in rows]
+
+
+_store: Optional[TokenStore] = None
+_store_lock = threading.Lock()
+
+
+def get_token_store() -> TokenStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("TUNIVERSE_TOKEN_DB") or default_db_path("sessions.db")
+                _store = TokenStore(path)
+
+    return _store
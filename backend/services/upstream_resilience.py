@@ -0,0 +1,364 @@
+"""
+Keeps a slow or failing Spotify from taking the service down with it.
+
+- Deadlines: every upstream call has a total time budget, retries and
+  backoff included; each attempt's timeouts are cut to what is left.
+- Bulkheads: a cap on upstream requests in flight, process-wide and per
+  user, so one user's huge library or a brownout cannot hold every
+  connection and worker.
+- Circuit breakers: when most recent calls to an upstream fail, calls
+  fail fast for a cooldown instead of queueing on it; then a probe call
+  decides whether to close again.
+
+Callers that fail fast get UpstreamUnavailable, and fall back to stale
+cached responses or materialized views where they have them.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+
+import httpx
+import requests
+
+from services.upstream_scheduler import Priority, UpstreamRateLimited
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Poll interval while waiting for a bulkhead slot
+_SLOT_POLL = 0.01
+
+
+class UpstreamUnavailable(Exception):
+    """
+    An upstream call was not made or not finished: its circuit is open, no
+    bulkhead slot freed up in time, or its deadline passed.
+    """
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Spotify is unavailable ({reason}); retry after {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """
+    Errors that say Spotify cannot serve us right now rather than that the
+    request was wrong: unavailability, throttling, transport errors and
+    timeouts, 5xx responses. Worth answering from stale data.
+    """
+    if isinstance(exc, (
+        UpstreamUnavailable,
+        UpstreamRateLimited,
+        httpx.TransportError,
+        requests.ConnectionError,
+        requests.Timeout,
+    )):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500
+    return False
+
+
+def is_failure_status(status_code: int) -> bool:
+    # 429 is throttling, handled by the scheduler, and 4xx are our mistakes
+    return status_code >= 500
+
+
+def time_left(deadline: float) -> float:
+    """
+    Seconds until `deadline` (a time.monotonic() value); raises
+    UpstreamUnavailable once it has passed.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise UpstreamUnavailable("deadline exceeded", 1.0)
+    return remaining
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and outcomes are counted over a rolling
+    window. Once the window holds at least `min_calls` calls and the
+    failure share reaches `failure_ratio`, the breaker opens.
+
+    Open: calls fail fast for `cooldown` seconds. After that it is half
+    open: up to `probes` calls go through; a success closes the breaker, a
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_calls: int = 20,
+        window: float = 30.0,
+        cooldown: float = 15.0,
+        probes: int = 1,
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.probes = probes
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        # [second, calls, failures], oldest first
+        self._buckets: Deque[List[int]] = deque()
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.short_circuited = 0
+
+    def before_call(self) -> None:
+        """
+        Raise UpstreamUnavailable if the call must not go out. Every call
+        that is let through must report back with record(), or release()
+        if it never reached the upstream.
+        """
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    self.short_circuited += 1
+                    raise UpstreamUnavailable("circuit open", remaining)
+                self._state = HALF_OPEN
+                self._probes_in_flight = 0
+
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    self.short_circuited += 1
+                    raise UpstreamUnavailable("circuit half open", 1.0)
+                self._probes_in_flight += 1
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if success:
+                    self._state = CLOSED
+                    self._buckets.clear()
+                else:
+                    self._open(now)
+                return
+            if self._state == OPEN:
+                return  # a call that started before the breaker opened
+
+            second = int(now)
+            if self._buckets and self._buckets[-1][0] == second:
+                bucket = self._buckets[-1]
+            else:
+                bucket = [second, 0, 0]
+                self._buckets.append(bucket)
+            bucket[1] += 1
+            bucket[2] += not success
+            self._trim(now)
+
+            calls, failures = self._totals()
+            if calls >= self.min_calls and failures >= self.failure_ratio * calls:
+                self._open(now)
+
+    def release(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self, now: float) -> None:
+        # Caller must hold self._lock
+        self._state = OPEN
+        self._opened_at = now
+        self._buckets.clear()
+        self.opened += 1
+
+    def _trim(self, now: float) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def _totals(self):
+        return sum(bucket[1] for bucket in self._buckets), sum(bucket[2] for bucket in self._buckets)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_at + self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            calls, failures = self._totals()
+            return {
+                "state": state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "failure_ratio": round(failures / calls, 3) if calls else 0.0,
+                "retry_in_seconds": round(max(0.0, self._opened_at + self.cooldown - now), 2) if state == OPEN else 0,
+                "times_opened": self.opened,
+                "short_circuited": self.short_circuited,
+            }
+
+
+class Bulkhead:
+    """
+    Caps upstream requests in flight: `global_limit` in total and
+    `per_user_limit` for any one user. A caller waits up to `max_wait`
+    seconds for a slot, then gets UpstreamUnavailable. Shared by threads
+    and the event loop.
+    """
+
+    def __init__(self, global_limit: int = 32, per_user_limit: int = 6, max_wait: float = 5.0):
+        self.global_limit = global_limit
+        self.per_user_limit = per_user_limit
+        self.max_wait = max_wait
+
+        self._in_flight = 0
+        self._by_user: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.peak = 0
+        self.rejected = 0
+
+    def _try_enter(self, user_key: str) -> bool:
+        with self._lock:
+            if self._in_flight >= self.global_limit or self._by_user.get(user_key, 0) >= self.per_user_limit:
+                return False
+            self._in_flight += 1
+            self._by_user[user_key] = self._by_user.get(user_key, 0) + 1
+            self.peak = max(self.peak, self._in_flight)
+            return True
+
+    def _leave(self, user_key: str) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            remaining = self._by_user.get(user_key, 1) - 1
+            if remaining:
+                self._by_user[user_key] = remaining
+            else:
+                self._by_user.pop(user_key, None)
+
+    def _give_up(self, max_wait: Optional[float]) -> float:
+        # A caller's max_wait (say, what is left of its deadline) only shortens the wait
+        return time.monotonic() + (self.max_wait if max_wait is None else min(self.max_wait, max_wait))
+
+    def _reject(self) -> None:
+        with self._lock:
+            self.rejected += 1
+        raise UpstreamUnavailable("too many requests in flight", 1.0)
+
+    @contextmanager
+    def slot(self, user_key: str, max_wait: Optional[float] = None) -> Iterator[None]:
+        give_up = self._give_up(max_wait)
+        while not self._try_enter(user_key):
+            if time.monotonic() >= give_up:
+                self._reject()
+            time.sleep(_SLOT_POLL)
+        try:
+            yield
+        finally:
+            self._leave(user_key)
+
+    @asynccontextmanager
+    async def aslot(self, user_key: str, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        give_up = self._give_up(max_wait)
+        while not self._try_enter(user_key):
+            if time.monotonic() >= give_up:
+                self._reject()
+            await asyncio.sleep(_SLOT_POLL)
+        try:
+            yield
+        finally:
+            self._leave(user_key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "global_limit": self.global_limit,
+                "per_user_limit": self.per_user_limit,
+                "users_in_flight": len(self._by_user),
+                "users_at_limit": sum(1 for count in self._by_user.values() if count >= self.per_user_limit),
+                "peak_in_flight": self.peak,
+                "rejected": self.rejected,
+            }
+
+
+def upstream_deadline(priority: Priority = Priority.INTERACTIVE) -> float:
+    """
+    Total seconds an upstream call may take, retries included
+    (TUNIVERSE_UPSTREAM_DEADLINE, TUNIVERSE_UPSTREAM_BACKGROUND_DEADLINE).
+    """
+    if priority is Priority.BACKGROUND:
+        return float(os.getenv("TUNIVERSE_UPSTREAM_BACKGROUND_DEADLINE", "60"))
+    return float(os.getenv("TUNIVERSE_UPSTREAM_DEADLINE", "15"))
+
+
+# "api" is the Web API, "accounts" the token endpoint
+UPSTREAMS = ("api", "accounts")
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_bulkhead: Optional[Bulkhead] = None
+_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str = "api") -> CircuitBreaker:
+    """
+    Breaker per upstream (see UPSTREAMS), tuned by TUNIVERSE_BREAKER_*
+    environment variables.
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_ratio=float(os.getenv("TUNIVERSE_BREAKER_FAILURE_RATIO", "0.5")),
+                    min_calls=int(os.getenv("TUNIVERSE_BREAKER_MIN_CALLS", "20")),
+                    window=float(os.getenv("TUNIVERSE_BREAKER_WINDOW", "30")),
+                    cooldown=float(os.getenv("TUNIVERSE_BREAKER_COOLDOWN", "15")),
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def get_bulkhead() -> Bulkhead:
+    """
+    Process-wide bulkhead, sized by TUNIVERSE_BULKHEAD_GLOBAL / _PER_USER / _MAX_WAIT.
+    """
+    global _bulkhead
+
+    if _bulkhead is None:
+        with _lock:
+            if _bulkhead is None:
+                _bulkhead = Bulkhead(
+                    global_limit=int(os.getenv("TUNIVERSE_BULKHEAD_GLOBAL", "32")),
+                    per_user_limit=int(os.getenv("TUNIVERSE_BULKHEAD_PER_USER", "6")),
+                    max_wait=float(os.getenv("TUNIVERSE_BULKHEAD_MAX_WAIT", "5")),
+                )
+
+    return _bulkhead
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {
+        "breakers": {name: get_circuit_breaker(name).stats() for name in UPSTREAMS},
+        "bulkhead": get_bulkhead().stats(),
+        "deadlines": {
+            "interactive_seconds": upstream_deadline(Priority.INTERACTIVE),
+            "background_seconds": upstream_deadline(Priority.BACKGROUND),
+        },
+    }
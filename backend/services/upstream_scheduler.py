@@ -0,0 +1,225 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Dict, Mapping, Optional
+
+# Statuses worth retrying for an idempotent GET
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0   # a user is waiting on the response
+    BACKGROUND = 1    # precompute / sync jobs; yields to interactive traffic
+
+
+class UpstreamRateLimited(Exception):
+    """
+    Spotify is throttling us: retries ran out, an interactive caller would
+    have to sit through a long Retry-After window, or a caller would have
+    to wait longer than its max_wait.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Spotify rate limit hit; retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float:
+    value = headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0) if value is not None else DEFAULT_RETRY_AFTER
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+
+class UpstreamScheduler:
+    """
+    Central gate every Spotify call passes through.
+
+    - token bucket for the app-wide request quota
+    - a global pause when Spotify answers 429 with Retry-After, so no one
+      keeps hammering the API during the backoff window
+    - background callers only spend tokens above a reserve, and only
+      while no interactive caller is waiting
+
+    Both sync (threads) and async callers share the same state.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 20,
+        background_reserve: float = 0.25,
+        max_retries: int = 3,
+        base_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        max_interactive_wait: float = 5.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.background_floor = burst * background_reserve
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_interactive_wait = max_interactive_wait
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._throttled_until = 0.0
+        self._waiting = {priority: 0 for priority in Priority}
+        self._lock = threading.Lock()
+
+        self.granted = 0
+        self.throttle_events = 0
+        self.retries = 0
+        self.gave_up = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _try_acquire(self, priority: Priority) -> float:
+        """
+        Take a token and return 0, or return how long to wait before asking again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self._throttled_until:
+                return self._throttled_until - now
+
+            floor = 0.0
+            if priority is Priority.BACKGROUND:
+                if self._waiting[Priority.INTERACTIVE]:
+                    return 1.0 / self.rate
+                floor = self.background_floor
+
+            if self._tokens - floor >= 1:
+                self._tokens -= 1
+                self.granted += 1
+                return 0.0
+
+            return (floor + 1 - self._tokens) / self.rate
+
+    def _set_waiting(self, priority: Priority, delta: int) -> None:
+        with self._lock:
+            self._waiting[priority] += delta
+
+    def _check_interactive_wait(self, priority: Priority) -> None:
+        """
+        A user should not sit through a long Retry-After window; fail fast instead.
+        Background jobs simply wait it out.
+        """
+        if priority is Priority.INTERACTIVE:
+            remaining = self.throttle_remaining()
+            if remaining > self.max_interactive_wait:
+                raise UpstreamRateLimited(remaining)
+
+    def _check_max_wait(self, delay: float, give_up: Optional[float]) -> None:
+        """
+        Raise instead of waiting `delay` more seconds past `give_up`, e.g. a
+        caller's deadline; a Retry-After window longer than that fails at once.
+        """
+        if give_up is not None and time.monotonic() + delay > give_up:
+            with self._lock:
+                self.gave_up += 1
+            raise UpstreamRateLimited(delay)
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE, max_wait: Optional[float] = None) -> None:
+        delay = self._try_acquire(priority)
+        if not delay:
+            return
+
+        self._check_interactive_wait(priority)
+        give_up = None if max_wait is None else time.monotonic() + max_wait
+
+        self._set_waiting(priority, 1)
+        try:
+            while delay:
+                self._check_max_wait(delay, give_up)
+                time.sleep(delay)
+                delay = self._try_acquire(priority)
+        finally:
+            self._set_waiting(priority, -1)
+
+    async def acquire_async(self, priority: Priority = Priority.INTERACTIVE, max_wait: Optional[float] = None) -> None:
+        delay = self._try_acquire(priority)
+        if not delay:
+            return
+
+        self._check_interactive_wait(priority)
+        give_up = None if max_wait is None else time.monotonic() + max_wait
+
+        self._set_waiting(priority, 1)
+        try:
+            while delay:
+                self._check_max_wait(delay, give_up)
+                await asyncio.sleep(delay)
+                delay = self._try_acquire(priority)
+        finally:
+            self._set_waiting(priority, -1)
+
+    def record_throttle(self, retry_after: float) -> None:
+        """
+        Spotify said 429: pause every caller until Retry-After has passed.
+        """
+        with self._lock:
+            self.throttle_events += 1
+            self._throttled_until = max(self._throttled_until, time.monotonic() + retry_after)
+            self._tokens = 0.0
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Full-jitter exponential backoff for transient 5xx / connection errors.
+        """
+        with self._lock:
+            self.retries += 1
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def throttle_remaining(self) -> float:
+        with self._lock:
+            return max(0.0, self._throttled_until - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "tokens_available": round(self._tokens, 2),
+                "throttled": now < self._throttled_until,
+                "throttle_remaining_seconds": round(max(0.0, self._throttled_until - now), 2),
+                "queue_depth": {priority.name.lower(): count for priority, count in self._waiting.items()},
+                "granted": self.granted,
+                "throttle_events": self.throttle_events,
+                "retries": self.retries,
+                "gave_up": self.gave_up,
+            }
+
+
+_scheduler: Optional[UpstreamScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_upstream_scheduler() -> UpstreamScheduler:
+    """
+    Process-wide scheduler, tuned by TUNIVERSE_SPOTIFY_RATE / _BURST / _MAX_RETRIES.
+    """
+    global _scheduler
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = UpstreamScheduler(
+                    rate=float(os.getenv("TUNIVERSE_SPOTIFY_RATE", "10")),
+                    burst=int(os.getenv("TUNIVERSE_SPOTIFY_BURST", "20")),
+                    max_retries=int(os.getenv("TUNIVERSE_SPOTIFY_MAX_RETRIES", "3")),
+                )
+
+    return _scheduler
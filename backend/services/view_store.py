@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from services.sqlite_store import SQLiteStore, default_db_path
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    return "&".join(f"{key}={params[key]}" for key in sorted(params))
+
+
+@dataclass
+class MaterializedView:
+    body: bytes          # encoded JSON, served as-is
+    computed_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.computed_at
+
+
+class ViewStore(SQLiteStore):
+    """
+    Materialized per-user API views (galaxy, mood, track insights), stored
+    as encoded JSON so a hit is one primary-key read and no re-serialization.
+    Shared by every worker process on the host.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS views (
+        user_id TEXT NOT NULL,
+        view TEXT NOT NULL,
+        params TEXT NOT NULL,
+        body BLOB NOT NULL,
+        computed_at REAL NOT NULL,
+        PRIMARY KEY (user_id, view, params)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS view_refreshes (
+        user_id TEXT PRIMARY KEY,
+        refreshed_at REAL NOT NULL DEFAULT 0,
+        claimed_until REAL NOT NULL DEFAULT 0
+    );
+    """
+
+    def get(self, user_id: str, view: str, params: Dict[str, Any]) -> Optional[MaterializedView]:
+        row = self.connection().execute(
+            "SELECT body, computed_at FROM views WHERE user_id = ? AND view = ? AND params = ?",
+            (user_id, view, params_key(params)),
+        ).fetchone()
+        return MaterializedView(*row) if row else None
+
+    def put_many(self, user_id: str, views: Iterable[Tuple[str, Dict[str, Any], bytes]]) -> None:
+        """
+        Store (view, params, body) triples computed together.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO views (user_id, view, params, body, computed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id, view, params) DO UPDATE SET "
+                "body = excluded.body, computed_at = excluded.computed_at",
+                [(user_id, view, params_key(params), body, now) for view, params, body in views],
+            )
+
+    def claim_refresh(self, user_id: str, interval_seconds: float, lease_seconds: float = 120) -> bool:
+        """
+        Take the refresh lease for a user last refreshed over `interval_seconds`
+        ago (0 = regardless); False if not due or another worker has it.
+        """
+        now = time.time()
+        conn = self.connection()
+        conn.execute("INSERT OR IGNORE INTO view_refreshes (user_id) VALUES (?)", (user_id,))
+        cursor = conn.execute(
+            "UPDATE view_refreshes SET claimed_until = ? "
+            "WHERE user_id = ? AND refreshed_at <= ? AND claimed_until < ?",
+            (now + lease_seconds, user_id, now - interval_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def mark_refreshed(self, user_id: str) -> None:
+        self.connection().execute(
+            "UPDATE view_refreshes SET refreshed_at = ?, claimed_until = 0 WHERE user_id = ?",
+            (time.time(), user_id),
+        )
+
+    def release_claim(self, user_id: str) -> None:
+        self.connection().execute(
+            "UPDATE view_refreshes SET claimed_until = 0 WHERE user_id = ?",
+            (user_id,),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self.connection()
+        views, users, oldest = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT user_id), MIN(computed_at) FROM views"
+        ).fetchone()
+        return {
+            "views": views,
+            "users": users,
+            "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+        }
+
+
+_store: Optional[ViewStore] = None
+_store_lock = threading.Lock()
+
+
+def get_view_store() -> ViewStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("TUNIVERSE_VIEW_DB") or default_db_path("views.db")
+                _store = ViewStore(path)
+
+    return _store
@@ -0,0 +1,17 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import auth
+from services.token_store import TokenStore
+
+
+def test_logout_deletes_a_header_authenticated_session(tmp_path, monkeypatch):
+    store = TokenStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(auth, "get_token_store", lambda: store)
+    session = store.create_session("token", "refresh", 3600, user_id="alice")
+    app = FastAPI()
+    app.include_router(auth.router)
+
+    response = TestClient(app).post("/auth/logout", headers={"X-Tuniverse-Session": session.session_id})
+    assert response.json() == {"logged_out": True}
+    assert store.get(session.session_id) is None
@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+
+import services.async_spotify_client as async_client_module
+import services.spotify_client as client_module
+from services.async_spotify_client import AsyncSpotifyClient
+from services.batch_fetch import afetch_in_batches, fetch_in_batches
+from services.metadata_store import MetadataStore
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://api.spotify.com/v1/audio-features")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def test_bad_id_is_bisected_out():
+    ids = [f"id{i}" for i in range(8)]
+
+    def fetch(chunk):
+        if "id5" in chunk:
+            raise status_error(400)
+        return [{"id": item_id} for item_id in chunk]
+
+    found, failed = fetch_in_batches(ids, fetch, batch_size=4)
+    assert [item["id"] for item in found] == [item_id for item_id in ids if item_id != "id5"]
+    assert failed == ["id5"]
+
+
+def test_denied_chunk_stops_the_remaining_chunks():
+    calls = []
+
+    def fetch(chunk):
+        calls.append(chunk)
+        raise status_error(403)
+
+    ids = [f"id{i}" for i in range(1000)]
+    found, failed = fetch_in_batches(ids, fetch, batch_size=100, max_workers=1)
+    assert found == [] and failed == ids
+    assert len(calls) == 1
+
+
+def test_async_denied_chunk_stops_the_remaining_chunks():
+    calls = []
+
+    async def fetch(chunk):
+        calls.append(chunk)
+        await asyncio.sleep(0)
+        raise status_error(403)
+
+    ids = [f"id{i}" for i in range(10000)]
+    found, failed = asyncio.run(afetch_in_batches(ids, fetch, batch_size=100, concurrency=4))
+    assert found == [] and sorted(failed) == sorted(ids)
+    # At most the chunks already in flight when the first 403 came back
+    assert len(calls) <= 4
+
+
+def test_denied_endpoint_is_not_called_again(monkeypatch, tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    store.upsert_many("audio_features", [{"id": "known", "valence": 0.5}])
+    monkeypatch.setattr(async_client_module, "get_metadata_store", lambda: store)
+    monkeypatch.setattr(client_module, "_denied_until", {})
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(403, json={"error": {"status": 403}})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(async_client_module, "get_async_http_client", lambda: http)
+    client = AsyncSpotifyClient("token", user_key="u")
+    track_ids = ["known"] + [f"t{i}" for i in range(500)]
+
+    first = asyncio.run(client.get_audio_features(track_ids))
+    assert [features["id"] for features in first["audio_features"]] == ["known"]
+    assert 1 <= len(seen) <= 4
+
+    second = asyncio.run(client.get_audio_features(track_ids))
+    assert second == first
+    assert len(seen) <= 4  # served from the store and the 403 memo
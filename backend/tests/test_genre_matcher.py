@@ -0,0 +1,61 @@
+import random
+from collections import Counter
+
+from transformers.genre_matcher import GenreMatcher
+from transformers.mood_visual_transformer import GENRE_MATCHER, GENRE_MOOD_MAP, analyze_mood_from_genres
+
+NOISE = ["", " ", "dark ", "bedroom ", "uk ", "-", "lo-fi ", "neo ", "alt ", "core", "tra", "hip", "hop"]
+
+
+def naive_match(keyword_map, genre):
+    return tuple(value for key, value in keyword_map.items() if key in genre)
+
+
+def naive_analyze(genres):
+    # The nested loop analyze_mood_from_genres used before the automaton
+    mood_scores = Counter()
+    for genre in genres:
+        matched = False
+        for key, (mood, weight) in GENRE_MOOD_MAP.items():
+            if key in genre:
+                mood_scores[mood] += weight
+                matched = True
+        if not matched:
+            mood_scores["Other"] += 0.5
+
+    total = sum(mood_scores.values()) or 1
+    mood_distribution = {mood: round((score / total) * 100, 2) for mood, score in mood_scores.items()}
+    return mood_distribution, max(mood_scores, key=mood_scores.get)
+
+
+def random_genre(rng):
+    parts = [rng.choice(NOISE)]
+    for _ in range(rng.randint(0, 3)):
+        parts.append(rng.choice(list(GENRE_MOOD_MAP) + NOISE))
+        parts.append(rng.choice(NOISE))
+    return "".join(parts)
+
+
+def test_matches_equal_substring_tests():
+    rng = random.Random(8)
+    for _ in range(5000):
+        genre = random_genre(rng)
+        assert GENRE_MATCHER.match(genre) == naive_match(GENRE_MOOD_MAP, genre), genre
+
+
+def test_overlapping_keywords():
+    keyword_map = {"he": ("a", 1), "she": ("b", 2), "his": ("c", 3), "hers": ("d", 4), "s": ("e", 5)}
+    matcher = GenreMatcher(keyword_map)
+    for text in ["ushers", "shis", "hershe", "s", "", "xyz", "hehehe"]:
+        assert matcher.match(text) == naive_match(keyword_map, text), text
+
+
+def test_analysis_equals_nested_loop():
+    rng = random.Random(9)
+    for _ in range(2000):
+        genres = [random_genre(rng) for _ in range(rng.randint(1, 12))]
+        expected = naive_analyze(genres)
+        actual = analyze_mood_from_genres(genres)
+        assert actual == expected
+        # Dict order is part of the response
+        assert list(actual[0]) == list(expected[0])
@@ -0,0 +1,43 @@
+from models.records import ArtistRecord
+from services.layout_cache import LayoutCache
+
+
+def artist(index):
+    return ArtistRecord(
+        id=f"artist{index}",
+        name=f"Artist {index}",
+        genres=(f"genre {index % 7}", f"genre {index % 11}"),
+        image_url=None,
+        popularity=50,
+    )
+
+
+def test_unchanged_input_is_a_hit_and_a_small_change_is_incremental():
+    cache = LayoutCache()
+    artists = [artist(index) for index in range(100)]
+
+    first = cache.positions("user", artists)
+    assert (cache.positions("user", artists) == first).all()
+    cache.positions("user", artists + [artist(100)])
+    assert cache.stats() == {"users": 1, "hits": 1, "incremental": 1, "full": 1}
+
+
+def test_removing_many_artists_recomputes_the_layout():
+    cache = LayoutCache()
+    artists = [artist(index) for index in range(100)]
+
+    cache.positions("user", artists)
+    cache.positions("user", artists[:70])
+    assert cache.stats()["full"] == 2
+    assert cache.stats()["incremental"] == 0
+
+
+def test_removals_accumulate_toward_a_full_recompute():
+    cache = LayoutCache()
+    artists = [artist(index) for index in range(100)]
+
+    cache.positions("user", artists)
+    for remaining in (96, 92, 88):
+        cache.positions("user", artists[:remaining])
+    assert cache.stats()["incremental"] == 2
+    assert cache.stats()["full"] == 2
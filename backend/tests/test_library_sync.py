@@ -0,0 +1,130 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from services.library_store import LibraryStore
+from services.library_sync import PAGE, ensure_library_synced, sync_library
+
+
+def saved(number: int) -> Dict:
+    # Larger numbers were saved later
+    return {"added_at": f"2024-01-01T00:{number:05d}Z", "track": {"id": f"t{number}", "name": f"Track {number}"}}
+
+
+class FakeLibraryClient:
+    """
+    /me/tracks over an in-memory list, newest first, counting page reads.
+    """
+    user_key = "user"
+
+    def __init__(self, numbers: List[int]):
+        self.items = [saved(number) for number in numbers]
+        self.calls = 0
+
+    def ids(self) -> List[str]:
+        return [item["track"]["id"] for item in self.items]
+
+    async def get_saved_tracks(self, limit: int = 20, offset: int = 0, use_cache: bool = True) -> Dict:
+        self.calls += 1
+        return {
+            "items": self.items[offset:offset + limit],
+            "total": len(self.items),
+            "next": "next" if offset + limit < len(self.items) else None,
+        }
+
+    async def aiter_saved_tracks(self, page_size: int = PAGE):
+        for offset in range(0, len(self.items), page_size):
+            self.calls += 1
+            for item in self.items[offset:offset + page_size]:
+                yield item
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LibraryStore(str(tmp_path / "library.db"))
+
+
+@pytest.fixture
+def synced(store):
+    client = FakeLibraryClient(list(range(500, 0, -1)))
+    result = asyncio.run(sync_library(client, store))
+    assert result["mode"] == "full" and result["total"] == 500
+    client.calls = 0
+    return client
+
+
+def sync(client, store):
+    result = asyncio.run(sync_library(client, store))
+    assert store.ordered_ids(client.user_key) == client.ids()
+    return result
+
+
+def test_unchanged_library_costs_one_call(store, synced):
+    result = sync(synced, store)
+    assert (result["mode"], result["added"], result["removed"], result["api_calls"]) == ("incremental", 0, 0, 1)
+
+
+def test_added_tracks_read_only_new_pages(store, synced):
+    synced.items[:0] = [saved(number) for number in range(503, 500, -1)]
+    result = sync(synced, store)
+    assert (result["mode"], result["added"], result["removed"]) == ("incremental", 3, 0)
+    assert result["api_calls"] == synced.calls == 1
+
+
+def test_removal_in_the_middle_is_found_by_probing(store, synced):
+    del synced.items[237]
+    result = sync(synced, store)
+    assert (result["mode"], result["added"], result["removed"]) == ("incremental", 0, 1)
+    # Binary search over 10 pages, not a walk over all of them
+    assert synced.calls <= 6
+
+
+def test_removals_plus_additions(store, synced):
+    del synced.items[400]
+    del synced.items[10]
+    synced.items[:0] = [saved(502), saved(501)]
+    result = sync(synced, store)
+    assert (result["mode"], result["added"], result["removed"]) == ("incremental", 2, 2)
+
+
+def test_removal_at_the_end(store, synced):
+    synced.items.pop()
+    result = sync(synced, store)
+    assert (result["mode"], result["removed"]) == ("incremental", 1)
+
+
+def test_full_resync(store, synced):
+    del synced.items[5]
+    result = asyncio.run(sync_library(synced, store, full=True))
+    assert (result["mode"], result["total"], result["removed"]) == ("full", 499, 1)
+    assert store.ordered_ids(synced.user_key) == synced.ids()
+
+
+def test_unexplained_change_falls_back_to_a_full_walk(store, synced):
+    # An old track showing up mid-list cannot come from adds or removals
+    synced.items.insert(250, saved(10_000))
+    synced.items[250]["added_at"] = "2023-01-01T00:00:00Z"
+    result = sync(synced, store)
+    assert result["mode"] == "full"
+
+
+def test_claim_sync_lease(store):
+    assert store.claim_sync("user", interval_seconds=300)
+    assert not store.claim_sync("user", interval_seconds=0)  # leased to the first claimer
+    store.mark_synced("user", None, 0, reconciled=True)
+    assert not store.claim_sync("user", interval_seconds=300)  # synced just now
+    assert store.claim_sync("user", interval_seconds=0)
+    store.release_claim("user")
+    assert store.claim_sync("user", interval_seconds=0)
+
+
+def test_ensure_library_synced_respects_the_lease(store):
+    client = FakeLibraryClient([3, 2, 1])
+    assert store.claim_sync(client.user_key, interval_seconds=0)
+    assert asyncio.run(ensure_library_synced(client, store, interval=0)) is None
+    assert client.calls == 0
+
+    store.release_claim(client.user_key)
+    assert asyncio.run(ensure_library_synced(client, store, interval=0))["total"] == 3
+    assert asyncio.run(ensure_library_synced(client, store)) is None  # within the sync interval
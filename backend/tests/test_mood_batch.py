@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from transformers.mood_batch_transformer import analyze_moods_batch
+from transformers.mood_visual_transformer import GENRE_MOOD_MAP, analyze_mood_from_genres
+
+GENRES = list(GENRE_MOOD_MAP) + ["dark trap", "k-pop", "nu metalcore", "indie folk", "shoegaze", "hip hop soul", "lo-fi beats"]
+
+
+def random_users(seed, count):
+    rng = random.Random(seed)
+    return [[rng.choice(GENRES) for _ in range(rng.randint(0, 15))] for _ in range(count)]
+
+
+def test_batch_equals_scalar_per_user():
+    users = random_users(10, 3000)
+    for genres, (distribution, dominant) in zip(users, analyze_moods_batch(users)):
+        if not genres:
+            continue
+        expected_distribution, expected_dominant = analyze_mood_from_genres(genres)
+        assert distribution == expected_distribution
+        assert list(distribution) == list(expected_distribution)
+        assert dominant == expected_dominant
+
+
+def test_ties_and_repeats_match_scalar():
+    users = [["pop", "rap"], ["rap", "pop"], ["indie", "folk", "indie folk"], ["metal"] * 7, ["shoegaze", "shoegaze"]]
+    assert analyze_moods_batch(users) == [analyze_mood_from_genres(genres) for genres in users]
+
+
+def test_users_without_genres():
+    # The scalar path has no dominant mood to pick and raises
+    with pytest.raises(ValueError):
+        analyze_mood_from_genres([])
+    assert analyze_moods_batch([[], ["pop"], []]) == [({}, None), analyze_mood_from_genres(["pop"]), ({}, None)]
+    assert analyze_moods_batch([]) == []
+    assert analyze_moods_batch([[], []]) == [({}, None), ({}, None)]
@@ -0,0 +1,36 @@
+import asyncio
+
+from services.pagination import aiter_paged
+
+
+def test_aiter_paged_yields_every_item_in_order():
+    async def fetch_page(offset, limit):
+        await asyncio.sleep(0)
+        return {"items": list(range(offset, min(offset + limit, 25))), "total": 25}
+
+    async def main():
+        return [item async for item in aiter_paged(fetch_page, page_size=10)]
+
+    assert asyncio.run(main()) == list(range(25))
+
+
+def test_stopping_early_waits_for_cancelled_prefetches():
+    settled = []
+
+    async def fetch_page(offset, limit):
+        if offset <= 2:
+            return {"items": [offset, offset + 1], "total": 100}
+        try:
+            await asyncio.sleep(10)
+        finally:
+            settled.append(offset)
+        return {"items": []}
+
+    async def main():
+        pages = aiter_paged(fetch_page, page_size=2, prefetch=3)
+        assert [await pages.__anext__() for _ in range(3)] == [0, 1, 2]
+        await asyncio.sleep(0)
+        await pages.aclose()
+        return list(settled)
+
+    assert asyncio.run(main()) == [4, 6, 8]
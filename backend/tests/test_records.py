@@ -0,0 +1,83 @@
+import copy
+
+from benchmarks.fixtures import page, synthetic_fixtures
+from models.records import TrackRecord, parse_tracks
+from services.spotify_service import compose_mood_response, compose_track_insights
+from transformers.mood_visual_transformer import analyze_mood_from_genres, transform_mood_to_visual_identity
+from transformers.spotify_transformer import extract_genres_from_artists, transform_top_artists_to_planets
+
+
+# The dict-walking versions the record-based transformers replaced
+
+def dict_track_insight(track):
+    return {
+        "id": track.get("id"),
+        "name": track.get("name"),
+        "album": {
+            "name": track.get("album", {}).get("name"),
+            "release_date": track.get("album", {}).get("release_date"),
+            "image": track.get("album", {}).get("images", [{}])[0].get("url"),
+        },
+        "artists": [artist.get("name") for artist in track.get("artists", [])],
+        "popularity": track.get("popularity"),
+        "spotify_url": track.get("external_urls", {}).get("spotify"),
+    }
+
+
+def dict_planets(spotify_response):
+    planets = []
+    for index, artist in enumerate(spotify_response.get("items", [])):
+        planets.append({
+            "id": artist["id"],
+            "name": artist["name"],
+            "rank": index + 1,
+            "orbit_radius": 100 + (index * 40),
+            "planet_size": max(20, 100 - (index * 5)),
+            "image_url": artist["images"][0]["url"] if artist["images"] else None,
+            "genres": artist.get("genres", []),
+        })
+    return planets
+
+
+def fixtures():
+    data = synthetic_fixtures(seed=20, artist_count=60, track_count=60, saved_count=0)
+    artists, tracks = data["top_artists"], data["top_tracks"]
+    # Sparse objects Spotify does send: no images, no genres, no album art or link
+    artists[3]["images"] = []
+    artists[4]["genres"] = []
+    del tracks[5]["album"]["images"]
+    del tracks[6]["external_urls"]
+    tracks[7]["popularity"] = None
+    return artists, tracks
+
+
+def test_track_insights_match_dict_parsing():
+    _, tracks = fixtures()
+    assert compose_track_insights(page(tracks)) == {
+        "tracks": [dict_track_insight(track) for track in tracks],
+        "total_tracks": len(tracks),
+    }
+
+
+def test_planets_match_dict_parsing():
+    artists, _ = fixtures()
+    assert transform_top_artists_to_planets(page(artists))["planets"] == dict_planets(page(artists))
+
+
+def test_mood_response_matches_dict_parsing():
+    artists, _ = fixtures()
+    genres = [genre for artist in artists for genre in artist.get("genres", [])]
+    distribution, dominant = analyze_mood_from_genres(genres)
+    response = compose_mood_response(page(artists))
+    assert extract_genres_from_artists(page(artists)) == genres
+    assert response.mood_distribution == distribution
+    assert response.dominant_mood == dominant
+    assert response.visual_identity == transform_mood_to_visual_identity(dominant)
+    assert response.total_artists_analyzed == len(artists)
+
+
+def test_compact_form_round_trips():
+    _, tracks = fixtures()
+    records = parse_tracks(copy.deepcopy(tracks))
+    albums = {}
+    assert [TrackRecord.from_compact(record.to_compact(), albums) for record in records] == records
@@ -0,0 +1,88 @@
+import time
+
+from services.response_cache import ResponseCache
+
+
+def key(user: str, endpoint: str = "/me", **params):
+    return ResponseCache.make_key(user, endpoint, params)
+
+
+def test_entries_expire_after_their_ttl():
+    cache = ResponseCache(stale_seconds=0)
+    cache.set(key("a"), {"id": "a"}, size=10, ttl=0.05)
+    assert cache.get(key("a")) == {"id": "a"}
+    time.sleep(0.06)
+    assert cache.get(key("a")) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_ttl_by_endpoint_prefix():
+    cache = ResponseCache(endpoint_ttls={"/me": 10, "/me/top/": 100, "/off": 0}, default_ttl=5)
+    assert cache.ttl_for("/me") == 10
+    assert cache.ttl_for("/me/top/artists") == 100
+    assert cache.ttl_for("/artists") == 5
+    cache.set(key("a", "/off"), {}, size=1)
+    assert cache.get(key("a", "/off")) is None
+
+
+def test_least_recently_used_evicted_by_bytes():
+    cache = ResponseCache(max_bytes=300)
+    for name in "abc":
+        cache.set(key(name), name, size=100)
+    assert cache.get(key("a")) == "a"  # now most recently used
+
+    cache.set(key("d"), "d", size=100)
+    assert cache.get(key("b")) is None
+    assert [cache.get(key(name)) for name in "acd"] == ["a", "c", "d"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 300
+
+
+def test_oversized_entries_are_not_cached():
+    cache = ResponseCache(max_bytes=100)
+    cache.set(key("a"), "a", size=101)
+    assert cache.get(key("a")) is None and cache.stats()["bytes"] == 0
+
+
+def test_stale_entries_served_only_on_request():
+    cache = ResponseCache(stale_seconds=60)
+    cache.set(key("a"), "old", size=10, ttl=0.01)
+    time.sleep(0.02)
+    for _ in range(5):
+        assert cache.get(key("a")) is None
+    assert cache.get_stale(key("a")) == "old"
+    stats = cache.stats()
+    # Counted once however often the stale entry is looked up
+    assert (stats["expirations"], stats["misses"], stats["stale_hits"]) == (1, 5, 1)
+
+    cache.set(key("a"), "new", size=10)
+    assert cache.get(key("a")) == "new"
+
+
+def test_stale_window_ends():
+    cache = ResponseCache(stale_seconds=0.02)
+    cache.set(key("a"), "old", size=10, ttl=0.01)
+    time.sleep(0.04)
+    assert cache.get_stale(key("a")) is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["expirations"] == 1
+
+
+def test_fresh_entry_is_not_counted_expired_by_get_stale():
+    cache = ResponseCache(stale_seconds=60)
+    cache.set(key("a"), "fresh", size=10)
+    assert cache.get_stale(key("a")) == "fresh"
+    assert cache.stats()["expirations"] == 0
+
+
+def test_invalidate_user_drops_only_their_entries():
+    cache = ResponseCache()
+    cache.set(key("a", "/me"), 1, size=10)
+    cache.set(key("a", "/me/top/artists", limit=10), 2, size=10)
+    cache.set(key("b", "/me"), 3, size=10)
+
+    assert cache.invalidate_user("a") == 2
+    assert cache.get(key("a", "/me")) is None
+    assert cache.get(key("b", "/me")) == 3
+    assert cache.stats()["bytes"] == 10 and cache.stats()["users"] == 1
+    assert cache.invalidate_user("a") == 0
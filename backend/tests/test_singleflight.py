@@ -0,0 +1,45 @@
+import asyncio
+import gc
+
+from services.singleflight import AsyncSingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "page"
+
+    async def main():
+        return await asyncio.gather(*[flight.do("key", fetch) for _ in range(3)])
+
+    assert asyncio.run(main()) == ["page"] * 3
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 3, "shared": 2, "in_flight": 0}
+
+
+def test_failure_after_every_caller_is_cancelled_is_not_reported_as_unretrieved():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        unhandled = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+
+        caller = asyncio.ensure_future(flight.do("key", fail))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+
+        await asyncio.sleep(0.05)
+        gc.collect()
+        return unhandled
+
+    assert asyncio.run(main()) == []
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from services.snapshot_store import KEYFRAME_INTERVAL, SnapshotStore, apply_delta, encode_delta
+
+SERIES = ("user", "top_artists", "medium_term")
+
+
+def ranking(seed: int, size: int = 50):
+    rng = random.Random(seed)
+    pool = [f"artist{index}" for index in range(80)]
+    rng.shuffle(pool)
+    return pool[:size]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots.db"))
+
+
+def test_reordered_ranking_round_trips_as_references():
+    previous = {"ids": ["a", "b", "c", "d"], "label": "x"}
+    current = {"ids": ["c", "a", "e", "b"], "label": "x"}
+    delta = encode_delta(previous, current)
+    assert delta == {"ids": {"ref": [2, 0, "e", 1]}}
+    assert apply_delta(previous, delta) == current
+
+
+def test_changed_and_removed_fields_round_trip():
+    previous = {"ids": ["a"], "mood": {"Calm": 60.0}, "gone": 1}
+    current = {"ids": ["a"], "mood": {"Calm": 40.0, "Upbeat": 60.0}, "new": [1, 2]}
+    delta = encode_delta(previous, current)
+    assert delta["-"] == ["gone"] and "ids" not in delta
+    assert apply_delta(previous, delta) == current
+
+
+def test_random_rankings_round_trip():
+    state = {"ids": ranking(0)}
+    for seed in range(1, 50):
+        current = {"ids": ranking(seed)}
+        assert apply_delta(state, encode_delta(state, current)) == current
+        state = current
+
+
+def test_unchanged_state_is_not_written(store):
+    assert store.append(*SERIES, {"ids": ["a", "b"]}, taken_at=1)
+    assert not store.append(*SERIES, {"ids": ["a", "b"]}, taken_at=2)
+    assert store.stats()["snapshots"] == 1
+
+
+def keyframe_flags(store):
+    return [
+        bool(keyframe) for (keyframe,) in store.connection().execute(
+            "SELECT keyframe FROM snapshots ORDER BY taken_at"
+        )
+    ]
+
+
+def test_keyframe_every_interval_and_replay_across_it(store):
+    states = [{"ids": ranking(seed)} for seed in range(2 * KEYFRAME_INTERVAL + 1)]
+    for index, state in enumerate(states):
+        assert store.append(*SERIES, state, taken_at=100 + index)
+
+    flags = keyframe_flags(store)
+    assert [index for index, flag in enumerate(flags) if flag] == [0, KEYFRAME_INTERVAL, 2 * KEYFRAME_INTERVAL]
+    assert not flags[KEYFRAME_INTERVAL - 1]  # delta #29 still replays from the first keyframe
+
+    for index, state in enumerate(states):
+        assert store.state_at(*SERIES, as_of=100 + index).state == state
+        assert store.state_at(*SERIES, as_of=100 + index + 0.5).state == state
+
+
+def test_state_at_before_first_snapshot(store):
+    store.append(*SERIES, {"ids": ["a"]}, taken_at=100)
+    assert store.state_at(*SERIES, as_of=99) is None
+    assert store.state_at("someone else", "top_artists", "medium_term", as_of=200) is None
+
+
+def test_between_spans_a_keyframe(store):
+    states = [{"ids": ranking(seed)} for seed in range(KEYFRAME_INTERVAL + 10)]
+    for index, state in enumerate(states):
+        store.append(*SERIES, state, taken_at=100 + index)
+
+    start, end = 100 + KEYFRAME_INTERVAL - 5.5, 100 + KEYFRAME_INTERVAL + 5
+    history = store.between(*SERIES, start, end)
+    # The snapshot in force at start, then each one in the range
+    assert [snapshot.taken_at for snapshot in history] == list(range(100 + KEYFRAME_INTERVAL - 6, 100 + KEYFRAME_INTERVAL + 6))
+    assert [snapshot.state for snapshot in history] == states[KEYFRAME_INTERVAL - 6:KEYFRAME_INTERVAL + 6]
+
+
+def test_between_before_first_snapshot_has_no_baseline(store):
+    store.append(*SERIES, {"ids": ["a"]}, taken_at=100)
+    store.append(*SERIES, {"ids": ["b", "a"]}, taken_at=200)
+    history = store.between(*SERIES, 50, 150)
+    assert [(snapshot.taken_at, snapshot.state) for snapshot in history] == [(100, {"ids": ["a"]})]
@@ -0,0 +1,41 @@
+from collections import Counter
+
+from benchmarks.fixtures import fake_track, synthetic_fixtures
+from models.records import TrackRecord
+from services.streaming import TOP_N, MoodAggregate, TrackInsightsAggregate
+
+
+def test_track_insights_top_artists_match_exact_counts_under_capacity():
+    tracks = [TrackRecord.from_json(item["track"]) for item in synthetic_fixtures()["saved_tracks"]]
+    aggregate = TrackInsightsAggregate()
+    for track in tracks:
+        aggregate.add(track)
+
+    exact = Counter(name for track in tracks for name in track.artist_names)
+    top = aggregate.summary()["top_artists"]
+    assert len(top) == TOP_N
+    for entry in top:
+        assert entry["count"] == exact[entry["artist"]]
+        assert entry["error"] == 0
+    assert sorted((entry["count"] for entry in top), reverse=True) == [count for _, count in exact.most_common(TOP_N)]
+
+
+def test_track_insights_artists_stay_bounded_on_a_long_tail():
+    aggregate = TrackInsightsAggregate(capacity=50)
+    # Every track has two artists never seen before
+    for index in range(2000):
+        aggregate.add(TrackRecord.from_json(fake_track(index)))
+
+    assert len(aggregate.artists.counts) == 50
+    assert aggregate.summary()["total_tracks"] == 2000
+
+
+def test_mood_aggregate_keeps_heavy_genres_and_bounds_the_rest():
+    aggregate = MoodAggregate(capacity=20)
+    for index in range(1000):
+        aggregate.add(["indie pop", f"micro genre {index}"])
+
+    top = aggregate.summary()["top_genres"]
+    assert len(aggregate.genres.counts) == 20
+    assert top[0]["genre"] == "indie pop"
+    assert top[0]["count"] - top[0]["error"] <= 1000 <= top[0]["count"]
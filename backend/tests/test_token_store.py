@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services import spotify_auth
+from services.spotify_auth import TokenRefresher
+from services.token_store import TokenStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TokenStore(str(tmp_path / "sessions.db"))
+
+
+def add_session(store, session_id, user_id=None, last_seen_at=None, expires_at=None):
+    # Raw insert, for rows create_session would not leave behind (e.g. from before logins replaced sessions)
+    now = time.time()
+    store.connection().execute(
+        "INSERT INTO sessions (session_id, user_id, access_token, refresh_token, expires_at, last_seen_at, created_at) "
+        "VALUES (?, ?, ?, 'refresh', ?, ?, ?)",
+        (session_id, user_id, f"token-{session_id}", now + 3600 if expires_at is None else expires_at,
+         now if last_seen_at is None else last_seen_at, now),
+    )
+
+
+def test_active_sessions_keeps_the_latest_session_per_user(store):
+    now = time.time()
+    add_session(store, "alice-old", "alice", last_seen_at=now - 10)
+    add_session(store, "alice-new", "alice", last_seen_at=now)
+    add_session(store, "bob", "bob")
+
+    active = {session.session_id for session in store.active_sessions(seen_within=60)}
+    assert active == {"alice-new", "bob"}
+
+
+def test_active_sessions_treats_unresolved_users_separately(store):
+    first = store.create_session("token-x", "refresh", 3600)
+    second = store.create_session("token-y", "refresh", 3600)
+    store.connection().execute("UPDATE sessions SET last_seen_at = last_seen_at - 10 WHERE session_id = ?", (first.session_id,))
+
+    active = {session.session_id for session in store.active_sessions(seen_within=60)}
+    assert active == {first.session_id, second.session_id}
+
+
+def test_active_sessions_returns_one_session_on_a_last_seen_tie(store):
+    now = time.time()
+    add_session(store, "alice-1", "alice", last_seen_at=now)
+    add_session(store, "alice-2", "alice", last_seen_at=now)
+
+    active = store.active_sessions(seen_within=60)
+    assert len(active) == 1 and active[0].session_id in {"alice-1", "alice-2"}
+
+
+def test_active_sessions_skips_idle_sessions(store):
+    idle = store.create_session("token-old", "refresh", 3600, user_id="carol")
+    store.connection().execute("UPDATE sessions SET last_seen_at = last_seen_at - 120 WHERE session_id = ?", (idle.session_id,))
+
+    assert store.active_sessions(seen_within=60) == []
+
+
+def test_new_login_replaces_the_users_older_sessions(store):
+    older = store.create_session("token-a1", "refresh", 3600, user_id="alice")
+    unresolved = store.create_session("token-x", "refresh", 3600)
+    bob = store.create_session("token-b", "refresh", 3600, user_id="bob")
+    newer = store.create_session("token-a2", "refresh", 3600, user_id="alice")
+
+    assert store.get(older.session_id) is None
+    assert store.get(newer.session_id) is not None
+    assert store.get(unresolved.session_id) is not None
+    assert store.get(bob.session_id) is not None
+
+
+def test_due_for_refresh_skips_idle_sessions(store):
+    now = time.time()
+    add_session(store, "active", "alice", expires_at=now + 60)
+    add_session(store, "idle", "bob", expires_at=now + 60, last_seen_at=now - 7200)
+    add_session(store, "not-due", "carol", expires_at=now + 3600)
+
+    due = store.due_for_refresh(within_seconds=300, seen_within=3600)
+    assert [session.session_id for session in due] == ["active"]
+
+
+def test_delete_idle_sweeps_only_idle_sessions(store):
+    now = time.time()
+    add_session(store, "active", "alice")
+    add_session(store, "idle", "bob", last_seen_at=now - 7200)
+
+    assert store.delete_idle(3600) == 1
+    assert store.get("idle") is None
+    assert store.get("active") is not None
+
+
+def test_refresher_sweeps_idle_sessions_and_leaves_them_unrefreshed(store):
+    now = time.time()
+    add_session(store, "idle", "bob", expires_at=now + 60, last_seen_at=now - 7200)
+    refresher = TokenRefresher(store=store, max_idle_seconds=3600)
+
+    assert asyncio.run(refresher.run_once()) == 0
+    assert refresher.swept == 1
+    assert store.get("idle") is None
+
+
+def failing_refresh(status_code, error):
+    async def refresh(refresh_token):
+        request = httpx.Request("POST", "https://accounts.spotify.com/api/token")
+        response = httpx.Response(status_code, json={"error": error}, request=request)
+        raise httpx.HTTPStatusError("token refresh failed", request=request, response=response)
+    return refresh
+
+
+@pytest.mark.parametrize("status_code, error", [(400, "invalid_client"), (401, "invalid_client"), (400, "invalid_request")])
+def test_refresher_keeps_sessions_on_errors_that_are_not_the_sessions_fault(store, monkeypatch, status_code, error):
+    monkeypatch.setattr(spotify_auth, "refresh_access_token", failing_refresh(status_code, error))
+    add_session(store, "alice", "alice", expires_at=time.time() + 60)
+    refresher = TokenRefresher(store=store)
+
+    asyncio.run(refresher.refresh_session(store.get("alice")))
+    assert refresher.failed == 1
+    assert store.get("alice") is not None
+
+
+def test_refresher_deletes_sessions_with_a_revoked_refresh_token(store, monkeypatch):
+    monkeypatch.setattr(spotify_auth, "refresh_access_token", failing_refresh(400, "invalid_grant"))
+    add_session(store, "alice", "alice", expires_at=time.time() + 60)
+    refresher = TokenRefresher(store=store)
+
+    asyncio.run(refresher.refresh_session(store.get("alice")))
+    assert store.get("alice") is None
+
+
+def test_user_key_survives_token_refreshes_without_a_user_id(store):
+    session = store.create_session("token-1", "refresh", 3600)
+    store.update_tokens(session.session_id, "token-2", 3600)
+
+    refreshed = store.get(session.session_id)
+    assert refreshed.access_token == "token-2"
+    assert refreshed.user_key == session.user_key
+    assert session.session_id not in session.user_key
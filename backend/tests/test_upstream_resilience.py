@@ -0,0 +1,272 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+import services.async_spotify_client as async_client_module
+import services.spotify_client as client_module
+from services.async_spotify_client import AsyncSpotifyClient
+from services.spotify_client import SpotifyClient
+from services.upstream_resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    Bulkhead,
+    CircuitBreaker,
+    UpstreamUnavailable,
+    time_left,
+    upstream_deadline,
+)
+from services.upstream_scheduler import Priority, UpstreamRateLimited, UpstreamScheduler
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        breaker.before_call()
+        breaker.record(False)
+
+
+def test_breaker_opens_on_failure_ratio_then_probes_and_closes():
+    breaker = CircuitBreaker("test", min_calls=4, cooldown=0.05)
+    for success in (True, False, True):
+        breaker.before_call()
+        breaker.record(success)
+    assert breaker.state == CLOSED  # below min_calls
+
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN  # 2 of 4 failed
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()  # the probe
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()  # only one probe at a time
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_breaker_stays_closed_below_failure_ratio():
+    breaker = CircuitBreaker("test", min_calls=4)
+    for success in (True, True, True, False, True, False):
+        breaker.before_call()
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("test", min_calls=2, cooldown=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_open_breaker_short_circuits_and_counts():
+    breaker = CircuitBreaker("test", min_calls=2, cooldown=30)
+    trip(breaker)
+    for _ in range(3):
+        with pytest.raises(UpstreamUnavailable) as raised:
+            breaker.before_call()
+    assert raised.value.reason == "circuit open"
+    assert 0 < raised.value.retry_after <= 30
+    assert breaker.stats()["short_circuited"] == 3
+
+
+def test_released_probe_frees_the_probe_slot():
+    breaker = CircuitBreaker("test", min_calls=2, cooldown=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release()  # never reached the upstream
+    breaker.before_call()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_bulkhead_rejects_after_max_wait():
+    bulkhead = Bulkhead(global_limit=1, per_user_limit=1, max_wait=0.05)
+    with bulkhead.slot("a"):
+        started = time.monotonic()
+        with pytest.raises(UpstreamUnavailable):
+            with bulkhead.slot("a"):
+                pass
+        assert time.monotonic() - started >= 0.05
+    assert bulkhead.stats()["rejected"] == 1
+    assert bulkhead.stats()["in_flight"] == 0
+
+
+def test_bulkhead_caller_wait_only_shortens_max_wait():
+    bulkhead = Bulkhead(global_limit=1, max_wait=0.05)
+    with bulkhead.slot("a"):
+        started = time.monotonic()
+        with pytest.raises(UpstreamUnavailable):
+            with bulkhead.slot("b", max_wait=10):
+                pass
+        assert time.monotonic() - started < 1
+
+
+def test_bulkhead_per_user_limit_leaves_room_for_other_users():
+    bulkhead = Bulkhead(global_limit=3, per_user_limit=2, max_wait=0)
+    with bulkhead.slot("a"), bulkhead.slot("a"):
+        with pytest.raises(UpstreamUnavailable):
+            with bulkhead.slot("a"):
+                pass
+        with bulkhead.slot("b"):
+            assert bulkhead.stats()["users_at_limit"] == 1
+            # Global limit reached: even a new user waits
+            with pytest.raises(UpstreamUnavailable):
+                with bulkhead.slot("c"):
+                    pass
+
+
+def test_bulkhead_async_slot_waits_for_release():
+    bulkhead = Bulkhead(global_limit=1, max_wait=1)
+
+    async def hold():
+        async with bulkhead.aslot("a"):
+            await asyncio.sleep(0.05)
+
+    async def main():
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0.01)
+        async with bulkhead.aslot("b"):
+            assert bulkhead.stats()["in_flight"] == 1
+        await holder
+
+    asyncio.run(main())
+    assert bulkhead.stats()["peak_in_flight"] == 1
+
+
+def test_deadlines(monkeypatch):
+    monkeypatch.setenv("TUNIVERSE_UPSTREAM_DEADLINE", "2")
+    monkeypatch.setenv("TUNIVERSE_UPSTREAM_BACKGROUND_DEADLINE", "7")
+    assert upstream_deadline(Priority.INTERACTIVE) == 2
+    assert upstream_deadline(Priority.BACKGROUND) == 7
+
+    assert 0 < time_left(time.monotonic() + 1) <= 1
+    with pytest.raises(UpstreamUnavailable) as raised:
+        time_left(time.monotonic() - 0.01)
+    assert raised.value.reason == "deadline exceeded"
+
+
+@pytest.fixture
+def isolated_upstream(monkeypatch):
+    """
+    Fresh scheduler, breaker and bulkhead for the clients under test.
+    """
+    scheduler = UpstreamScheduler(rate=100, burst=20)
+    breaker = CircuitBreaker("api")
+    bulkhead = Bulkhead(global_limit=2, per_user_limit=2, max_wait=0.2)
+    for module in (client_module, async_client_module):
+        monkeypatch.setattr(module, "get_upstream_scheduler", lambda: scheduler)
+        monkeypatch.setattr(module, "get_circuit_breaker", lambda name="api": breaker)
+        monkeypatch.setattr(module, "get_bulkhead", lambda: bulkhead)
+    return scheduler, breaker, bulkhead
+
+
+def mock_async_http(monkeypatch, handler) -> None:
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(async_client_module, "get_async_http_client", lambda: http)
+
+
+def test_async_deadline_caps_request_timeout(monkeypatch, isolated_upstream):
+    monkeypatch.setenv("TUNIVERSE_UPSTREAM_DEADLINE", "2")
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(200, json={"id": "me"})
+
+    mock_async_http(monkeypatch, handler)
+    asyncio.run(AsyncSpotifyClient("token", user_key="u").get("/me", use_cache=False))
+
+    assert 0 < timeouts[0]["read"] <= 2
+    assert 0 < timeouts[0]["connect"] <= 2
+
+
+def test_sync_deadline_caps_request_timeout(monkeypatch, isolated_upstream):
+    monkeypatch.setenv("TUNIVERSE_UPSTREAM_DEADLINE", "2")
+    timeouts = []
+
+    class Session:
+        def get(self, url, headers, params, timeout):
+            timeouts.append(timeout)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"id": "me"}'
+            return response
+
+    monkeypatch.setattr(client_module, "get_http_session", lambda: Session())
+    SpotifyClient("token", user_key="u").get("/me", use_cache=False)
+
+    connect, read = timeouts[0]
+    assert 0 < connect <= 2 and 0 < read <= 2
+
+
+def test_throttled_background_callers_do_not_hold_bulkhead_slots(monkeypatch, isolated_upstream):
+    scheduler, _, bulkhead = isolated_upstream
+    # Every token is in the interactive reserve: background callers wait indefinitely
+    scheduler.background_floor = scheduler.burst
+    mock_async_http(monkeypatch, lambda request: httpx.Response(200, json={"ok": True}))
+
+    async def main():
+        background = [
+            asyncio.ensure_future(
+                AsyncSpotifyClient("token", user_key=f"job{i}", priority=Priority.BACKGROUND)
+                .get(f"/me/tracks?page={i}", use_cache=False)
+            )
+            for i in range(bulkhead.global_limit + 1)
+        ]
+        await asyncio.sleep(0.05)
+        try:
+            assert scheduler.stats()["queue_depth"]["background"] == len(background)
+            assert bulkhead.stats()["in_flight"] == 0
+            return await AsyncSpotifyClient("token", user_key="user").get("/me", use_cache=False)
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    assert asyncio.run(main()) == {"ok": True}
+    assert bulkhead.stats()["rejected"] == 0
+
+
+def test_scheduler_gives_up_instead_of_outwaiting_max_wait():
+    scheduler = UpstreamScheduler(rate=100, burst=20)
+    scheduler.record_throttle(600)
+
+    started = time.monotonic()
+    with pytest.raises(UpstreamRateLimited):
+        scheduler.acquire(Priority.BACKGROUND, max_wait=5)
+    with pytest.raises(UpstreamRateLimited):
+        asyncio.run(scheduler.acquire_async(Priority.BACKGROUND, max_wait=5))
+    assert time.monotonic() - started < 1
+    assert scheduler.stats()["gave_up"] == 2
+    assert scheduler.stats()["queue_depth"]["background"] == 0
+
+
+def test_scheduler_waits_out_a_window_shorter_than_max_wait():
+    scheduler = UpstreamScheduler(rate=100, burst=20)
+    scheduler.record_throttle(0.05)
+
+    scheduler.acquire(Priority.BACKGROUND, max_wait=1)
+    assert scheduler.stats()["gave_up"] == 0
+
+
+def test_background_fetch_fails_fast_during_a_long_retry_after(monkeypatch, isolated_upstream):
+    scheduler, _, bulkhead = isolated_upstream
+    scheduler.record_throttle(3600)
+    mock_async_http(monkeypatch, lambda request: httpx.Response(200, json={"ok": True}))
+
+    client = AsyncSpotifyClient("token", user_key="job", priority=Priority.BACKGROUND)
+    started = time.monotonic()
+    with pytest.raises(UpstreamRateLimited):
+        asyncio.run(client.get("/me/tracks", use_cache=False))
+    assert time.monotonic() - started < 1
+    assert bulkhead.stats()["in_flight"] == 0
@@ -0,0 +1,100 @@
+"""
+Mood from audio features instead of genres.
+
+Tracks are held as one float column per feature (valence, energy,
+danceability, tempo), so labelling thousands of them is a handful of
+array operations. Each mood has a prototype point in that space, placed
+on the valence/arousal plane the way the moods are usually described
+(aggressive = tense and loud, calm = quiet and content, ...); a track
+takes the mood of its nearest prototype, or Other if it is near none of
+them. Moods are the ones the genre engine uses, so visual identities
+carry over.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+OTHER_MOOD = "Other"
+
+FEATURES = ("valence", "energy", "danceability", "tempo")
+
+# Tempo (BPM) is mapped onto 0..1 over this range before comparing
+TEMPO_RANGE = (60.0, 180.0)
+
+# Prototype per mood: valence, energy, danceability, scaled tempo
+MOOD_PROTOTYPES: Dict[str, Tuple[float, float, float, float]] = {
+    "Aggressive": (0.25, 0.90, 0.45, 0.65),
+    "Intense": (0.45, 0.80, 0.50, 0.75),
+    "Upbeat": (0.80, 0.75, 0.75, 0.55),
+    "Confident": (0.55, 0.65, 0.80, 0.45),
+    "Reflective": (0.25, 0.35, 0.45, 0.40),
+    "Calm": (0.45, 0.20, 0.35, 0.30),
+}
+
+# Valence and energy drive mood; danceability and tempo refine it
+FEATURE_WEIGHTS = np.array([1.0, 1.0, 0.6, 0.3])
+
+# Tracks farther than this from every prototype are Other
+OTHER_DISTANCE = 0.45
+
+MOODS: List[str] = list(MOOD_PROTOTYPES) + [OTHER_MOOD]
+_PROTOTYPES = np.array(list(MOOD_PROTOTYPES.values()))
+_OTHER = len(MOODS) - 1
+
+
+def feature_columns(audio_features: Iterable[Optional[Dict]]) -> np.ndarray:
+    """
+    tracks x FEATURES float array, NaN where a feature is missing. Tracks
+    Spotify has no features for (None entries) are skipped.
+    """
+    nan = float("nan")
+    rows = [
+        tuple(nan if features.get(name) is None else features[name] for name in FEATURES)
+        for features in audio_features
+        if features
+    ]
+    return np.array(rows, dtype=float).reshape(-1, len(FEATURES))
+
+
+def label_tracks(columns: np.ndarray) -> np.ndarray:
+    """
+    Index into MOODS per track.
+    """
+    if not len(columns):
+        return np.zeros(0, dtype=np.int64)
+
+    scaled = columns.copy()
+    low, high = TEMPO_RANGE
+    scaled[:, 3] = np.clip((scaled[:, 3] - low) / (high - low), 0, 1)
+
+    difference = scaled[:, None, :] - _PROTOTYPES[None, :, :]
+    distance = np.sqrt((difference ** 2 * FEATURE_WEIGHTS).sum(axis=2) / FEATURE_WEIGHTS.sum())
+
+    labels = np.nan_to_num(distance, nan=np.inf).argmin(axis=1)
+    # NaN distances (missing features) compare False, so they end up here too
+    labels[~(distance.min(axis=1) <= OTHER_DISTANCE)] = _OTHER
+    return labels
+
+
+def summarize_labels(labels: np.ndarray) -> Tuple[Dict[str, float], Optional[str]]:
+    """
+    Percentage of tracks per mood (moods with no tracks left out, in MOODS
+    order) and the dominant mood; ({}, None) for no tracks.
+    """
+    counts = np.bincount(labels, minlength=len(MOODS))
+    total = counts.sum()
+    if not total:
+        return {}, None
+
+    shares = np.round(counts / total * 100, 2).tolist()
+    distribution = {MOODS[index]: shares[index] for index in np.flatnonzero(counts).tolist()}
+    return distribution, MOODS[int(counts.argmax())]
+
+
+def analyze_mood_from_audio_features(audio_features: Iterable[Optional[Dict]]) -> Tuple[Dict[str, float], Optional[str], int]:
+    """
+    Mood distribution, dominant mood and number of tracks analyzed.
+    """
+    labels = label_tracks(feature_columns(audio_features))
+    distribution, dominant_mood = summarize_labels(labels)
+    return distribution, dominant_mood, len(labels)
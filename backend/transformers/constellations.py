@@ -0,0 +1,185 @@
+"""
+Constellations: groups of artists with similar genres.
+
+Similarity is the cosine between IDF-weighted genre vectors, computed for
+all pairs as the sparse product of the artists x genres matrix with its
+transpose; pairs sharing no genre never appear in it. Artists are linked
+when their similarity reaches a threshold and constellations are the
+connected components of that graph. A component too large to
+read as one constellation is split by raising the threshold inside it
+until it breaks up, which keeps loose chains of related artists from
+merging into one blob.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from models.records import ArtistRecord
+from transformers.galaxy_layout import genre_matrix, genre_vocabulary
+
+MIN_SIMILARITY = 0.35
+THRESHOLD_STEP = 0.1
+TOP_GENRES = 5
+BLOCK_ROWS = 1024
+
+
+def max_constellation_size(count: int) -> int:
+    """
+    Largest constellation left unsplit: grows with the library, since a
+    small galaxy reads best as a handful of groups and a large one would
+    otherwise shatter into hundreds.
+    """
+    return max(10, round(1.5 * math.sqrt(count)))
+
+
+def unit_rows(weights: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    Rows scaled to unit length; rows of artists without genres stay zero.
+    """
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    return sparse.csr_matrix(sparse.diags(np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)) @ weights)
+
+
+def similar_pairs(unit: sparse.csr_matrix, min_similarity: float = MIN_SIMILARITY) -> sparse.csr_matrix:
+    """
+    artists x artists cosine similarity, keeping only entries of at least
+    `min_similarity`, zero diagonal. Computed in row blocks and thresholded
+    as it goes, so a genre most artists share (say "pop") never
+    materializes its n^2 weak pairs all at once.
+    """
+    blocks = []
+    transposed = sparse.csc_matrix(unit.T)
+    for start in range(0, unit.shape[0], BLOCK_ROWS):
+        block = sparse.csr_matrix(unit[start:start + BLOCK_ROWS] @ transposed)
+        block.data[block.data < min_similarity] = 0
+        block.eliminate_zeros()
+        blocks.append(block)
+    similarity = sparse.csr_matrix(sparse.vstack(blocks)) if blocks else sparse.csr_matrix(unit.shape[:1] * 2)
+    similarity = sparse.csr_matrix(similarity - sparse.diags(similarity.diagonal()))
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def _above(similarity: sparse.csr_matrix, threshold: float) -> sparse.csr_matrix:
+    kept = similarity.copy()
+    kept.data[kept.data < threshold] = 0
+    kept.eliminate_zeros()
+    return kept
+
+
+def cluster_labels(
+    similarity: sparse.csr_matrix,
+    min_similarity: float = MIN_SIMILARITY,
+    max_size: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Constellation label per artist; -1 for artists linked to no one at
+    `min_similarity`.
+    Labels are numbered by each constellation's best-ranked (lowest index)
+    artist.
+    """
+    count = similarity.shape[0]
+    labels = np.full(count, -1)
+    if count == 0:
+        return labels
+    max_size = max_size or max_constellation_size(count)
+
+    clusters: List[np.ndarray] = []
+    pending = [(np.arange(count), similarity, min_similarity)]
+    while pending:
+        members, within, threshold = pending.pop()
+        linked = _above(within, threshold)
+        components, component_labels = connected_components(linked, directed=False)
+        order = np.argsort(component_labels, kind="stable")
+        bounds = np.flatnonzero(np.diff(component_labels[order])) + 1
+        for group in np.split(order, bounds):
+            if len(group) == 1:
+                continue
+            if len(group) > max_size and threshold + THRESHOLD_STEP <= 1:
+                pending.append((members[group], linked[group][:, group], threshold + THRESHOLD_STEP))
+            else:
+                clusters.append(members[group])
+
+    for label, group in enumerate(sorted(clusters, key=lambda group: group.min())):
+        labels[group] = label
+
+    # Splitting strands artists that were only weakly linked; each joins
+    # the constellation of its most similar linked neighbour
+    while True:
+        linked_orphans = np.flatnonzero((labels < 0) & (similarity.getnnz(axis=1) > 0))
+        if not len(linked_orphans):
+            break
+        to_labeled = similarity[linked_orphans] @ sparse.diags((labels >= 0).astype(float))
+        attachable = to_labeled.getnnz(axis=1) > 0
+        if not attachable.any():
+            break
+        nearest = np.asarray(to_labeled[attachable].argmax(axis=1)).ravel()
+        labels[linked_orphans[attachable]] = labels[nearest]
+    return labels
+
+
+def build_constellations(
+    artists: Sequence[ArtistRecord],
+    min_similarity: float = MIN_SIMILARITY,
+    max_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Constellations of `artists` (highest ranked first), each named after
+    its most common genres, largest first.
+    """
+    vocabulary = genre_vocabulary(artists)
+    genres = list(vocabulary)
+    weights = genre_matrix(artists, vocabulary)
+    unit = unit_rows(weights)
+    labels = cluster_labels(similar_pairs(unit, min_similarity), min_similarity, max_size)
+    clustered = np.flatnonzero(labels >= 0)
+    count = int(labels.max()) + 1 if len(clustered) else 0
+
+    incidence = weights.copy()
+    incidence.data[:] = 1
+    membership = sparse.csr_matrix(
+        (np.ones(len(clustered)), (labels[clustered], clustered)), shape=(count, len(artists))
+    )
+    genre_counts = sparse.csr_matrix(membership @ incidence)
+    genre_counts.sort_indices()
+    sizes = np.bincount(labels[clustered], minlength=count)
+
+    # Mean pairwise cosine: the sum over pairs is |sum of unit rows|^2 - size
+    centroid_sums = sparse.csr_matrix(membership @ unit)
+    pair_sums = np.asarray(centroid_sums.multiply(centroid_sums).sum(axis=1)).ravel() - sizes
+    cohesion = pair_sums / np.maximum(sizes * (sizes - 1), 1)
+
+    members_by_label: List[List[int]] = [[] for _ in range(count)]
+    for index in clustered.tolist():
+        members_by_label[labels[index]].append(index)
+
+    constellations = []
+    for label in range(count):
+        row = slice(genre_counts.indptr[label], genre_counts.indptr[label + 1])
+        columns, counts = genre_counts.indices[row], genre_counts.data[row]
+        # Most common first; ties go to the genre seen first (in rank order)
+        top = np.argsort(-counts, kind="stable")[:TOP_GENRES]
+        top_genres = [genres[column] for column in columns[top].tolist()]
+        constellations.append({
+            "id": label,
+            "name": " / ".join(top_genres[:2]),
+            "size": int(sizes[label]),
+            "cohesion": round(float(cohesion[label]), 3),
+            "genres": [
+                {"genre": genre, "artists": int(artist_count)}
+                for genre, artist_count in zip(top_genres, counts[top].tolist())
+            ],
+            "artists": [artists[index].id for index in members_by_label[label]],
+        })
+    constellations.sort(key=lambda constellation: (-constellation["size"], constellation["id"]))
+
+    return {
+        "total_artists": len(artists),
+        "total_constellations": len(constellations),
+        "min_similarity": min_similarity,
+        "constellations": constellations,
+        "unclustered": [artists[index].id for index in np.flatnonzero(labels < 0).tolist()],
+    }
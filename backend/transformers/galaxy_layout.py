@@ -0,0 +1,406 @@
+"""
+Galaxy layout from a shared-genre similarity graph.
+
+Artists are linked by the genres they share, each genre weighted by how
+rare it is (IDF). Every connected group of artists is placed with a
+spectral embedding: the leading non-trivial eigenvectors of the
+normalized similarity matrix, computed as singular vectors of the sparse
+artists x genres matrix so the artists x artists matrix is never built.
+Two dimensions cannot separate dozens of scenes, so large groups are
+first split into communities (k-means on a higher-dimensional embedding),
+each laid out on its own and then placed as a disc by a small
+force-directed pass. Groups are packed on a golden spiral, largest in
+the middle, and planets that land too close together are pushed apart.
+
+Everything is deterministic for a given input: dense SVD for small
+groups, ARPACK and k-means with seeded starts for large ones, and
+eigenvector signs fixed by their largest entry.
+"""
+import math
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.cluster.vq import kmeans2
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import svds
+from scipy.spatial import cKDTree
+
+from models.records import ArtistRecord
+
+PLANET_SPACING = 60.0
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+# Groups up to this many matrix cells use dense SVD; larger ones use ARPACK
+DENSE_SVD_MAX_CELLS = 2_000_000
+# Positions need a few significant digits, not machine precision
+SVD_TOLERANCE = 1e-4
+
+# Groups larger than twice this are split into communities of about this size
+COMMUNITY_SIZE = 60
+MAX_EMBEDDING_DIMENSIONS = 16
+FORCE_ITERATIONS = 150
+COLLISION_ITERATIONS = 8
+
+# Incremental updates reuse the previous layout when at most this share
+# of the artists (or INCREMENTAL_MIN_CHANGES, whichever is larger) changed
+INCREMENTAL_MAX_SHARE = 0.1
+INCREMENTAL_MIN_CHANGES = 3
+
+# (x, y) per artist id
+Positions = Dict[str, Tuple[float, float]]
+
+
+def genre_vocabulary(artists: Sequence[ArtistRecord]) -> Dict[str, int]:
+    """
+    Column per genre, in order of first appearance.
+    """
+    vocabulary: Dict[str, int] = {}
+    for artist in artists:
+        for genre in artist.genres:
+            vocabulary.setdefault(genre, len(vocabulary))
+    return vocabulary
+
+
+def genre_matrix(
+    artists: Sequence[ArtistRecord],
+    vocabulary: Optional[Dict[str, int]] = None,
+) -> sparse.csr_matrix:
+    """
+    artists x genres (columns as in genre_vocabulary), entries sqrt(idf) so
+    that B @ B.T is the IDF-weighted count of shared genres.
+    """
+    vocabulary = vocabulary if vocabulary is not None else genre_vocabulary(artists)
+    rows: List[int] = []
+    columns: List[int] = []
+    for row, artist in enumerate(artists):
+        for genre in dict.fromkeys(artist.genres):
+            rows.append(row)
+            columns.append(vocabulary[genre])
+
+    shape = (len(artists), len(vocabulary))
+    incidence = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=shape)
+    document_frequency = np.asarray(incidence.sum(axis=0)).ravel()
+    idf = np.log1p(len(artists) / np.maximum(document_frequency, 1))
+    return sparse.csr_matrix(incidence @ sparse.diags(np.sqrt(idf)))
+
+
+def sunflower(count: int, spacing: float = PLANET_SPACING, start: int = 0) -> np.ndarray:
+    """
+    `count` evenly spread points on a golden-angle spiral around the origin.
+    """
+    index = np.arange(start, start + count, dtype=float)
+    radius = spacing * np.sqrt(index)
+    angle = index * GOLDEN_ANGLE
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle)))
+
+
+def _fix_signs(vectors: np.ndarray) -> np.ndarray:
+    # Eigenvectors are only defined up to sign; make each one's largest entry positive
+    largest = vectors[np.abs(vectors).argmax(axis=0), np.arange(vectors.shape[1])]
+    return vectors * np.where(largest < 0, -1.0, 1.0)
+
+
+def spectral_embedding(weights: sparse.csr_matrix, dimensions: int, seed: int = 0) -> np.ndarray:
+    """
+    The first `dimensions` non-trivial Laplacian-eigenmap coordinates of one
+    connected group (fewer if the group is too small to have them).
+    """
+    count, genres = weights.shape
+    degrees = weights @ (weights.T @ np.ones(count))
+    scaled = sparse.diags(1 / np.sqrt(degrees)) @ weights
+
+    wanted = min(dimensions + 1, count, genres)
+    if count * genres <= DENSE_SVD_MAX_CELLS or min(count, genres) <= wanted + 1:
+        vectors, _, _ = np.linalg.svd(scaled.toarray(), full_matrices=False)
+        vectors = vectors[:, :wanted]
+    else:
+        start = np.random.default_rng(seed).standard_normal(min(count, genres))
+        vectors, values, _ = svds(scaled, k=wanted, v0=start, tol=SVD_TOLERANCE)
+        vectors = vectors[:, np.argsort(-values)]
+
+    # Column 0 is the trivial sqrt(degree) vector
+    return _fix_signs(vectors[:, 1:]) / np.sqrt(degrees)[:, None]
+
+
+def spectral_coordinates(weights: sparse.csr_matrix, seed: int = 0) -> np.ndarray:
+    """
+    2D spectral coordinates for one connected group, scaled into the unit disk.
+    """
+    embedding = np.zeros((weights.shape[0], 2))
+    useful = spectral_embedding(weights, 2, seed)
+    embedding[:, :useful.shape[1]] = useful
+
+    embedding -= embedding.mean(axis=0)
+    extent = np.linalg.norm(embedding, axis=1).max()
+    return embedding / extent if extent > 0 else embedding
+
+
+def communities(weights: sparse.csr_matrix, count: int, seed: int = 0) -> np.ndarray:
+    """
+    Label per artist from k-means on a spectral embedding (spectral
+    clustering); labels are 0..n-1 with no empty communities.
+    """
+    embedding = spectral_embedding(weights, min(count, MAX_EMBEDDING_DIMENSIONS), seed)
+    norms = np.linalg.norm(embedding, axis=1, keepdims=True)
+    embedding = embedding / np.where(norms > 0, norms, 1)
+    with warnings.catch_warnings():
+        # Empty clusters are fine: they are dropped below
+        warnings.simplefilter("ignore", UserWarning)
+        _, labels = kmeans2(embedding, count, iter=20, minit="points", rng=np.random.default_rng(seed))
+    return np.unique(labels, return_inverse=True)[1].ravel()
+
+
+def separate_discs(
+    centers: np.ndarray,
+    radii: np.ndarray,
+    affinity: np.ndarray,
+    iterations: int = FORCE_ITERATIONS,
+) -> np.ndarray:
+    """
+    Force-directed placement of discs: each is pulled toward the
+    affinity-weighted mean of the others and pushed out of any disc it
+    overlaps. Starts from `centers`; the last iterations only resolve
+    overlaps so none remain.
+    """
+    positions = centers.astype(float).copy()
+    totals = affinity.sum(axis=1)
+    pull = np.divide(affinity, totals[:, None], out=np.zeros_like(affinity), where=totals[:, None] > 0)
+    minimum = radii[:, None] + radii[None, :] + PLANET_SPACING / 2
+    np.fill_diagonal(minimum, 0)
+    index = np.arange(len(positions))
+    order_sign = np.where(index[:, None] < index[None, :], -1.0, 1.0)
+
+    for iteration in range(iterations):
+        if iteration < iterations * 2 // 3:
+            positions += 0.1 * np.where(totals[:, None] > 0, pull @ positions - positions, 0)
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = np.linalg.norm(delta, axis=2)
+        overlap = np.maximum(minimum - distance, 0)
+        if not overlap.any():
+            if iteration >= iterations * 2 // 3:
+                break
+            continue
+        direction = delta / np.maximum(distance, 1e-9)[..., None]
+        # Coincident centers are split along x, lower index to the left
+        coincident = distance <= 1e-9
+        direction[coincident] = np.column_stack((order_sign[coincident], np.zeros(coincident.sum())))
+        positions += 0.5 * (direction * overlap[..., None]).sum(axis=1) / np.maximum((overlap > 0).sum(axis=1), 1)[:, None]
+
+    return positions - positions.mean(axis=0)
+
+
+def relax_collisions(
+    points: np.ndarray,
+    min_distance: float = PLANET_SPACING / 2,
+    iterations: int = COLLISION_ITERATIONS,
+) -> np.ndarray:
+    """
+    Push apart pairs closer than `min_distance`, a few rounds, each pair
+    moving half the shortfall. Neighbour pairs come from a k-d tree, so a
+    round costs O(n log n).
+    """
+    points = points.copy()
+    for _ in range(iterations):
+        pairs = cKDTree(points).query_pairs(min_distance, output_type="ndarray")
+        if not len(pairs):
+            break
+        delta = points[pairs[:, 1]] - points[pairs[:, 0]]
+        distance = np.linalg.norm(delta, axis=1)
+        direction = np.where(distance[:, None] > 1e-9, delta / np.maximum(distance, 1e-9)[:, None], (1.0, 0.0))
+        push = direction * ((min_distance - distance) / 2)[:, None]
+        np.add.at(points, pairs[:, 1], push)
+        np.add.at(points, pairs[:, 0], -push)
+    return points
+
+
+def spread_overlaps(points: np.ndarray, spacing: float = PLANET_SPACING) -> np.ndarray:
+    """
+    Fan out points sharing a grid cell of size `spacing` on a small spiral
+    around the cell's centroid, in input order.
+    """
+    if not len(points):
+        return points
+    cells = np.floor(points / spacing).astype(np.int64)
+    _, group, sizes = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    group = group.ravel()
+    if sizes.max() == 1:
+        return points
+
+    order = np.argsort(group, kind="stable")
+    starts = np.cumsum(sizes) - sizes
+    member = np.empty(len(points), dtype=np.int64)
+    member[order] = np.arange(len(points)) - np.repeat(starts, sizes)
+
+    centroids = np.zeros((len(sizes), 2))
+    np.add.at(centroids, group, points)
+    centroids /= sizes[:, None]
+
+    crowded = sizes[group] > 1
+    spread = points.copy()
+    spread[crowded] = centroids[group[crowded]] + sunflower(int(member.max()) + 1, spacing)[member[crowded]]
+    return spread
+
+
+def _group_radius(size: int) -> float:
+    return 0.75 * PLANET_SPACING * math.sqrt(size)
+
+
+def _spectral_group(weights: sparse.csr_matrix, seed: int) -> np.ndarray:
+    size = weights.shape[0]
+    if size <= 3:
+        return sunflower(size)
+    weights = weights[:, np.flatnonzero(weights.getnnz(axis=0))]
+    return relax_collisions(spread_overlaps(spectral_coordinates(weights, seed) * _group_radius(size)))
+
+
+def group_layout(weights: sparse.csr_matrix, seed: int = 0) -> np.ndarray:
+    """
+    Positions around the origin for one connected group. Small groups get
+    a single spectral layout; larger ones are split into communities, each
+    laid out spectrally, and the communities placed as discs by
+    separate_discs, starting from the spectral layout of the community
+    graph.
+    """
+    size = weights.shape[0]
+    if size <= 2 * COMMUNITY_SIZE:
+        return _spectral_group(weights, seed)
+
+    weights = weights[:, np.flatnonzero(weights.getnnz(axis=0))]
+    labels = communities(weights, math.ceil(size / COMMUNITY_SIZE), seed)
+    count = int(labels.max()) + 1
+    if count == 1:
+        return _spectral_group(weights, seed)
+
+    members = [np.flatnonzero(labels == label) for label in range(count)]
+    local = [_spectral_group(weights[indices], seed) for indices in members]
+    radii = np.array([np.linalg.norm(points, axis=1).max() for points in local]) + PLANET_SPACING / 2
+
+    membership = sparse.csr_matrix((np.ones(size), (labels, np.arange(size))), shape=(count, size))
+    community_weights = sparse.csr_matrix(membership @ weights)
+    sizes = np.array([len(indices) for indices in members], dtype=float)
+    affinity = (community_weights @ community_weights.T).toarray() / np.outer(sizes, sizes)
+    np.fill_diagonal(affinity, 0)
+
+    start = spectral_coordinates(community_weights, seed) * 2 * _group_radius(size)
+    centers = separate_discs(start, radii, affinity)
+
+    positions = np.zeros((size, 2))
+    for indices, points, center in zip(members, local, centers):
+        positions[indices] = center + points
+    return positions
+
+
+def layout_positions(artists: Sequence[ArtistRecord], seed: int = 0) -> np.ndarray:
+    """
+    (x, y) per artist, in input order.
+    """
+    count = len(artists)
+    if count == 0:
+        return np.zeros((0, 2))
+
+    weights = genre_matrix(artists)
+    genres = weights.shape[1]
+    # Components of the bipartite artist-genre graph = groups of related artists
+    if genres:
+        bipartite = sparse.bmat([[None, weights], [weights.T, None]], format="csr")
+    else:
+        bipartite = sparse.csr_matrix((count, count))
+    _, labels = connected_components(bipartite, directed=False)
+    labels = labels[:count]
+
+    groups: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels.tolist()):
+        groups.setdefault(label, []).append(index)
+    # Largest group in the middle; ties by first (highest-ranked) member
+    ordered = sorted(groups.values(), key=lambda members: (-len(members), members[0]))
+
+    # Groups go on a golden spiral, each far enough out for the area inside it
+    positions = np.zeros((count, 2))
+    area = 0.0
+    for number, members in enumerate(ordered):
+        local = group_layout(weights[members], seed)
+        extent = np.linalg.norm(local, axis=1).max() + PLANET_SPACING / 2
+        if number == 0:
+            center = np.zeros(2)
+        else:
+            distance = 1.3 * math.sqrt(area) + extent
+            center = distance * np.array([math.cos(number * GOLDEN_ANGLE), math.sin(number * GOLDEN_ANGLE)])
+        positions[members] = center + local
+        area += extent ** 2
+
+    return positions
+
+
+def extend_layout(
+    artists: Sequence[ArtistRecord],
+    previous: Positions,
+    previous_genres: Dict[str, Tuple[str, ...]],
+) -> Optional[np.ndarray]:
+    """
+    Positions that keep every unchanged artist where it was and place new or
+    changed ones next to the artists they share genres with. None when too
+    much changed for that to stay faithful to a fresh layout.
+    """
+    kept = [
+        index for index, artist in enumerate(artists)
+        if artist.id in previous and previous_genres.get(artist.id) == artist.genres
+    ]
+    changed = len(artists) - len(kept)
+    if not kept or changed > max(INCREMENTAL_MIN_CHANGES, INCREMENTAL_MAX_SHARE * len(artists)):
+        return None
+
+    positions = np.zeros((len(artists), 2))
+    positions[kept] = [previous[artists[index].id] for index in kept]
+    if not changed:
+        return positions
+
+    kept_set = set(kept)
+    fresh = [index for index in range(len(artists)) if index not in kept_set]
+    weights = genre_matrix(artists)
+    similarity = weights[fresh] @ weights[kept].T
+    totals = np.asarray(similarity.sum(axis=1)).ravel()
+    anchors = np.asarray(similarity @ positions[kept]) / np.maximum(totals, 1e-12)[:, None]
+
+    # Unrelated newcomers go just outside the current galaxy
+    lonely = totals == 0
+    if lonely.any():
+        outer = np.linalg.norm(positions[kept], axis=1).max() + PLANET_SPACING
+        angles = (np.arange(lonely.sum()) + 1) * GOLDEN_ANGLE
+        anchors[lonely] = outer * np.column_stack((np.cos(angles), np.sin(angles)))
+
+    # Offset each from its anchor so it does not sit on a neighbour
+    angles = (np.arange(len(fresh)) + 1) * GOLDEN_ANGLE
+    positions[fresh] = anchors + PLANET_SPACING * np.column_stack((np.cos(angles), np.sin(angles)))
+    return positions
+
+
+def planet_size(rank: int, count: int) -> int:
+    return int(round(12 + 88 * (1 - (rank - 1) / count) ** 2))
+
+
+def artists_to_graph_planets(artists: Sequence[ArtistRecord], positions: np.ndarray) -> Dict:
+    """
+    The galaxy payload with graph positions: planets keep their ladder
+    fields, with orbit_radius the distance from the galaxy's center, plus x/y.
+    """
+    planets = []
+    for index, (artist, (x, y)) in enumerate(zip(artists, positions.tolist())):
+        planets.append({
+            "id": artist.id,
+            "name": artist.name,
+            "rank": index + 1,
+            "orbit_radius": round(math.hypot(x, y), 1),
+            "planet_size": planet_size(index + 1, len(artists)),
+            "image_url": artist.image_url,
+            "genres": list(artist.genres),
+            "x": round(x, 1),
+            "y": round(y, 1),
+        })
+
+    return {
+        "total_planets": len(planets),
+        "layout": "graph",
+        "planets": planets,
+    }
@@ -0,0 +1,69 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+class GenreMatcher:
+    """
+    Aho-Corasick automaton over genre keywords.
+
+    One left-to-right pass over a genre string finds every keyword it
+    contains (overlaps included), instead of one substring test per key.
+    Matches come back in keyword-declaration order, which is what keeps
+    mood scoring identical to the old nested loop.
+    """
+
+    def __init__(self, keyword_map: Dict[str, Tuple[str, float]]):
+        self.keywords: List[str] = list(keyword_map)
+        self.values: List[Tuple[str, float]] = [keyword_map[key] for key in self.keywords]
+
+        # Trie: goto[state][char] -> state; out[state] -> keyword indexes ending here
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(index)
+
+        # Breadth-first failure links, merging outputs of the fallback state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        self.match = lru_cache(maxsize=8192)(self._match)
+
+    def _match(self, text: str) -> Tuple[Tuple[str, float], ...]:
+        """
+        Values of every keyword contained in `text`, each once, in declaration order.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return tuple(self.values[index] for index in sorted(found))
@@ -0,0 +1,149 @@
+from itertools import chain
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from transformers.mood_visual_transformer import (
+    GENRE_MATCHER,
+    GENRE_MOOD_MAP,
+    analyze_mood_from_genres,
+    transform_mood_to_visual_identity,
+)
+
+OTHER_MOOD = "Other"
+OTHER_WEIGHT = 0.5
+
+# Column order of the genres × moods weight matrix
+MOODS: List[str] = list(dict.fromkeys(mood for mood, _ in GENRE_MOOD_MAP.values())) + [OTHER_MOOD]
+_MOOD_INDEX = {mood: index for index, mood in enumerate(MOODS)}
+
+
+# Rows whose top two moods, or whose percentage rounding, sit within this
+# margin are re-scored with the scalar path so float summation order can
+# never change the answer
+_AMBIGUITY_EPSILON = 1e-9
+
+
+def _genre_mood_matrices(vocabulary: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every distinct genre: its weight per mood, and the order in which the
+    scalar path would first touch each mood inside that genre (inf = never).
+    """
+    weights = np.zeros((len(vocabulary), len(MOODS)))
+    first_touch = np.full((len(vocabulary), len(MOODS)), np.inf)
+
+    for row, genre in enumerate(vocabulary):
+        matches = GENRE_MATCHER.match(genre)
+        if not matches:
+            matches = ((OTHER_MOOD, OTHER_WEIGHT),)
+
+        for position, (mood, weight) in enumerate(matches):
+            column = _MOOD_INDEX[mood]
+            weights[row, column] += weight
+            first_touch[row, column] = min(first_touch[row, column], position)
+
+    return weights, first_touch
+
+
+def _ambiguous_rows(scores: np.ndarray) -> np.ndarray:
+    """
+    Users whose dominant mood is a near-tie or whose rounded percentages sit
+    on a .xx5 boundary.
+    """
+    totals = scores.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1
+
+    top_two = -np.partition(-scores, 1, axis=1)[:, :2]
+    near_tie = (top_two[:, 0] - top_two[:, 1]) <= _AMBIGUITY_EPSILON * top_two[:, 0]
+
+    hundredths = scores / totals * 10000
+    near_half = np.abs(hundredths - np.floor(hundredths) - 0.5) < _AMBIGUITY_EPSILON * 10000
+    on_boundary = (near_half & (scores > 0)).any(axis=1)
+
+    return near_tie | on_boundary
+
+
+def analyze_moods_batch(
+    genre_lists: List[List[str]],
+) -> List[Tuple[dict, Optional[str]]]:
+    """
+    Mood distribution + dominant mood for many users at once.
+
+    Genres are encoded into a sparse users × genres count matrix and scored
+    with one product against the genres × moods weight matrix. Output is
+    identical to analyze_mood_from_genres per user, dict order and
+    tie-breaking included: the rare rows where float summation order could
+    matter are re-scored by the scalar path. Users with no genres get
+    ({}, None) where the scalar path would raise.
+    """
+    user_count = len(genre_lists)
+    results: List[Tuple[dict, Optional[str]]] = [({}, None)] * user_count
+
+    lengths = np.fromiter((len(genres) for genres in genre_lists), dtype=np.int64, count=user_count)
+    occurrence_count = int(lengths.sum())
+    if not occurrence_count:
+        return results
+
+    flat = list(chain.from_iterable(genre_lists))
+    vocabulary = {genre: index for index, genre in enumerate(dict.fromkeys(flat))}
+    genre_ids = np.fromiter(map(vocabulary.__getitem__, flat), dtype=np.int64, count=occurrence_count)
+    user_ids = np.repeat(np.arange(user_count), lengths)
+
+    counts = sparse.csr_matrix(
+        (np.ones(occurrence_count), (user_ids, genre_ids)),
+        shape=(user_count, len(vocabulary)),
+    )
+    weights, first_touch = _genre_mood_matrices(list(vocabulary))
+
+    scores = np.asarray(counts @ weights)
+
+    # Insertion order of moods in the scalar Counter: first occurrence
+    # position in the user's list, then position within that genre's matches
+    offsets = np.cumsum(lengths) - lengths
+    occurrence = np.arange(occurrence_count) - np.repeat(offsets, lengths)
+    touch_keys = occurrence[:, None] * (len(MOODS) + 1) + first_touch[genre_ids]
+
+    non_empty = np.flatnonzero(lengths)
+    first_keys = np.minimum.reduceat(touch_keys, offsets[non_empty], axis=0)
+    mood_orders = np.argsort(first_keys, axis=1, kind="stable").tolist()
+    touched = np.isfinite(first_keys).tolist()
+
+    user_scores = scores[non_empty]
+    ambiguous = _ambiguous_rows(user_scores).tolist()
+
+    # Away from .xx5 boundaries numpy's rounding lands on the same double as round()
+    totals = user_scores.sum(axis=1, keepdims=True)
+    percentages = np.round(user_scores / totals * 100, 2).tolist()
+    dominant_columns = user_scores.argmax(axis=1).tolist()
+
+    for row, user in enumerate(non_empty.tolist()):
+        if ambiguous[row]:
+            results[user] = analyze_mood_from_genres(genre_lists[user])
+            continue
+
+        row_percentages = percentages[row]
+        row_touched = touched[row]
+        distribution = {
+            MOODS[column]: row_percentages[column]
+            for column in mood_orders[row]
+            if row_touched[column]
+        }
+
+        results[user] = (distribution, MOODS[dominant_columns[row]])
+
+    return results
+
+
+def analyze_and_visualize_moods_batch(genre_lists: List[List[str]]) -> List[dict]:
+    """
+    Batch counterpart of analyze_and_visualize_mood.
+    """
+    analyzed = []
+    for mood_distribution, dominant_mood in analyze_moods_batch(genre_lists):
+        analyzed.append({
+            "mood_distribution": mood_distribution,
+            "dominant_mood": dominant_mood,
+            "visual_identity": transform_mood_to_visual_identity(dominant_mood),
+        })
+    return analyzed
@@ -1,5 +1,7 @@
 from collections import Counter
 
+from transformers.genre_matcher import GenreMatcher
+
 GENRE_MOOD_MAP = {
     "metal": ("Aggressive", 1.2),
     "metalcore": ("Aggressive", 1.5),
@@ -70,19 +72,29 @@ DEFAULT_VISUAL_IDENTITY = MOOD_VISUAL_IDENTITY["Other"]
 
 
 
-def analyze_mood_from_genres(genres: list[str]):
-    mood_scores = Counter()
+# Built once at import; per-genre matches are memoized inside the matcher
+GENRE_MATCHER = GenreMatcher(GENRE_MOOD_MAP)
+
+
+def accumulate_mood_scores(genres: list[str], mood_scores: Counter) -> Counter:
+    """
+    Add the mood weights of `genres` to `mood_scores` in place, so scores
+    can be built up incrementally over a stream of artists.
+    """
+    match = GENRE_MATCHER.match
 
     for genre in genres:
-        matched = False
-        for key, (mood, weight) in GENRE_MOOD_MAP.items():
-            if key in genre:
-                mood_scores[mood] += weight
-                matched = True
+        matches = match(genre)
+        for mood, weight in matches:
+            mood_scores[mood] += weight
 
-        if not matched:
+        if not matches:
             mood_scores["Other"] += 0.5
 
+    return mood_scores
+
+
+def summarize_mood_scores(mood_scores: Counter):
     total = sum(mood_scores.values()) or 1
 
     mood_distribution = {
@@ -95,6 +107,10 @@ def analyze_mood_from_genres(genres: list[str]):
     return mood_distribution, dominant_mood
 
 
+def analyze_mood_from_genres(genres: list[str]):
+    return summarize_mood_scores(accumulate_mood_scores(genres, Counter()))
+
+
 
 def transform_mood_to_visual_identity(dominant_mood: str):
     return MOOD_VISUAL_IDENTITY.get(
@@ -1,16 +1,20 @@
-def transform_top_artists_to_planets(spotify_response: dict):
+from typing import List
+
+from models.records import ArtistRecord, parse_artists
+
+
+def artists_to_planets(artists: List[ArtistRecord]):
     planets = []
-    artists = spotify_response.get("items", [])
 
     for index, artist in enumerate(artists):
         planet = {
-            "id": artist["id"],
-            "name": artist["name"],
+            "id": artist.id,
+            "name": artist.name,
             "rank": index + 1,
             "orbit_radius": 100 + (index * 40),
             "planet_size": max(20, 100 - (index * 5)),
-            "image_url": artist["images"][0]["url"] if artist["images"] else None,
-            "genres": artist.get("genres", []),
+            "image_url": artist.image_url,
+            "genres": list(artist.genres),
         }
         planets.append(planet)
 
@@ -20,14 +24,17 @@ def transform_top_artists_to_planets(spotify_response: dict):
     }
 
 
+def transform_top_artists_to_planets(spotify_response: dict):
+    return artists_to_planets(parse_artists(spotify_response.get("items", [])))
+
+
 def extract_genres_from_artists(spotify_response: dict):
     """
     Extracts a flat list of genres from top artists
     """
-    artists = spotify_response.get("items", [])
     genres = []
 
-    for artist in artists:
-        genres.extend(artist.get("genres", []))
+    for artist in parse_artists(spotify_response.get("items", [])):
+        genres.extend(artist.genres)
 
     return genres